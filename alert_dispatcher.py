@@ -0,0 +1,195 @@
+# File: alert_dispatcher.py
+# Telegram alerts off the request path. Routes call submit(), which only
+# puts the alert on a bounded queue; one background thread per dispatcher
+# drains it over a pooled requests.Session. Alerts that pile up while the
+# dispatcher waits (on the rate limiter, a retry, or the short linger after
+# the first alert) are coalesced per key (usually the asset): duplicates are
+# counted and several alerts for one asset become a single digest message.
+# Sends go through a token bucket sized to Telegram's per-chat limit and are
+# retried with exponential backoff on network errors, 429 and 5xx.
+import queue
+import random
+import threading
+import time
+from collections import OrderedDict
+import requests
+from requests.adapters import HTTPAdapter
+
+TELEGRAM_API = "https://api.telegram.org"
+MAX_QUEUE = 1000
+LINGER = 0.25              # seconds to wait for rapid-fire alerts after the first
+RATE = 1.0                 # messages per second to one chat
+BURST = 3
+MAX_RETRIES = 5
+BACKOFF = 0.5
+MAX_MESSAGE = 4096         # Telegram's message length limit
+
+class TokenBucket:
+    def __init__(self, rate=RATE, capacity=BURST):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def delay(self):
+        # Takes a token if one is available (returns 0), otherwise returns
+        # how long to wait before asking again
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            return (1 - self.tokens) / self.rate
+
+    def acquire(self, stop=None):
+        while True:
+            wait = self.delay()
+            if wait == 0.0:
+                return True
+            if stop is not None and stop.wait(wait):
+                return False
+            if stop is None:
+                time.sleep(wait)
+
+def coalesce(alerts):
+    # [(key, message)] -> one text per key, in first-seen order. Repeats of
+    # a message are counted; several messages for one key become a digest.
+    groups = OrderedDict()
+    for key, message in alerts:
+        counts = groups.setdefault(key, OrderedDict())
+        counts[message] = counts.get(message, 0) + 1
+    texts = []
+    for key, counts in groups.items():
+        lines = [m if n == 1 else f"{m} (x{n})" for m, n in counts.items()]
+        if len(lines) == 1:
+            text = lines[0]
+        else:
+            label = f" for {key}" if key is not None else ""
+            text = f"🔔 {sum(counts.values())} alerts{label}:\n" + "\n".join(f"• {line}" for line in lines)
+        if len(text) > MAX_MESSAGE:
+            text = text[:MAX_MESSAGE - 1] + "…"
+        texts.append(text)
+    return texts
+
+class AlertDispatcher:
+    def __init__(self, token, chat_id, api_base=TELEGRAM_API, max_queue=MAX_QUEUE, linger=LINGER,
+                 rate=RATE, burst=BURST, max_retries=MAX_RETRIES, backoff=BACKOFF):
+        self.url = f"{api_base}/bot{token}/sendMessage"
+        self.chat_id = chat_id
+        self.linger = linger
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.bucket = TokenBucket(rate, burst)
+        self.session = requests.Session()
+        self.session.mount(api_base, HTTPAdapter(pool_connections=1, pool_maxsize=4))
+        self._queue = queue.Queue(max_queue)
+        self._stop = threading.Event()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._idle = threading.Condition()
+        self._in_flight = 0
+        self.stats = {"queued": 0, "dropped": 0, "sent": 0, "failed": 0, "coalesced": 0, "retries": 0}
+
+    def submit(self, message, key=None):
+        # Queues an alert without blocking; False when the queue is full
+        self._ensure_started()
+        with self._idle:
+            try:
+                self._queue.put_nowait((key, message))
+            except queue.Full:
+                self.stats["dropped"] += 1
+                return False
+            self._in_flight += 1
+            self.stats["queued"] += 1
+        return True
+
+    def _ensure_started(self):
+        if self._thread is None:
+            with self._start_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="alert-dispatcher", daemon=True)
+                    self._thread.start()
+
+    def _drain(self, linger):
+        # Everything queued right now, waiting up to `linger` for more
+        alerts = []
+        deadline = time.monotonic() + linger
+        while True:
+            timeout = deadline - time.monotonic()
+            try:
+                alerts.append(self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                return alerts
+
+    def _run(self):
+        pending = OrderedDict()  # key -> messages not sent yet, oldest key first
+        while not self._stop.is_set():
+            if not pending:
+                try:
+                    alerts = [self._queue.get(timeout=0.5)]
+                except queue.Empty:
+                    continue
+                for key, message in alerts + self._drain(self.linger):
+                    pending.setdefault(key, []).append(message)
+            if not self.bucket.acquire(self._stop):
+                break
+            # Alerts that arrived while waiting for a token join their key's group
+            for key, message in self._drain(0):
+                pending.setdefault(key, []).append(message)
+            key, messages = pending.popitem(last=False)
+            self.stats["coalesced"] += len(messages) - 1
+            self._send(coalesce([(key, m) for m in messages])[0])
+            self._done(len(messages))
+
+    def _done(self, count):
+        with self._idle:
+            self._in_flight -= count
+            self._idle.notify_all()
+
+    def _send(self, text):
+        # The caller holds a token for the first attempt
+        payload = {"chat_id": self.chat_id, "text": text}
+        for attempt in range(self.max_retries + 1):
+            retry_after = None
+            try:
+                resp = self.session.post(self.url, json=payload, timeout=10)
+                if resp.status_code == 200:
+                    self.stats["sent"] += 1
+                    return True
+                if resp.status_code == 429:
+                    try:
+                        retry_after = resp.json().get("parameters", {}).get("retry_after")
+                    except ValueError:
+                        retry_after = None
+                    retry_after = retry_after or resp.headers.get("Retry-After")
+                elif resp.status_code < 500:
+                    print(f"[ALERT FAILED] {resp.status_code} {resp.text[:200]}")
+                    break
+            except requests.RequestException as e:
+                print(f"[ALERT RETRY] {e}")
+            if attempt == self.max_retries:
+                break
+            self.stats["retries"] += 1
+            wait = float(retry_after) if retry_after else self.backoff * 2 ** attempt * (0.5 + random.random())
+            if self._stop.wait(wait):
+                break
+            # A retry is another message to the chat: it needs its own token
+            if not self.bucket.acquire(self._stop):
+                break
+        self.stats["failed"] += 1
+        return False
+
+    def flush(self, timeout=None):
+        # Waits until every queued alert has been sent or given up on
+        with self._idle:
+            return self._idle.wait_for(lambda: self._in_flight == 0, timeout)
+
+    def close(self, timeout=5.0):
+        self.flush(timeout)
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self.session.close()
@@ -1,10 +1,21 @@
+import os
 from flask import Blueprint, request, jsonify
-import requests
+from alert_dispatcher import AlertDispatcher, TELEGRAM_API
 
 alert_bp = Blueprint('alert_bp', __name__)
 
-TELEGRAM_BOT_TOKEN = 7711152546:AAFAf-5JT1yKg7c6gsk6p3UWYqiy249BPUc
-TELEGRAM_CHAT_ID = teaka_trader_bot
+# Credentials come from the environment only; without a token no
+# dispatcher is started and the route answers 503
+TELEGRAM_BOT_TOKEN = os.environ.get("TELEGRAM_BOT_TOKEN")
+TELEGRAM_CHAT_ID = os.environ.get("TELEGRAM_CHAT_ID")
+
+# Sends happen on the dispatcher's background thread, not in the request
+if TELEGRAM_BOT_TOKEN and TELEGRAM_CHAT_ID:
+    dispatcher = AlertDispatcher(TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID,
+                                 api_base=os.environ.get("TELEGRAM_API", TELEGRAM_API))
+else:
+    dispatcher = None
+    print("⚠️ TELEGRAM_BOT_TOKEN / TELEGRAM_CHAT_ID not set, Telegram alerts disabled")
 
 @alert_bp.route('/api/alert/send', methods=['POST'])
 def send_alert():
@@ -13,15 +24,9 @@ def send_alert():
     if not message:
         return jsonify({"error": "Message is required"}), 400
 
-    url = f"https://api.telegram.org/bot7711152546:AAFAf-5JT1yKg7c6gsk6p3UWYqiy249BPUc
-/sendMessage"
-    payload = {
-        "chat_id": teaka_trader_bot,
-        "text": message
-    }
-
-    resp = requests.post(url, json=payload)
-    if resp.status_code == 200:
-        return jsonify({"status": "sent"})
+    if dispatcher is None:
+        return jsonify({"error": "Telegram alerts are not configured"}), 503
+    if dispatcher.submit(message, data.get("asset")):
+        return jsonify({"status": "queued"}), 202
     else:
-        return jsonify({"error": resp.text}), 500
+        return jsonify({"error": "alert queue full"}), 503
@@ -1,23 +1,68 @@
 # api/server.py
-from fastapi import FastAPI, WebSocket
+import asyncio
+import os
+from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect
 import uvicorn
+from bar_store import get_bar_store
+from candle_aggregator import get_aggregator, replay_ticks
+from inference_service import ensure_batcher, predict_signal
+
+# Until the KuCoin ticker is wired in, live candles are built from a local
+# tick file (timestamp,symbol,price,size) replayed in real time
+TICK_FILE = os.environ.get("TICK_FILE", os.path.join("data", "ticks.csv"))
 
 app = FastAPI()
 
+@app.on_event("startup")
+async def load_model():
+    # Import TensorFlow and load/warm the classifier before serving, in a
+    # worker thread so the event loop is never blocked by it
+    await ensure_batcher()
+
+@app.on_event("startup")
+async def start_tick_feed():
+    # The close timer runs for any feed: quiet symbols still close and persist their bars
+    app.state.candle_timer = asyncio.create_task(get_aggregator().close_idle())
+    if os.path.exists(TICK_FILE):
+        app.state.tick_feed = asyncio.create_task(
+            get_aggregator().run(replay_ticks(TICK_FILE, speed=1.0, loop_forever=True)))
+
 @app.get("/historical")
-def get_historical(symbol: str, start: str, end: str):
-    # Return historical data from database or file
-    return {"data": [/* candlestick JSON array */]}
+def get_historical(symbol: str, start: str, end: str, timeframe: str = "1h"):
+    # Candles [time, open, high, low, close, volume] with start <= time <= end,
+    # sliced straight out of the local bar store (see bar_store.py)
+    try:
+        bars = get_bar_store().range(symbol, timeframe, start, end)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    columns = [bars[name].tolist() for name in ("timestamp", "open", "high", "low", "close", "volume")]
+    return {"symbol": symbol, "timeframe": timeframe, "data": [list(row) for row in zip(*columns)]}
 
 @app.get("/predict")
-def get_prediction(symbol: str):
-    # Run ML models on latest data and return signals
-    return {"signal": "buy", "confidence": 0.67}
+async def get_prediction(symbol: str):
+    # Classifier signal on the symbol's latest bars; concurrent requests are
+    # micro-batched into shared forward passes (see inference_service.py)
+    result = await predict_signal(symbol)
+    if result is None:
+        raise HTTPException(status_code=404, detail=f"not enough {symbol} history to score")
+    return result
 
-# WebSocket for live feed
+# WebSocket for live feed: /ws/live?symbols=ETH-USDT&timeframes=1m,5m streams
+# {"type": "update" | "close", "symbol", "timeframe", "bar"} events from the
+# shared candle aggregator; both filters are optional
 @app.websocket("/ws/live")
 async def websocket_endpoint(websocket: WebSocket):
     await websocket.accept()
-    while True:
-        data = await get_latest_price()  # custom function to fetch from KuCoin WS
-        await websocket.send_json(data)
+    params = websocket.query_params
+    symbols = [s for s in params.get("symbols", "").split(",") if s]
+    timeframes = [t for t in params.get("timeframes", "").split(",") if t]
+    aggregator = get_aggregator()
+    sub = aggregator.subscribe(symbols or None, timeframes or None)
+    try:
+        while True:
+            for event in await sub.get():
+                await websocket.send_json(event)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        aggregator.unsubscribe(sub)
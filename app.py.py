@@ -1,15 +1,17 @@
 from flask import Flask, request, jsonify
 from flask_sqlalchemy import SQLAlchemy
 from flask_bcrypt import Bcrypt
-from flask_jwt_extended import JWTManager, create_access_token, jwt_required, get_jwt_identity
+from flask_jwt_extended import JWTManager, create_access_token, jwt_required, current_user
 from flask_cors import CORS
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, object_session
 from datetime import timedelta
-import os
 from alert_routes import alert_bp
-app.register_blueprint(alert_bp)
+from auth_pool import PasswordPool, PoolBusy, UserCache
 
-app = Flask(ev_remote_server)
+app = Flask(__name__)
 CORS(app)
+app.register_blueprint(alert_bp)
 
 # Environment config (override with .env later)
 app.config['SECRET_KEY'] = 'super-secret'
@@ -29,13 +31,52 @@ class User(db.Model):
     password = db.Column(db.String(200), nullable=False)
     role = db.Column(db.String(50), default="user")  # roles: dev, admin, user
 
+def load_user(email):
+    user = User.query.filter_by(email=email).first()
+    if user is None:
+        return None
+    return {"id": user.id, "email": user.email, "password": user.password, "role": user.role}
+
+# bcrypt runs on its own bounded pool; user rows come from a short-TTL cache
+passwords = PasswordPool(bcrypt)
+user_cache = UserCache(load_user)
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _user_changed(mapper, connection, target):
+    # Drop the cached row now and again once the change is committed, so a
+    # request that re-reads the old row in between cannot keep it cached
+    emails = {target.email, *inspect(target).attrs.email.history.deleted}
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault("stale_users", set()).update(emails)
+    for email in emails:
+        user_cache.invalidate(email)
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed(session):
+    for email in session.info.pop("stale_users", ()):
+        user_cache.invalidate(email)
+
+@jwt.user_lookup_loader
+def lookup_identity(_jwt_header, jwt_data):
+    # Resolves @jwt_required identities through the cache, so the role is
+    # the current one rather than the one baked into the token
+    return user_cache.get(jwt_data["sub"]["email"])
+
+def busy():
+    return jsonify({"msg": "Authentication is busy, retry shortly"}), 503, {"Retry-After": "1"}
+
 # Routes
 @app.route("/register", methods=["POST"])
 def register():
     data = request.json
-    if User.query.filter_by(email=data["email"]).first():
+    if user_cache.get(data["email"]):
         return jsonify({"msg": "Email already registered"}), 409
-    hashed_pw = bcrypt.generate_password_hash(data["password"]).decode("utf-8")
+    try:
+        hashed_pw = passwords.hash(data["password"])
+    except PoolBusy:
+        return busy()
     user = User(email=data["email"], password=hashed_pw)
     db.session.add(user)
     db.session.commit()
@@ -44,17 +85,28 @@ def register():
 @app.route("/login", methods=["POST"])
 def login():
     data = request.json
-    user = User.query.filter_by(email=data["email"]).first()
-    if not user or not bcrypt.check_password_hash(user.password, data["password"]):
-        return jsonify({"msg": "Bad credentials"}), 401
-    token = create_access_token(identity={"email": user.email, "role": user.role})
+    user = user_cache.get(data["email"])
+    try:
+        if not user or not passwords.check(user["password"], data["password"]):
+            return jsonify({"msg": "Bad credentials"}), 401
+    except PoolBusy:
+        return busy()
+    token = create_access_token(identity={"email": user["email"], "role": user["role"]})
     return jsonify({"token": token})
 
 @app.route("/me", methods=["GET"])
 @jwt_required()
 def me():
-    identity = get_jwt_identity()
-    return jsonify(identity)
+    return jsonify({"email": current_user["email"], "role": current_user["role"]})
+
+@app.route("/auth/metrics", methods=["GET"])
+@jwt_required()
+def auth_metrics():
+    # Role read from the database, not the cache, so a demotion applies at once
+    user = User.query.filter_by(email=current_user["email"]).first()
+    if not user or user.role not in ("dev", "admin"):
+        return jsonify({"msg": "Forbidden"}), 403
+    return jsonify(dict(passwords.metrics(), cache_hits=user_cache.hits, cache_misses=user_cache.misses))
 
 if __name__ == "__main__":
     app.run(debug=True)
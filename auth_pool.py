@@ -0,0 +1,117 @@
+# File: auth_pool.py
+# Keeps the expensive parts of authentication off the request threads.
+#
+# PasswordPool runs bcrypt hashing and verification on a small dedicated
+# thread pool (bcrypt releases the GIL, so one thread per core hashes in
+# parallel). Admission is bounded: at most workers + backlog jobs are in
+# flight, and a request that cannot get a slot within admit_timeout gets
+# PoolBusy straight away instead of queueing behind a login storm, so the
+# request threads stay free for every other route. A job that outlives
+# JOB_TIMEOUT also surfaces as PoolBusy.
+#
+# UserCache is a short-TTL, size-bounded cache of user rows (plain dicts,
+# never ORM instances) keyed by email, used by /login and the JWT identity
+# lookup. Entries are dropped whenever a user row is updated or deleted,
+# so a role change takes effect on the next request; the TTL only bounds
+# staleness from writers outside this process.
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+WORKERS = os.cpu_count() or 2
+BACKLOG = 32               # jobs allowed to wait for a worker
+ADMIT_TIMEOUT = 0.05       # seconds a request may wait for a slot
+JOB_TIMEOUT = 5.0
+USER_TTL = 30.0
+USER_CACHE_SIZE = 10000
+
+class PoolBusy(Exception):
+    pass
+
+class PasswordPool:
+    def __init__(self, bcrypt, workers=WORKERS, backlog=BACKLOG, admit_timeout=ADMIT_TIMEOUT):
+        self.bcrypt = bcrypt
+        self.admit_timeout = admit_timeout
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self._slots = threading.BoundedSemaphore(workers + backlog)
+        self._lock = threading.Lock()
+        self._metrics = {"submitted": 0, "rejected": 0, "in_flight": 0, "max_in_flight": 0}
+
+    def _run(self, fn, *args, timeout=JOB_TIMEOUT):
+        if not self._slots.acquire(timeout=self.admit_timeout):
+            with self._lock:
+                self._metrics["rejected"] += 1
+            raise PoolBusy("password pool saturated")
+        with self._lock:
+            self._metrics["submitted"] += 1
+            self._metrics["in_flight"] += 1
+            self._metrics["max_in_flight"] = max(self._metrics["max_in_flight"], self._metrics["in_flight"])
+        try:
+            future = self._executor.submit(fn, *args)
+        except BaseException:
+            self._release()
+            raise
+        future.add_done_callback(lambda _: self._release())
+        try:
+            return future.result(timeout)
+        except FutureTimeout:
+            # The job keeps its slot until it finishes; the caller backs off
+            raise PoolBusy("password job timed out")
+
+    def _release(self):
+        with self._lock:
+            self._metrics["in_flight"] -= 1
+        self._slots.release()
+
+    def hash(self, password):
+        return self._run(self.bcrypt.generate_password_hash, password).decode("utf-8")
+
+    def check(self, pw_hash, password):
+        return self._run(self.bcrypt.check_password_hash, pw_hash, password)
+
+    def metrics(self):
+        with self._lock:
+            return dict(self._metrics)
+
+class UserCache:
+    def __init__(self, load, ttl=USER_TTL, max_size=USER_CACHE_SIZE):
+        # load(email) -> dict or None
+        self.load = load
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries = OrderedDict()   # email -> (expires, user dict)
+        self._generation = 0            # bumped by invalidate()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, email):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(email)
+            if entry and entry[0] > now:
+                self._entries.move_to_end(email)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            generation = self._generation
+        user = self.load(email)
+        # Unknown emails are not cached, so a later registration is seen at
+        # once; a row read before an invalidate() may be stale and is not kept
+        with self._lock:
+            if user is not None and generation == self._generation:
+                self._entries[email] = (now + self.ttl, user)
+                self._entries.move_to_end(email)
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+        return user
+
+    def invalidate(self, email=None):
+        with self._lock:
+            self._generation += 1
+            if email is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(email, None)
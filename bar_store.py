@@ -0,0 +1,178 @@
+# File: bar_store.py
+# Local columnar OHLCV store. Each symbol/timeframe lives in its own
+# directory with one raw little-endian file per column (timestamps as epoch
+# milliseconds) and a meta.json holding the committed row count. Rows are
+# kept sorted by timestamp, so a range query is two binary searches over the
+# memory-mapped timestamp column and the result columns are zero-copy slices.
+import json
+import os
+import threading
+import numpy as np
+from trade_store import timestamp_key
+
+DEFAULT_ROOT = os.path.join("data", "bars")
+COLUMNS = {
+    "timestamp": np.dtype("<i8"),
+    "open": np.dtype("<f8"),
+    "high": np.dtype("<f8"),
+    "low": np.dtype("<f8"),
+    "close": np.dtype("<f8"),
+    "volume": np.dtype("<f8"),
+}
+
+def to_millis(values):
+    # Epoch-ms int64 array from datetimes, ISO strings or epoch numbers
+    values = np.asarray(values)
+    if values.dtype.kind == "M":
+        return values.astype("datetime64[ms]").astype(np.int64)
+    if values.dtype.kind in "iuf":
+        values = values.astype(np.float64)
+        return np.where(np.abs(values) < 1e11, values * 1000, values).astype(np.int64)
+    return np.array([timestamp_key(v) for v in values.tolist()], dtype=np.int64)
+
+class BarSeries:
+    # One symbol/timeframe. Appends write the column files first and the
+    # row count last, so readers never see a partially written bar.
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._count = None
+        self._meta_mtime = None
+        self._columns = {}
+
+    def _meta_path(self):
+        return os.path.join(self.path, "meta.json")
+
+    def _column_path(self, name):
+        return os.path.join(self.path, name + ".bin")
+
+    def _refresh(self):
+        try:
+            mtime = os.stat(self._meta_path()).st_mtime_ns
+        except FileNotFoundError:
+            self._count, self._columns = 0, {}
+            return
+        if mtime == self._meta_mtime:
+            return
+        with open(self._meta_path()) as f:
+            count = json.load(f)["rows"]
+        columns = {}
+        if count:
+            for name, dtype in COLUMNS.items():
+                columns[name] = np.memmap(self._column_path(name), dtype=dtype, mode="r", shape=(count,))
+        self._count, self._columns, self._meta_mtime = count, columns, mtime
+
+    def __len__(self):
+        with self._lock:
+            self._refresh()
+            return self._count
+
+    def columns(self):
+        with self._lock:
+            self._refresh()
+            return self._columns
+
+    def last_timestamp(self):
+        columns = self.columns()
+        return int(columns["timestamp"][-1]) if columns else None
+
+    def append(self, bars):
+        # bars: mapping of column name -> array. Bars at or before the last
+        # stored timestamp are skipped, which makes re-imports idempotent.
+        # Returns the number of bars written.
+        ts = to_millis(bars["timestamp"])
+        order = np.argsort(ts, kind="stable")
+        ts = ts[order]
+        with self._lock:
+            self._refresh()
+            count = self._count
+            last = int(self._columns["timestamp"][-1]) if count else None
+            keep = np.ones(len(ts), dtype=bool)
+            if last is not None:
+                keep &= ts > last
+            keep[1:] &= ts[1:] != ts[:-1]  # duplicate timestamps in the batch: first wins
+            if not keep.any():
+                return 0
+            os.makedirs(self.path, exist_ok=True)
+            for name, dtype in COLUMNS.items():
+                values = ts if name == "timestamp" else np.asarray(bars[name], dtype=np.float64)[order]
+                path = self._column_path(name)
+                with open(path, "r+b" if os.path.exists(path) else "wb") as f:
+                    # Drop any tail left by an append that never committed
+                    f.truncate(count * dtype.itemsize)
+                    f.seek(count * dtype.itemsize)
+                    f.write(np.ascontiguousarray(values[keep], dtype=dtype).tobytes())
+            tmp = self._meta_path() + ".tmp"
+            with open(tmp, "w") as f:
+                json.dump({"rows": count + int(keep.sum()), "columns": list(COLUMNS)}, f)
+            os.replace(tmp, self._meta_path())
+            self._meta_mtime = None
+            return int(keep.sum())
+
+    def range(self, start=None, end=None):
+        # Bars with start <= timestamp <= end as zero-copy column views
+        start = to_millis([start])[0] if start is not None else None
+        end = to_millis([end])[0] if end is not None else None
+        columns = self.columns()
+        if not columns:
+            return {name: np.empty(0, dtype=dtype) for name, dtype in COLUMNS.items()}
+        ts = columns["timestamp"]
+        lo = int(np.searchsorted(ts, start, "left")) if start is not None else 0
+        hi = int(np.searchsorted(ts, end, "right")) if end is not None else len(ts)
+        return {name: col[lo:max(lo, hi)] for name, col in columns.items()}
+
+class BarStore:
+    def __init__(self, root=DEFAULT_ROOT):
+        self.root = root
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def series(self, symbol, timeframe):
+        key = (symbol.upper().replace("/", "-"), timeframe)
+        with self._lock:
+            if key not in self._series:
+                self._series[key] = BarSeries(os.path.join(self.root, key[0], key[1]))
+            return self._series[key]
+
+    def append(self, symbol, timeframe, bars):
+        return self.series(symbol, timeframe).append(bars)
+
+    def range(self, symbol, timeframe, start=None, end=None):
+        return self.series(symbol, timeframe).range(start, end)
+
+    def import_csv(self, path, symbol, timeframe, chunksize=500000):
+        # Streams a CSV with timestamp/open/high/low/close/volume columns in
+        # chunks; the file should be in time order (rows that go back in time
+        # across chunks are skipped by append)
+        import pandas as pd
+        series = self.series(symbol, timeframe)
+        total = 0
+        dtypes = {name: "float64" for name in COLUMNS if name != "timestamp"}
+        for chunk in pd.read_csv(path, chunksize=chunksize, dtype=dtypes):
+            ts = chunk["timestamp"]
+            if not pd.api.types.is_numeric_dtype(ts):
+                # Date strings are parsed here; epoch numbers (seconds or
+                # milliseconds) go to to_millis as they are
+                ts = pd.to_datetime(ts, utc=True, format="mixed").dt.tz_localize(None)
+            bars = {name: chunk[name].to_numpy() if name in chunk else np.zeros(len(chunk)) for name in COLUMNS if name != "timestamp"}
+            bars["timestamp"] = to_millis(ts.to_numpy())
+            total += series.append(bars)
+        return total
+
+_default_store = None
+
+def get_bar_store(root=DEFAULT_ROOT):
+    global _default_store
+    if _default_store is None or _default_store.root != root:
+        _default_store = BarStore(root)
+    return _default_store
+
+if __name__ == "__main__":
+    import sys
+    if len(sys.argv) < 5 or sys.argv[1] != "import":
+        print("usage: python bar_store.py import <csv> <symbol> <timeframe> [root]")
+        sys.exit(1)
+    store = BarStore(sys.argv[5] if len(sys.argv) > 5 else DEFAULT_ROOT)
+    added = store.import_csv(sys.argv[2], sys.argv[3], sys.argv[4])
+    print(f"✅ Imported {added} bars into {store.series(sys.argv[3], sys.argv[4]).path}")
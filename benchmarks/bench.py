@@ -0,0 +1,389 @@
+# File: benchmarks/bench.py
+# Benchmarks for the trading hot paths, on seeded synthetic data:
+#
+#   qtrader    QTrader.choose_action / learn throughput
+#   portfolio  /api/portfolio through the Flask test client (cold load of
+#              trades_history.json, then warm request latency)
+#   ws_feed    ws_feed.price_feed fan-out to N local websocket clients
+#   backtest   run_backtest for every strategy in Config/backtest_config.json
+#
+# Every benchmark gets one untimed warmup, `repeats` timed runs (the median
+# is reported) and one extra run under tracemalloc for peak allocations.
+# Results go to JSON together with the environment they were measured in.
+#
+#   python benchmarks/bench.py run [--size small|full] [--only qtrader,ws_feed] [--save-baseline]
+#   python benchmarks/bench.py compare [--baseline benchmarks/baseline.json] results.json
+#
+# Metric names carry their direction: *_s, *_ms and *_mb are better when
+# lower, *_per_s when higher; anything else is recorded but not compared.
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from importlib import metadata
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.join(BENCH_DIR, "..")
+for sub in ("", "model_output", "templates", "ml models"):
+    sys.path.append(os.path.join(ROOT, sub))
+import synthetic
+
+BASELINE_PATH = os.path.join(BENCH_DIR, "baseline.json")
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+THRESHOLD = 0.10
+REPEATS = 5
+
+SIZES = {
+    "small": {"q_steps": 20000, "trades": 20000, "requests": 200, "ws_clients": 20, "ws_rounds": 50, "bars": 20000},
+    "full": {"q_steps": 200000, "trades": 500000, "requests": 1000, "ws_clients": 200, "ws_rounds": 200, "bars": 500000},
+}
+
+LOWER_IS_BETTER = ("_s", "_ms", "_mb")
+HIGHER_IS_BETTER = ("_per_s",)
+
+BENCHMARKS = {}
+
+def benchmark(name):
+    def register(fn):
+        BENCHMARKS[name] = fn
+        return fn
+    return register
+
+def measure(fn, repeats, setup=None):
+    # (median seconds of fn(setup()) over `repeats` runs with setup untimed,
+    # tracemalloc peak of one more run in MB, fn's results from the timed runs)
+    setup = setup or (lambda: None)
+    fn(setup())  # warmup
+    durations = []
+    outputs = []
+    for _ in range(repeats):
+        state = setup()
+        started = time.perf_counter()
+        outputs.append(fn(state))
+        durations.append(time.perf_counter() - started)
+    state = setup()
+    tracemalloc.start()
+    try:
+        fn(state)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return statistics.median(durations), peak / 1e6, outputs
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+@benchmark("qtrader")
+def bench_qtrader(params, repeats, seed):
+    from q_learning_trader import QTrader
+    n = params["q_steps"]
+    states, actions, rewards, next_states = synthetic.q_transitions(n, seed=seed)
+    steps = list(zip(states, actions.tolist(), rewards.tolist(), next_states))
+
+    def learn(trader):
+        for state, action, reward, next_state in steps:
+            trader.learn(state, action, reward, next_state)
+
+    learned = QTrader(epsilon=0.1, epsilon_decay=1.0)
+    learn(learned)
+
+    def choose(_):
+        random.seed(seed)
+        for state in states:
+            learned.choose_action(state)
+
+    learn_s, learn_mb, _ = measure(learn, repeats, setup=lambda: QTrader(epsilon=0.1, epsilon_decay=1.0))
+    choose_s, choose_mb, _ = measure(choose, repeats)
+    return {
+        "learn_s": learn_s,
+        "learn_per_s": n / learn_s,
+        "learn_peak_mb": learn_mb,
+        "choose_action_s": choose_s,
+        "choose_action_per_s": n / choose_s,
+        "choose_action_peak_mb": choose_mb,
+        "states": len(learned),
+    }
+
+@benchmark("portfolio")
+def bench_portfolio(params, repeats, seed):
+    from flask_api_routes import app
+    client = app.test_client()
+    workdir = tempfile.mkdtemp(prefix="bench_portfolio_")
+    source = os.path.join(workdir, "trades_history.json")
+    with open(source, "w") as f:
+        json.dump(synthetic.trade_history(params["trades"], seed=seed), f)
+    cwd = os.getcwd()
+    runs = iter(range(10 ** 9))
+
+    def fresh_dir():
+        # A new directory means a new trades_history.json path, so the
+        # store parses it from scratch on the first request
+        path = os.path.join(workdir, f"run{next(runs)}")
+        os.makedirs(path)
+        shutil.copy(source, path)
+        os.chdir(path)
+
+    def cold(_):
+        response = client.get("/api/portfolio")
+        assert response.status_code == 200, response.status_code
+
+    def warm(_):
+        latencies = []
+        for _ in range(params["requests"]):
+            started = time.perf_counter()
+            client.get("/api/portfolio")
+            latencies.append(time.perf_counter() - started)
+        return latencies
+
+    try:
+        cold_s, cold_mb, _ = measure(cold, repeats, setup=fresh_dir)
+        warm_s, _, warm_runs = measure(warm, repeats)
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+    latencies = [latency for run in warm_runs for latency in run]
+    return {
+        "cold_load_s": cold_s,
+        "cold_load_peak_mb": cold_mb,
+        "requests_per_s": params["requests"] / warm_s,
+        "latency_p50_ms": percentile(latencies, 50) * 1000,
+        "latency_p95_ms": percentile(latencies, 95) * 1000,
+        "latency_p99_ms": percentile(latencies, 99) * 1000,
+        "trades": params["trades"],
+    }
+
+@benchmark("ws_feed")
+def bench_ws_feed(params, repeats, seed):
+    import websockets
+    import ws_feed
+    from broadcast_hub import BroadcastHub
+    clients, rounds = params["ws_clients"], params["ws_rounds"]
+    symbols = ws_feed.SYMBOLS
+    bars = synthetic.ohlcv_bars(rounds, seed=seed)
+
+    def bar(symbol, seq):
+        return {"symbol": symbol, "seq": seq, "time": int(bars["timestamp"][seq]),
+                "open": float(bars["open"][seq]), "high": float(bars["high"][seq]),
+                "low": float(bars["low"][seq]), "close": float(bars["close"][seq]),
+                "volume": float(bars["volume"][seq])}
+
+    payloads = [[(symbol, bar(symbol, seq)) for symbol in symbols] for seq in range(rounds)]
+
+    async def session():
+        # Fresh hub per run so no bars are replayed from the previous one
+        ws_feed.hub = hub = BroadcastHub()
+        state = {"target": -1, "pending": 0, "received": 0, "done": asyncio.Event()}
+
+        async def reader(ws):
+            last = {}
+            completed = -1
+            async for raw in ws:
+                message = json.loads(raw)
+                state["received"] += 1
+                last[message["symbol"]] = message["seq"]
+                if len(last) == len(symbols):
+                    reached = min(last.values())
+                    if reached >= state["target"] > completed:
+                        completed = state["target"]
+                        state["pending"] -= 1
+                        if state["pending"] == 0:
+                            state["done"].set()
+
+        async def deliver(target, rows):
+            # Publishes rows and waits until every client has the target round
+            state.update(target=target, pending=clients)
+            state["done"].clear()
+            for row in rows:
+                for symbol, payload in row:
+                    hub.publish(symbol, payload)
+                await asyncio.sleep(0)
+            await state["done"].wait()
+
+        async with websockets.serve(ws_feed.price_feed, "127.0.0.1", 0) as server:
+            port = server.sockets[0].getsockname()[1]
+            sockets = [await websockets.connect(f"ws://127.0.0.1:{port}/") for _ in range(clients)]
+            while len(hub) < clients:
+                await asyncio.sleep(0.001)
+            readers = [asyncio.create_task(reader(ws)) for ws in sockets]
+            half = rounds // 2
+            latencies = []
+            for seq in range(half):
+                started = time.perf_counter()
+                await deliver(seq, [payloads[seq]])
+                latencies.append(time.perf_counter() - started)
+            state["received"] = 0
+            started = time.perf_counter()
+            await deliver(rounds - 1, payloads[half:])
+            burst = time.perf_counter() - started
+            received = state["received"]
+            for ws in sockets:
+                await ws.close()
+            await asyncio.gather(*readers, return_exceptions=True)
+        return latencies, burst, received
+
+    elapsed, peak_mb, results = measure(lambda _: asyncio.run(session()), repeats)
+    latencies = [latency for run in results for latency in run[0]]
+    burst = statistics.median(run[1] for run in results)
+    sent = (rounds - rounds // 2) * len(symbols) * clients
+    received = statistics.median(run[2] for run in results)
+    return {
+        "session_s": elapsed,
+        "fanout_p50_ms": percentile(latencies, 50) * 1000,
+        "fanout_p99_ms": percentile(latencies, 99) * 1000,
+        "burst_s": burst,
+        "messages_per_s": received / burst,
+        "conflated_fraction": 1 - received / sent,
+        "peak_mb": peak_mb,
+        "clients": clients,
+    }
+
+@benchmark("backtest")
+def bench_backtest(params, repeats, seed):
+    from backtest_engine import load_config, run_backtest
+    config = load_config()
+    bars = synthetic.ohlcv_bars(params["bars"], seed=seed)
+    metrics = {}
+    for strategy in config["parameters"]:
+        run = lambda _: run_backtest(bars, config, strategy)["metrics"]["totalTrades"]
+        elapsed, peak_mb, trades = measure(run, repeats)
+        metrics[f"{strategy}_s"] = elapsed
+        metrics[f"{strategy}_bars_per_s"] = params["bars"] / elapsed
+        metrics[f"{strategy}_peak_mb"] = peak_mb
+        metrics[f"{strategy}_trades"] = trades[0]
+    return metrics
+
+def _version(package):
+    try:
+        return metadata.version(package)
+    except metadata.PackageNotFoundError:
+        return None
+
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True,
+                                text=True, timeout=10).stdout.strip() or None
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT,
+                                    capture_output=True, text=True, timeout=30).stdout.strip())
+    except (OSError, subprocess.SubprocessError):
+        commit, dirty = None, None
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "hostname": platform.node(),
+        "packages": {name: _version(name) for name in ("numpy", "pandas", "flask", "websockets")},
+        "git_commit": commit,
+        "git_dirty": dirty,
+    }
+
+def run(names, size, repeats, seed):
+    params = SIZES[size]
+    report = {
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "size": size,
+        "repeats": repeats,
+        "seed": seed,
+        "params": params,
+        "environment": environment(),
+        "benchmarks": {},
+    }
+    for name in names:
+        started = time.perf_counter()
+        report["benchmarks"][name] = BENCHMARKS[name](params, repeats, seed)
+        print(f"✅ {name} done in {time.perf_counter() - started:.1f}s")
+    return report
+
+def direction(metric):
+    if metric.endswith(HIGHER_IS_BETTER):
+        return 1
+    if metric.endswith(LOWER_IS_BETTER):
+        return -1
+    return 0
+
+def compare(baseline, current, threshold=THRESHOLD):
+    # Rows of (benchmark, metric, baseline, current, relative change,
+    # regressed) for every directional metric present in both reports
+    rows = []
+    for name, metrics in baseline["benchmarks"].items():
+        for metric, base in metrics.items():
+            sign = direction(metric)
+            value = current["benchmarks"].get(name, {}).get(metric)
+            if not sign or value is None or not base:
+                continue
+            change = (value - base) / base
+            rows.append((name, metric, base, value, change, sign * change < -threshold))
+    return rows
+
+def environment_notes(baseline, current):
+    keys = ("python", "machine", "processor", "cpu_count", "hostname")
+    notes = [f"{k}: {baseline['environment'].get(k)} -> {current['environment'].get(k)}"
+             for k in keys if baseline["environment"].get(k) != current["environment"].get(k)]
+    for key in ("size", "seed"):
+        if baseline.get(key) != current.get(key):
+            notes.append(f"{key}: {baseline.get(key)} -> {current.get(key)}")
+    return notes
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the trading hot paths")
+    commands = parser.add_subparsers(dest="command", required=True)
+    run_cmd = commands.add_parser("run", help="run benchmarks and write a results JSON")
+    run_cmd.add_argument("--size", choices=sorted(SIZES), default="small")
+    run_cmd.add_argument("--only", help="comma-separated subset of: " + ", ".join(BENCHMARKS))
+    run_cmd.add_argument("--repeats", type=int, default=REPEATS)
+    run_cmd.add_argument("--seed", type=int, default=0)
+    run_cmd.add_argument("--out", help="results path (default benchmarks/results/bench-<time>.json)")
+    run_cmd.add_argument("--save-baseline", action="store_true", help="also store the results as the baseline")
+    compare_cmd = commands.add_parser("compare", help="flag regressions against a baseline")
+    compare_cmd.add_argument("results")
+    compare_cmd.add_argument("--baseline", default=BASELINE_PATH)
+    compare_cmd.add_argument("--threshold", type=float, default=THRESHOLD,
+                             help="relative change counted as a regression (default 0.10)")
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        names = args.only.split(",") if args.only else list(BENCHMARKS)
+        unknown = [name for name in names if name not in BENCHMARKS]
+        if unknown:
+            parser.error(f"unknown benchmarks: {', '.join(unknown)}")
+        report = run(names, args.size, max(1, args.repeats), args.seed)
+        out = args.out or os.path.join(RESULTS_DIR, f"bench-{time.strftime('%Y%m%d-%H%M%S')}.json")
+        os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+        for path in [out] + ([BASELINE_PATH] if args.save_baseline else []):
+            with open(path, "w") as f:
+                json.dump(report, f, indent=2)
+            print(f"✅ results written to {path}")
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.results) as f:
+        current = json.load(f)
+    for note in environment_notes(baseline, current):
+        print(f"⚠️ environment differs, {note}")
+    rows = compare(baseline, current, args.threshold)
+    for name, metric, base, value, change, regressed in rows:
+        flag = "REGRESSION" if regressed else ""
+        print(f"{name:10} {metric:32} {base:14.4f} {value:14.4f} {change:+8.1%} {flag}")
+    regressions = [row for row in rows if row[5]]
+    if regressions:
+        print(f"⚠️ {len(regressions)} regression(s) beyond {args.threshold:.0%}")
+        return 1
+    print(f"✅ no regressions beyond {args.threshold:.0%} ({len(rows)} metrics compared)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
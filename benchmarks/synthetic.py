@@ -0,0 +1,72 @@
+# File: benchmarks/synthetic.py
+# Seeded synthetic data for the benchmarks: the same (size, seed) always
+# produces the same bars, ticks and trades, so runs on different machines
+# or commits time identical work.
+import datetime
+import numpy as np
+
+SYMBOLS = ["BTC-USDT", "ETH-USDT", "SOL-USDT"]
+START = datetime.datetime(2024, 1, 1)
+
+def ohlcv_bars(n, seed=0, start_price=100.0, interval_ms=3600000):
+    # Geometric random walk with intrabar range; dict of NumPy columns in
+    # the shape run_backtest and FeatureSet.batch take
+    rng = np.random.default_rng(seed)
+    close = start_price * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    open_ = np.empty(n)
+    open_[0] = start_price
+    open_[1:] = close[:-1] * np.exp(rng.normal(0, 0.002, n - 1))
+    spread = np.abs(rng.normal(0, 0.005, n)) * close
+    high = np.maximum(open_, close) + spread
+    low = np.minimum(open_, close) - spread
+    start_ms = int(START.timestamp() * 1000)
+    return {
+        "timestamp": start_ms + np.arange(n, dtype=np.int64) * interval_ms,
+        "open": open_,
+        "high": high,
+        "low": low,
+        "close": close,
+        "volume": rng.uniform(1000, 3000, n),
+    }
+
+def tick_stream(n, symbols=SYMBOLS, seed=0, start_ms=None, mean_gap_ms=50):
+    # List of (timestamp_ms, symbol, price, size), timestamps non-decreasing
+    rng = np.random.default_rng(seed)
+    start_ms = int(START.timestamp() * 1000) if start_ms is None else start_ms
+    times = start_ms + np.cumsum(rng.exponential(mean_gap_ms, n)).astype(np.int64)
+    which = rng.integers(0, len(symbols), n)
+    prices = {s: 100.0 * (i + 1) for i, s in enumerate(symbols)}
+    moves = np.exp(rng.normal(0, 0.0005, n))
+    sizes = rng.uniform(0.01, 2.0, n)
+    ticks = []
+    for ts, k, move, size in zip(times.tolist(), which.tolist(), moves.tolist(), sizes.tolist()):
+        symbol = symbols[k]
+        prices[symbol] *= move
+        ticks.append((ts, symbol, round(prices[symbol], 4), round(size, 4)))
+    return ticks
+
+def trade_history(n, symbols=SYMBOLS, seed=0, open_fraction=0.05):
+    # Trades in the trades_history.json format the dashboard reads
+    rng = np.random.default_rng(seed)
+    seconds = np.cumsum(rng.exponential(60, n)).tolist()
+    which = rng.integers(0, len(symbols), n).tolist()
+    pnl = np.round(rng.normal(1, 25, n), 2).tolist()
+    opened = (rng.random(n) < open_fraction).tolist()
+    sides = rng.integers(0, 2, n).tolist()
+    return [
+        {
+            "timestamp": (START + datetime.timedelta(seconds=t)).isoformat(timespec="seconds"),
+            "symbol": symbols[k],
+            "side": "buy" if side else "sell",
+            "pnl": p,
+            "open": o,
+        }
+        for t, k, p, o, side in zip(seconds, which, pnl, opened, sides)
+    ]
+
+def q_transitions(n, state_dim=3, seed=0, levels=50):
+    # (states, actions, rewards, next_states) for QTrader; states are drawn
+    # from a bounded grid so lookups hit a realistic mix of known states
+    rng = np.random.default_rng(seed)
+    grid = rng.integers(-levels, levels, (n + 1, state_dim)) / 100.0
+    return grid[:-1], rng.integers(0, 3, n), rng.normal(0, 1, n), grid[1:]
@@ -0,0 +1,133 @@
+# File: brain_store.py
+# The EV brain file split into a snapshot and an append-only thought log.
+#
+#   ev_virtual_brain.json             header fields plus the thoughts folded
+#                                     in by the last compaction
+#   ev_virtual_brain.thoughts.jsonl   {"seq": n, "thought": ...} per line,
+#                                     appended since then
+#
+# The snapshot is parsed only when its mtime/size changes and the log is
+# read incrementally from the last consumed byte, so a request costs the
+# size of what it returns, not the size of the brain's history. Thoughts
+# are addressed by a global sequence number that compaction preserves;
+# log lines whose seq is already in the snapshot are skipped, which makes
+# a compaction interrupted between its two steps harmless.
+import json
+import os
+import threading
+
+COMPACT_EVERY = 1000
+MISSING = {"error": "Brain file missing"}
+
+class BrainStore:
+    def __init__(self, path, log_path=None, compact_every=COMPACT_EVERY):
+        self.path = path
+        self.log_path = log_path or os.path.splitext(path)[0] + ".thoughts.jsonl"
+        self.compact_every = compact_every
+        self._lock = threading.Lock()
+        self._snapshot_stat = None
+        self._header = None
+        self._thoughts = []      # snapshot thoughts followed by logged ones
+        self._snapshot_len = 0
+        self._log_end = 0        # bytes of the log consumed so far
+
+    def _load_snapshot(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            st = None
+        key = (st.st_mtime_ns, st.st_size) if st else None
+        if key == self._snapshot_stat and self._header is not None:
+            return
+        if st is None:
+            brain = {}
+        else:
+            with open(self.path, "r", encoding="utf-8") as f:
+                brain = json.load(f)
+        thoughts = brain.pop("thoughts", [])
+        self._header = brain if st is not None else None
+        self._thoughts = list(thoughts)
+        self._snapshot_len = len(thoughts)
+        self._snapshot_stat = key
+        self._log_end = 0  # re-read the log against the new snapshot
+
+    def _read_log(self):
+        try:
+            size = os.path.getsize(self.log_path)
+        except FileNotFoundError:
+            size = 0
+        if size < self._log_end:
+            # Truncated by a compaction in another process
+            self._snapshot_stat = None
+            self._load_snapshot()
+        if size == self._log_end:
+            return
+        with open(self.log_path, "rb") as f:
+            f.seek(self._log_end)
+            data = f.read(size - self._log_end)
+        end = data.rfind(b"\n") + 1  # leave a partially written last line for next time
+        for line in data[:end].splitlines():
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            if entry["seq"] == len(self._thoughts):
+                self._thoughts.append(entry["thought"])
+        self._log_end += end
+
+    def _refresh(self):
+        self._load_snapshot()
+        self._read_log()
+
+    def header(self):
+        # Every top-level field except the thoughts, plus their count
+        with self._lock:
+            self._refresh()
+            if self._header is None and not self._thoughts:
+                return dict(MISSING)
+            return dict(self._header or {}, thought_count=len(self._thoughts))
+
+    def thoughts(self, after=0, limit=100):
+        # (thoughts with seq >= after, next offset to ask for)
+        with self._lock:
+            self._refresh()
+            chunk = self._thoughts[after:after + limit]
+            return chunk, after + len(chunk)
+
+    def append(self, thought):
+        # Logs one thought and returns its sequence number
+        with self._lock:
+            self._refresh()
+            seq = len(self._thoughts)
+            line = json.dumps({"seq": seq, "thought": thought}, ensure_ascii=False) + "\n"
+            with open(self.log_path, "ab") as f:
+                f.write(line.encode("utf-8"))
+            self._read_log()
+            if len(self._thoughts) - self._snapshot_len >= self.compact_every:
+                self._compact()
+            return seq
+
+    def compact(self):
+        with self._lock:
+            self._refresh()
+            self._compact()
+
+    def _compact(self):
+        # Folds the log into the snapshot (written atomically), then empties the log
+        brain = dict(self._header or {}, thoughts=self._thoughts)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(brain, f, indent=2)
+        os.replace(tmp, self.path)
+        open(self.log_path, "wb").close()
+        self._snapshot_stat = None
+        self._refresh()
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+def get_brain_store(path):
+    path = os.path.abspath(path)
+    with _stores_lock:
+        if path not in _stores:
+            _stores[path] = BrainStore(path)
+        return _stores[path]
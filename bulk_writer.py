@@ -0,0 +1,338 @@
+# File: bulk_writer.py
+# Write-behind ingestion for the tick and trade tables. Producers call
+# write(), which only appends to a bounded buffer (blocking or refusing
+# when it is full, so a stalled database pushes back instead of growing
+# memory). A writer thread drains the buffer in batches, flushing when
+# FLUSH_ROWS rows are waiting or FLUSH_INTERVAL seconds have passed, over
+# one long-lived connection: COPY ... FROM STDIN on Postgres, a single
+# multi-row executemany transaction on SQLite. metrics() reports queue
+# depth and flush statistics for backpressure monitoring.
+#
+# Missing tables and partitions are created once per writer, committed on
+# their own before the batch, so a batch commits or rolls back as a unit.
+# A batch the database keeps refusing is split per table and then in
+# halves down to single rows; rows that still fail are appended to the
+# quarantine file (JSON lines) instead of taking the rest of the batch
+# down with them.
+import csv
+import datetime
+import io
+import json
+import queue
+import threading
+import time
+from db_utils import DEFAULT_DB, connect, execute, is_sqlite, table_exists
+
+FLUSH_ROWS = 5000
+FLUSH_INTERVAL = 0.5
+MAX_BUFFER = 200000
+MAX_RETRIES = 3
+QUARANTINE_PATH = "bulk_writer_rejected.jsonl"
+TIME_COLUMNS = ("timestamp", "updated_at")
+
+# Insert columns per table (schemas from sql_scripts.py, create_trades.sql
+# and websocket.send_sql)
+TABLES = {
+    "market_data": ("symbol", "price", "volume_24h", "change_24h", "timestamp"),
+    "trade_logs": ("user_id", "symbol", "side", "amount", "price", "strategy", "status", "timestamp"),
+    "positions": ("user_id", "symbol", "amount", "entry_price", "current_price", "pnl", "status", "updated_at"),
+    "trades": ("user_id", "exchange", "pair", "trade_type", "price", "quantity", "timestamp"),
+    "orders": ("timestamp", "symbol", "order_type", "price", "quantity", "status"),
+}
+
+# Tables owned by their own DDL script; written to, never created here
+SCHEMA_SCRIPTS = {"trades": "create_trades.sql"}
+
+COLUMN_TYPES = {
+    "user_id": "INTEGER", "symbol": "VARCHAR(20)", "side": "VARCHAR(10)", "strategy": "VARCHAR(50)",
+    "status": "VARCHAR(20)", "order_type": "TEXT", "timestamp": "TIMESTAMP", "updated_at": "TIMESTAMP",
+}
+
+INDEXES = {
+    "market_data": ("symbol", "timestamp"),
+    "trade_logs": ("symbol", "timestamp"),
+    "orders": ("symbol", "timestamp"),
+    "positions": ("user_id", "symbol"),
+}
+
+def ensure_schema(conn, tables, partition_market_data=False):
+    # Creates the given tables if missing, with their composite indexes.
+    # With partition_market_data (Postgres only, and only when market_data
+    # does not exist yet) market_data is range-partitioned by month on
+    # timestamp; the writer adds partitions as new months arrive.
+    sqlite = is_sqlite(conn)
+    for table in tables:
+        if table in SCHEMA_SCRIPTS:
+            if not table_exists(conn, table):
+                raise RuntimeError(f"{table} does not exist, create it with {SCHEMA_SCRIPTS[table]}")
+            continue
+        columns = TABLES[table]
+        defs = [f"{c} {COLUMN_TYPES.get(c, 'DECIMAL')}" for c in columns]
+        if table == "market_data" and partition_market_data and not sqlite:
+            execute(conn, f"CREATE TABLE IF NOT EXISTS {table} (id BIGSERIAL, {', '.join(defs)}, "
+                          f"PRIMARY KEY (id, timestamp)) PARTITION BY RANGE (timestamp)")
+        else:
+            key = "id INTEGER PRIMARY KEY AUTOINCREMENT" if sqlite else "id SERIAL PRIMARY KEY"
+            execute(conn, f"CREATE TABLE IF NOT EXISTS {table} ({key}, {', '.join(defs)})")
+        if table in INDEXES:
+            index = INDEXES[table]
+            execute(conn, f"CREATE INDEX IF NOT EXISTS {table}_{'_'.join(index)}_idx ON {table} ({', '.join(index)})")
+    conn.commit()
+
+def is_partitioned(conn, table):
+    if is_sqlite(conn):
+        return False
+    row = execute(conn, "SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+                        "WHERE c.relname = ?", (table,)).fetchone()
+    return row is not None
+
+def ensure_month_partition(conn, table, month):
+    # month: datetime.date of the first day of the month
+    upper = (month.replace(day=28) + datetime.timedelta(days=4)).replace(day=1)
+    execute(conn, f"CREATE TABLE IF NOT EXISTS {table}_{month:%Y%m} PARTITION OF {table} "
+                  f"FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{upper:%Y-%m-%d}')")
+
+def _as_datetime(value):
+    # Epoch seconds or milliseconds (UTC) and ISO strings to datetimes
+    if isinstance(value, str):
+        return datetime.datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return datetime.datetime.fromtimestamp(value / 1000 if value > 1e11 else value, datetime.timezone.utc)
+    return value
+
+def _month_of(value):
+    return _as_datetime(value).date().replace(day=1)
+
+def _normalize_times(columns, rows):
+    # Numeric timestamps would be rejected by TIMESTAMP columns
+    positions = [i for i, c in enumerate(columns) if c in TIME_COLUMNS]
+    out = []
+    for row in rows:
+        if any(isinstance(row[i], (int, float)) for i in positions):
+            row = list(row)
+            for i in positions:
+                if isinstance(row[i], (int, float)) and not isinstance(row[i], bool):
+                    row[i] = _as_datetime(row[i])
+            row = tuple(row)
+        out.append(row)
+    return out
+
+def _copy_rows(conn, table, columns, rows):
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    for row in rows:
+        writer.writerow(["" if v is None else v.isoformat() if isinstance(v, datetime.datetime) else v for v in row])
+    buf.seek(0)
+    conn.cursor().copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buf)
+
+class BulkWriter:
+    def __init__(self, url=DEFAULT_DB, flush_rows=FLUSH_ROWS, flush_interval=FLUSH_INTERVAL,
+                 max_buffer=MAX_BUFFER, partition_market_data=False, connect_fn=None,
+                 quarantine_path=QUARANTINE_PATH):
+        self.url = url
+        self.quarantine_path = quarantine_path
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self.partition_market_data = partition_market_data
+        self._connect = connect_fn or (lambda: connect(url))
+        self._queue = queue.Queue(max_buffer)
+        self._conn = None
+        self._ready = set()          # tables whose schema exists (kept across reconnects)
+        self._partitioned = set()
+        self._partitions = set()     # (table, month) partitions known to exist
+        self._stop = threading.Event()
+        self._flush_now = threading.Event()
+        self._idle = threading.Condition()
+        self._unflushed = 0
+        self._metrics = {"rows_written": 0, "rows_failed": 0, "flushes": 0, "last_flush_rows": 0,
+                         "last_flush_ms": 0.0, "max_depth": 0, "blocked_writes": 0, "rejected_writes": 0,
+                         "rows_quarantined": 0}
+        self._thread = threading.Thread(target=self._run, name="bulk-writer", daemon=True)
+        self._thread.start()
+
+    def write(self, table, row, block=True, timeout=None):
+        # Buffers one row (a tuple in TABLES[table] order, or a dict).
+        # Returns False if the buffer stayed full (block=False or timeout).
+        columns = TABLES[table]
+        if isinstance(row, dict):
+            row = tuple(row.get(c) for c in columns)
+        elif len(row) != len(columns):
+            raise ValueError(f"{table} rows have {len(columns)} columns: {', '.join(columns)}")
+        with self._idle:
+            self._unflushed += 1
+        try:
+            self._queue.put_nowait((table, row))
+        except queue.Full:
+            if not block:
+                self._metrics["rejected_writes"] += 1
+                self._done(1)
+                return False
+            self._metrics["blocked_writes"] += 1
+            try:
+                self._queue.put((table, row), timeout=timeout)
+            except queue.Full:
+                self._metrics["rejected_writes"] += 1
+                self._done(1)
+                return False
+        depth = self._queue.qsize()
+        if depth > self._metrics["max_depth"]:
+            self._metrics["max_depth"] = depth
+        return True
+
+    def write_many(self, table, rows, block=True, timeout=None):
+        return sum(self.write(table, row, block, timeout) for row in rows)
+
+    def metrics(self):
+        return dict(self._metrics, queue_depth=self._queue.qsize(), queue_capacity=self._queue.maxsize)
+
+    def _done(self, count):
+        with self._idle:
+            self._unflushed -= count
+            self._idle.notify_all()
+
+    def _connection(self):
+        if self._conn is None:
+            self._conn = self._connect()
+        return self._conn
+
+    def _run(self):
+        while not (self._stop.is_set() and self._queue.empty()):
+            batch = []
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.flush_rows:
+                if self._flush_now.is_set() and self._queue.empty():
+                    break
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=min(timeout, 0.05)))
+                except queue.Empty:
+                    if self._stop.is_set():
+                        break
+            self._flush_now.clear()
+            if batch:
+                self._flush(batch)
+        if self._conn is not None:
+            self._conn.close()  # on the thread that opened it (SQLite insists)
+            self._conn = None
+
+    def _flush(self, batch):
+        by_table = {}
+        for table, row in batch:
+            by_table.setdefault(table, []).append(row)
+        started = time.perf_counter()
+        for attempt in range(MAX_RETRIES):
+            try:
+                conn = self._connection()
+                self._prepare(conn, by_table)
+                for table, rows in by_table.items():
+                    self._insert(conn, table, rows)
+                conn.commit()
+                self._metrics["rows_written"] += len(batch)
+                break
+            except Exception as e:
+                print(f"[BULK WRITER] flush of {len(batch)} rows failed ({e}), attempt {attempt + 1}")
+                self._reset_connection()
+                time.sleep(0.2 * 2 ** attempt)
+        else:
+            self._isolate(by_table)
+        self._metrics["flushes"] += 1
+        self._metrics["last_flush_rows"] = len(batch)
+        self._metrics["last_flush_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        self._done(len(batch))
+
+    def _reset_connection(self):
+        try:
+            self._conn.rollback()
+            self._conn.close()
+        except Exception:
+            pass
+        self._conn = None
+
+    def _isolate(self, by_table):
+        # The batch failed every retry: if the database answers at all,
+        # commit what it accepts and quarantine the rows it refuses
+        try:
+            execute(self._connection(), "SELECT 1").fetchone()
+        except Exception as e:
+            self._reset_connection()
+            for table, rows in by_table.items():
+                self._quarantine(table, rows, f"database unavailable: {e}")
+            return
+        for table, rows in by_table.items():
+            try:
+                self._prepare(self._connection(), {table: rows})
+            except Exception as e:
+                self._reset_connection()
+                self._quarantine(table, rows, f"schema: {e}")
+                continue
+            self._insert_split(table, rows)
+
+    def _insert_split(self, table, rows):
+        try:
+            conn = self._connection()
+            self._insert(conn, table, rows)
+            conn.commit()
+            self._metrics["rows_written"] += len(rows)
+        except Exception as e:
+            self._reset_connection()
+            if len(rows) == 1:
+                self._quarantine(table, rows, str(e))
+                return
+            half = len(rows) // 2
+            self._insert_split(table, rows[:half])
+            self._insert_split(table, rows[half:])
+
+    def _quarantine(self, table, rows, error):
+        print(f"[BULK WRITER] quarantined {len(rows)} {table} rows ({error})")
+        self._metrics["rows_failed"] += len(rows)
+        self._metrics["rows_quarantined"] += len(rows)
+        try:
+            with open(self.quarantine_path, "a", encoding="utf-8") as f:
+                for row in rows:
+                    f.write(json.dumps({"table": table, "row": list(row), "error": error}, default=str) + "\n")
+        except OSError as e:
+            print(f"[BULK WRITER] could not write {self.quarantine_path}: {e}")
+
+    def _prepare(self, conn, by_table):
+        # DDL for tables and month partitions not seen yet, committed before
+        # any of the batch's rows so it never commits part of a batch
+        tables = [t for t in by_table if t not in self._ready]
+        if tables:
+            ensure_schema(conn, tables, self.partition_market_data)
+            self._partitioned.update(t for t in tables if is_partitioned(conn, t))
+            self._ready.update(tables)
+        new = set()
+        for table in self._partitioned & by_table.keys():
+            ts = TABLES[table].index("timestamp")
+            for row in by_table[table]:
+                try:
+                    new.add((table, _month_of(row[ts])))
+                except (TypeError, ValueError, OverflowError, OSError):
+                    pass  # the row itself will be refused and quarantined
+        new -= self._partitions
+        for table, month in sorted(new):
+            ensure_month_partition(conn, table, month)
+        if new:
+            conn.commit()
+            self._partitions |= new
+
+    def _insert(self, conn, table, rows):
+        columns = TABLES[table]
+        if is_sqlite(conn):
+            placeholders = ", ".join("?" for _ in columns)
+            conn.executemany(f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})", rows)
+            return
+        _copy_rows(conn, table, columns, _normalize_times(columns, rows))
+
+    def flush(self, timeout=None):
+        # Waits until everything written so far has been committed (or failed)
+        self._flush_now.set()
+        with self._idle:
+            return self._idle.wait_for(lambda: self._unflushed == 0, timeout)
+
+    def close(self, timeout=None):
+        self.flush(timeout)
+        self._stop.set()
+        self._thread.join(timeout)
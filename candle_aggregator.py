@@ -0,0 +1,229 @@
+# File: candle_aggregator.py
+# Rolls raw trades into OHLCV candles for several timeframes at once. Each
+# tick touches one open candle per timeframe, so ingestion is O(timeframes)
+# regardless of history length. Subscribers get partial-bar updates and
+# bar-close events; closed bars are persisted to the local bar store in
+# batches, written on a single background thread (in order) so the event
+# loop never waits on disk. close_idle() runs on a timer next to the feed
+# and closes bars of symbols that have gone quiet. replay_ticks() streams
+# a local tick file in place of the exchange feed.
+import asyncio
+import csv
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from bar_store import COLUMNS, get_bar_store
+from trade_store import timestamp_key
+
+TIMEFRAMES = {"1s": 1000, "1m": 60000, "5m": 300000, "1h": 3600000}
+PERSIST_BATCH = 60
+PERSIST_INTERVAL = 30.0   # seconds between timer flushes of closed bars
+CLOSE_GRACE = 2000        # ms a period stays open after its end for late ticks
+MAX_CLOSED_BACKLOG = 1000
+
+def bar_dict(candle):
+    start, o, h, l, c, v = candle
+    return {"time": start, "open": o, "high": h, "low": l, "close": c, "volume": v}
+
+class CandleSubscriber:
+    # Partial updates are conflated per (symbol, timeframe) so a slow
+    # consumer only sees the newest state of each open bar; close events
+    # are queued in order (the oldest are dropped past MAX_CLOSED_BACKLOG).
+
+    def __init__(self, symbols=None, timeframes=None):
+        self.symbols = set(symbols) if symbols else None
+        self.timeframes = set(timeframes) if timeframes else None
+        self.updates = {}
+        self.closed = deque(maxlen=MAX_CLOSED_BACKLOG)
+        self._ready = asyncio.Event()
+
+    def wants(self, symbol, timeframe):
+        return ((self.symbols is None or symbol in self.symbols)
+                and (self.timeframes is None or timeframe in self.timeframes))
+
+    def offer(self, event):
+        if event["type"] == "close":
+            self.updates.pop((event["symbol"], event["timeframe"]), None)
+            self.closed.append(event)
+        else:
+            self.updates[(event["symbol"], event["timeframe"])] = event
+        self._ready.set()
+
+    async def get(self):
+        # Waits for and returns every event pending for this subscriber
+        await self._ready.wait()
+        self._ready.clear()
+        events = list(self.closed) + list(self.updates.values())
+        self.closed.clear()
+        self.updates.clear()
+        return events
+
+class CandleAggregator:
+    def __init__(self, timeframes=None, store=None, persist_batch=PERSIST_BATCH):
+        self.timeframes = dict(timeframes or TIMEFRAMES)
+        self.store = store
+        self.persist_batch = persist_batch
+        self.candles = {}     # (symbol, timeframe) -> [start, open, high, low, close, volume]
+        self._unsaved = {}    # (symbol, timeframe) -> closed candles not yet persisted
+        self._closed = {}     # (symbol, timeframe) -> start of the last closed candle
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="candle-persist")
+        self.subscribers = set()
+        self.late_ticks = 0
+        self.last_tick = None # (newest tick ts, wall-clock ms it arrived at)
+
+    def subscribe(self, symbols=None, timeframes=None):
+        sub = CandleSubscriber(symbols, timeframes)
+        self.subscribers.add(sub)
+        # Start the subscriber off with the bars currently forming
+        for (symbol, timeframe), candle in self.candles.items():
+            if sub.wants(symbol, timeframe):
+                sub.offer({"type": "update", "symbol": symbol, "timeframe": timeframe, "bar": bar_dict(candle)})
+        return sub
+
+    def unsubscribe(self, sub):
+        self.subscribers.discard(sub)
+
+    def _emit(self, event):
+        for sub in self.subscribers:
+            if sub.wants(event["symbol"], event["timeframe"]):
+                sub.offer(event)
+
+    def ingest(self, symbol, ts, price, size=0.0):
+        # ts in epoch ms (seconds and ISO strings are accepted too). Ticks
+        # older than the open candle of a timeframe are counted in
+        # late_ticks and left out of that timeframe.
+        ts = int(timestamp_key(ts))
+        price, size = float(price), float(size)
+        if self.last_tick is None or ts >= self.last_tick[0]:
+            self.last_tick = (ts, time.time() * 1000)
+        for timeframe, ms in self.timeframes.items():
+            key = (symbol, timeframe)
+            start = ts - ts % ms
+            candle = self.candles.get(key)
+            if candle is None and start <= self._closed.get(key, start - 1):
+                self.late_ticks += 1  # its period was already closed by close_until
+                continue
+            if candle is None or start > candle[0]:
+                if candle is not None:
+                    self._close(key, candle)
+                candle = self.candles[key] = [start, price, price, price, price, size]
+            elif start < candle[0]:
+                self.late_ticks += 1
+                continue
+            else:
+                if price > candle[2]:
+                    candle[2] = price
+                elif price < candle[3]:
+                    candle[3] = price
+                candle[4] = price
+                candle[5] += size
+            if self.subscribers:
+                self._emit({"type": "update", "symbol": symbol, "timeframe": timeframe, "bar": bar_dict(candle)})
+
+    def close_until(self, ts):
+        # Closes every open candle whose period ended at or before ts, for
+        # quiet symbols that would otherwise wait for their next trade
+        ts = int(timestamp_key(ts))
+        for key, candle in list(self.candles.items()):
+            if candle[0] + self.timeframes[key[1]] <= ts:
+                del self.candles[key]
+                self._close(key, candle)
+
+    def feed_time(self):
+        # Current time on the feed's clock: the newest tick plus the wall
+        # time since it arrived (replayed feeds run behind the wall clock)
+        if self.last_tick is None:
+            return None
+        ts, arrived = self.last_tick
+        return int(ts + time.time() * 1000 - arrived)
+
+    async def close_idle(self, interval=1.0, grace=CLOSE_GRACE, persist_interval=PERSIST_INTERVAL):
+        # Timer for the server loop: closes bars whose period has ended
+        # (plus `grace`) without a newer tick, and regularly hands every
+        # closed bar still buffered to the writer thread
+        last_persist = time.monotonic()
+        while True:
+            await asyncio.sleep(interval)
+            now = self.feed_time()
+            if now is not None:
+                self.close_until(now - grace)
+            if time.monotonic() - last_persist >= persist_interval:
+                self.flush(wait=False)
+                last_persist = time.monotonic()
+
+    def _close(self, key, candle):
+        self._closed[key] = candle[0]
+        if self.subscribers:
+            self._emit({"type": "close", "symbol": key[0], "timeframe": key[1], "bar": bar_dict(candle)})
+        if self.store is not None:
+            unsaved = self._unsaved.setdefault(key, [])
+            unsaved.append(candle)
+            if len(unsaved) >= self.persist_batch:
+                self._persist(key)
+
+    def _persist(self, key):
+        # Queued on the writer thread; one thread keeps each series' appends in order
+        rows = self._unsaved.pop(key, None)
+        if rows:
+            return self._writer.submit(self._write, key, rows)
+
+    def _write(self, key, rows):
+        columns = list(zip(*rows))
+        try:
+            self.store.append(key[0], key[1], {name: columns[i] for i, name in enumerate(COLUMNS)})
+        except Exception as e:
+            print(f"❌ persisting {len(rows)} {key[0]} {key[1]} bars failed: {e}")
+
+    def flush(self, wait=True):
+        # Hands every closed candle still buffered to the writer; with
+        # wait, blocks until everything queued so far is on disk
+        for key in list(self._unsaved):
+            self._persist(key)
+        if wait:
+            self._writer.submit(lambda: None).result()
+
+    async def run(self, ticks):
+        # Consumes an async iterable of (symbol, ts, price, size) ticks
+        try:
+            async for symbol, ts, price, size in ticks:
+                self.ingest(symbol, ts, price, size)
+        finally:
+            self.flush(wait=False)
+            await asyncio.wrap_future(self._writer.submit(lambda: None))
+
+async def replay_ticks(path, speed=None, loop_forever=False):
+    # Streams a CSV of timestamp,symbol,price,size ticks (the fields of a
+    # KuCoin /market/ticker message). speed=None replays as fast as
+    # possible, otherwise gaps between ticks are slept, divided by speed.
+    # With loop_forever each pass is shifted to start after the previous
+    # one, so candles keep moving forward.
+    first_ts = started = None
+    shift = 0
+    while True:
+        last_ts = None
+        with open(path, newline="") as f:
+            for n, row in enumerate(csv.DictReader(f)):
+                ts = int(timestamp_key(row["timestamp"])) + shift
+                if speed:
+                    if first_ts is None:
+                        first_ts, started = ts, time.monotonic()
+                    delay = (ts - first_ts) / 1000 / speed - (time.monotonic() - started)
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                elif n % 1000 == 0:
+                    await asyncio.sleep(0)  # let subscribers run during a fast replay
+                if first_ts is None:
+                    first_ts = ts
+                last_ts = ts
+                yield row["symbol"], ts, float(row["price"]), float(row.get("size") or 0)
+        if not loop_forever or last_ts is None:
+            return
+        shift = last_ts - first_ts + 1
+
+_default_aggregator = None
+
+def get_aggregator():
+    global _default_aggregator
+    if _default_aggregator is None:
+        _default_aggregator = CandleAggregator(store=get_bar_store())
+    return _default_aggregator
@@ -0,0 +1,226 @@
+# File: dashboard_rollups.py
+# Incremental per-user / per-symbol / per-day trade aggregates in
+# dashboard_metrics. Each run reads only the trade rows above a stored
+# high-water-mark id, folds them into the day rows with one upsert per
+# (user, symbol, day) and advances the mark, all in one transaction.
+# Realized PnL uses the average-cost method; the open position per
+# (user, symbol) is kept in rollup_positions so a run never has to look at
+# older trades. Works on SQLite (local default) and Postgres (psycopg2).
+#
+# The mark assumes trade ids become visible in increasing order; if
+# writers can commit out of order, run `rebuild` periodically to repair.
+import datetime
+from db_utils import DEFAULT_DB, connect, database_key, execute, is_sqlite, table_exists
+
+BATCH_ROWS = 50000
+SKIP_STATUSES = ("cancelled", "canceled", "rejected", "failed")
+
+# Column names of the supported trade tables
+SOURCES = {
+    "trade_logs": {"symbol": "symbol", "side": "side", "qty": "amount", "price": "price",
+                   "time": "timestamp", "status": "status"},
+    "trades": {"symbol": "pair", "side": "trade_type", "qty": "quantity", "price": "price",
+               "time": "timestamp", "status": None},
+}
+
+METRIC_COLUMNS = {
+    "symbol": "VARCHAR(20)",
+    "day": "DATE",
+    "closed_count": "INT DEFAULT 0",
+    "wins": "INT DEFAULT 0",
+    "volume": "NUMERIC(24,8) DEFAULT 0",
+    "closed_cost": "NUMERIC(24,8) DEFAULT 0",
+}
+
+_schema_ready = set()  # databases ensure_schema already ran against
+
+def ensure_schema(conn, force=False):
+    # Creates the rollup tables, or adds the rollup columns to a
+    # dashboard_metrics created by create_dashboard_metrics.sql. Runs once
+    # per database per process: the ALTERs take exclusive locks on Postgres.
+    key = database_key(conn)
+    if key in _schema_ready and not force:
+        return
+    serial = "INTEGER PRIMARY KEY AUTOINCREMENT" if is_sqlite(conn) else "SERIAL PRIMARY KEY"
+    execute(conn, f"""CREATE TABLE IF NOT EXISTS dashboard_metrics (
+        id {serial},
+        user_id INT,
+        pnl NUMERIC(18,2),
+        win_rate NUMERIC(5,2),
+        trades_count INT,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)""")
+    if is_sqlite(conn):
+        existing = {row[1] for row in execute(conn, "PRAGMA table_info(dashboard_metrics)")}
+        for name, ddl in METRIC_COLUMNS.items():
+            if name not in existing:
+                execute(conn, f"ALTER TABLE dashboard_metrics ADD COLUMN {name} {ddl}")
+    else:
+        for name, ddl in METRIC_COLUMNS.items():
+            execute(conn, f"ALTER TABLE dashboard_metrics ADD COLUMN IF NOT EXISTS {name} {ddl}")
+    execute(conn, "CREATE UNIQUE INDEX IF NOT EXISTS dashboard_metrics_user_symbol_day "
+                   "ON dashboard_metrics (user_id, symbol, day)")
+    execute(conn, "CREATE TABLE IF NOT EXISTS rollup_state (source VARCHAR(50) PRIMARY KEY, last_id BIGINT NOT NULL)")
+    execute(conn, """CREATE TABLE IF NOT EXISTS rollup_positions (
+        source VARCHAR(50), user_id INT, symbol VARCHAR(20),
+        qty DOUBLE PRECISION NOT NULL, avg_price DOUBLE PRECISION NOT NULL,
+        PRIMARY KEY (source, user_id, symbol))""")
+    conn.commit()
+    _schema_ready.add(key)
+
+def _day(value):
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.strftime("%Y-%m-%d")
+    return str(value)[:10] if value else datetime.date.today().isoformat()
+
+def apply_fill(position, side, qty, price):
+    # Average-cost position update. position is [qty, avg_price] (qty < 0
+    # when short); returns (realized pnl, closed qty, cost of the closed qty)
+    pos, avg = position
+    signed = qty if side in ("buy", "long") else -qty
+    closed = 0.0
+    if pos and (pos > 0) != (signed > 0):
+        closed = min(abs(signed), abs(pos))
+    realized = closed * (price - avg) * (1 if pos > 0 else -1) if closed else 0.0
+    cost = closed * avg
+    new_pos = pos + signed
+    if closed == 0:
+        avg = (abs(pos) * avg + abs(signed) * price) / (abs(pos) + abs(signed)) if new_pos else 0.0
+    elif abs(signed) > closed:
+        avg = price  # flipped through flat: the remainder opens at this price
+    elif new_pos == 0:
+        avg = 0.0
+    position[0], position[1] = new_pos, avg
+    return realized, closed, cost
+
+def _mark(conn, source):
+    row = execute(conn, "SELECT last_id FROM rollup_state WHERE source = ?", (source,)).fetchone()
+    return row[0] if row else 0
+
+def update_rollups(conn, source="trade_logs", batch_rows=BATCH_ROWS, user_id=None, until_id=None):
+    # Folds trades above the high-water mark into dashboard_metrics and
+    # returns the number of trade rows consumed. With user_id, replays that
+    # user's trades from the first one up to until_id and leaves the shared
+    # mark alone (used by rebuild).
+    cols = SOURCES[source]
+    ensure_schema(conn)
+    if not table_exists(conn, source):
+        return 0  # nothing logged into this database yet
+    last_id = _mark(conn, source) if user_id is None else 0
+    status_filter = ""
+    if cols["status"]:
+        placeholders = ", ".join("?" for _ in SKIP_STATUSES)
+        status_filter = f" AND (LOWER({cols['status']}) NOT IN ({placeholders}) OR {cols['status']} IS NULL)"
+    user_filter = " AND user_id = ?" if user_id is not None else ""
+    limit_filter = " AND id <= ?" if until_id is not None else ""
+    query = (f"SELECT id, user_id, {cols['symbol']}, LOWER({cols['side']}), {cols['qty']}, {cols['price']}, {cols['time']} "
+             f"FROM {source} WHERE id > ?{status_filter}{user_filter}{limit_filter} ORDER BY id LIMIT ?")
+    total = 0
+    while True:
+        params = [last_id] + (list(SKIP_STATUSES) if cols["status"] else [])
+        params += [user_id] if user_id is not None else []
+        params += [until_id] if until_id is not None else []
+        rows = execute(conn, query, params + [batch_rows]).fetchall()
+        if not rows:
+            break
+        keys = {(r[1], r[2]) for r in rows}
+        positions = {}
+        for uid, symbol in keys:
+            found = execute(conn, "SELECT qty, avg_price FROM rollup_positions WHERE source = ? AND user_id = ? AND symbol = ?",
+                             (source, uid, symbol)).fetchone()
+            positions[(uid, symbol)] = [float(found[0]), float(found[1])] if found else [0.0, 0.0]
+        days = {}
+        for trade_id, uid, symbol, side, qty, price, ts in rows:
+            if qty is None or price is None:
+                continue
+            qty, price = float(qty), float(price)
+            realized, closed, cost = apply_fill(positions[(uid, symbol)], side, qty, price)
+            agg = days.setdefault((uid, symbol, _day(ts)), [0, 0, 0, 0.0, 0.0, 0.0])
+            agg[0] += 1
+            if closed:
+                agg[1] += 1
+                agg[2] += realized > 0
+                agg[3] += realized
+                agg[5] += cost
+            agg[4] += qty * price
+        for (uid, symbol, day), (count, closed, wins, pnl, volume, cost) in days.items():
+            execute(conn, """INSERT INTO dashboard_metrics
+                (user_id, symbol, day, trades_count, closed_count, wins, pnl, volume, closed_cost, win_rate, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+                ON CONFLICT (user_id, symbol, day) DO UPDATE SET
+                    trades_count = dashboard_metrics.trades_count + excluded.trades_count,
+                    closed_count = dashboard_metrics.closed_count + excluded.closed_count,
+                    wins = dashboard_metrics.wins + excluded.wins,
+                    pnl = dashboard_metrics.pnl + excluded.pnl,
+                    volume = dashboard_metrics.volume + excluded.volume,
+                    closed_cost = dashboard_metrics.closed_cost + excluded.closed_cost,
+                    win_rate = (dashboard_metrics.wins + excluded.wins) * 100.0
+                               / NULLIF(dashboard_metrics.closed_count + excluded.closed_count, 0),
+                    updated_at = CURRENT_TIMESTAMP""",
+                     (uid, symbol, day, count, closed, wins, round(pnl, 8), volume, cost,
+                      wins * 100.0 / closed if closed else None))
+        for (uid, symbol), (qty, avg) in positions.items():
+            execute(conn, """INSERT INTO rollup_positions (source, user_id, symbol, qty, avg_price) VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (source, user_id, symbol) DO UPDATE SET qty = excluded.qty, avg_price = excluded.avg_price""",
+                     (source, uid, symbol, qty, avg))
+        last_id = rows[-1][0]
+        if user_id is None:
+            execute(conn, """INSERT INTO rollup_state (source, last_id) VALUES (?, ?)
+                ON CONFLICT (source) DO UPDATE SET last_id = excluded.last_id""", (source, last_id))
+        conn.commit()
+        total += len(rows)
+    return total
+
+def rebuild(conn, source="trade_logs", user_id=None):
+    # Recomputes the rollups from scratch (backfill), for every user or
+    # just one; a single user is replayed only up to the current mark
+    ensure_schema(conn)
+    mark = _mark(conn, source)
+    if user_id is None:
+        execute(conn, "DELETE FROM dashboard_metrics WHERE symbol IS NOT NULL")
+        execute(conn, "DELETE FROM rollup_positions WHERE source = ?", (source,))
+        execute(conn, "DELETE FROM rollup_state WHERE source = ?", (source,))
+        conn.commit()
+        return update_rollups(conn, source)
+    execute(conn, "DELETE FROM dashboard_metrics WHERE user_id = ? AND symbol IS NOT NULL", (user_id,))
+    execute(conn, "DELETE FROM rollup_positions WHERE source = ? AND user_id = ?", (source, user_id))
+    conn.commit()
+    return update_rollups(conn, source, user_id=user_id, until_id=mark) if mark else 0
+
+def daily_summary(conn, day, user_id=None):
+    # Report figures for one day, read from dashboard_metrics only
+    ensure_schema(conn)
+    user_filter = " AND user_id = ?" if user_id is not None else ""
+    params = (day,) + ((user_id,) if user_id is not None else ())
+    totals = execute(conn, f"""SELECT COALESCE(SUM(trades_count), 0), COALESCE(SUM(closed_count), 0),
+            COALESCE(SUM(wins), 0), COALESCE(SUM(pnl), 0), COALESCE(SUM(closed_cost), 0)
+            FROM dashboard_metrics WHERE day = ? AND symbol IS NOT NULL{user_filter}""", params).fetchone()
+    by_symbol = execute(conn, f"""SELECT symbol, SUM(pnl) FROM dashboard_metrics
+            WHERE day = ? AND symbol IS NOT NULL{user_filter} GROUP BY symbol ORDER BY SUM(pnl) DESC""", params).fetchall()
+    trades, closed, wins, pnl, cost = (float(v) for v in totals)
+    return {
+        "date": day,
+        "total_trades": int(trades),
+        "win_rate": round(wins * 100 / closed, 1) if closed else 0.0,
+        "pnl_usd": round(pnl, 2),
+        "pnl_percent": round(pnl * 100 / cost, 1) if cost else 0.0,
+        "top_symbol": by_symbol[0][0] if by_symbol else None,
+        "top_pnl": round(float(by_symbol[0][1]), 2) if by_symbol else 0.0,
+        "worst_symbol": by_symbol[-1][0] if by_symbol else None,
+        "worst_pnl": round(float(by_symbol[-1][1]), 2) if by_symbol else 0.0,
+    }
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Maintain the dashboard_metrics rollups")
+    parser.add_argument("command", choices=["update", "backfill", "rebuild"])
+    parser.add_argument("--db", default=DEFAULT_DB, help="sqlite:///path or a postgresql:// URL")
+    parser.add_argument("--source", default="trade_logs", choices=sorted(SOURCES))
+    parser.add_argument("--user", type=int, help="rebuild only this user's rows")
+    args = parser.parse_args()
+    conn = connect(args.db)
+    ensure_schema(conn, force=True)
+    if args.command == "update":
+        count = update_rollups(conn, args.source)
+    else:
+        count = rebuild(conn, args.source, args.user if args.command == "rebuild" else None)
+    print(f"✅ {args.command}: folded {count} {args.source} rows into dashboard_metrics")
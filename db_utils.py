@@ -0,0 +1,39 @@
+# File: db_utils.py
+# Connection helpers shared by the SQL-backed components: the same query
+# text runs on SQLite (local default and tests) and Postgres (psycopg2).
+import os
+import sqlite3
+
+DEFAULT_DB = os.environ.get("DATABASE_URL", "sqlite:///teaka_dashboard.db")
+
+def connect(url=DEFAULT_DB):
+    if url.startswith("sqlite:///"):
+        return sqlite3.connect(url[len("sqlite:///"):])
+    import psycopg2
+    return psycopg2.connect(url)
+
+def is_sqlite(conn):
+    return isinstance(conn, sqlite3.Connection)
+
+def adapt_sql(conn, query):
+    # Queries are written with ? placeholders; psycopg2 wants %s
+    return query if is_sqlite(conn) else query.replace("?", "%s")
+
+def execute(conn, query, params=()):
+    cur = conn.cursor()
+    cur.execute(adapt_sql(conn, query), params)
+    return cur
+
+def table_exists(conn, table):
+    if is_sqlite(conn):
+        query = "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?"
+    else:
+        query = "SELECT 1 WHERE to_regclass(?) IS NOT NULL"
+    return execute(conn, query, (table,)).fetchone() is not None
+
+def database_key(conn):
+    # Identifies the database behind a connection (file path or DSN)
+    if is_sqlite(conn):
+        path = execute(conn, "PRAGMA database_list").fetchone()[2]
+        return ("sqlite", path or id(conn))  # in-memory databases are per connection
+    return ("postgres", conn.dsn)
@@ -15,9 +15,9 @@ def send_email():
 
 📈 Total Trades: {summary['total_trades']}
 💰 Win Rate: {summary['win_rate']}%
-📊 P&L: +${summary['pnl_usd']} ({summary['pnl_percent']}%)
-🏆 Top Symbol: {summary['top_symbol']} (+${summary['top_pnl']})
-💣 Worst Symbol: {summary['worst_symbol']} (${summary['worst_pnl']})
+📊 P&L: {summary['pnl_usd']:+.2f} USD ({summary['pnl_percent']:+.1f}%)
+🏆 Top Symbol: {summary['top_symbol']} ({summary['top_pnl']:+.2f} USD)
+💣 Worst Symbol: {summary['worst_symbol']} ({summary['worst_pnl']:+.2f} USD)
 
 📍 Signal Forecast:
 """
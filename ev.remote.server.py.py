@@ -1,25 +1,35 @@
-from flask import Flask, request, jsonify
-import requests
+from flask import Flask, Response, request, jsonify, stream_with_context
+import json
+from ev_ollama_bridge import OllamaError, get_client
 
 app = Flask(__name__)
 
-def query_ollama(prompt, model="llama3"):
-    url = "http://localhost:11434/api/generate"
-    data = {
-        "model": model,
-        "prompt": prompt,
-        "stream": False
-    }
+def query_ollama(prompt, model="llama3", options=None):
     try:
-        response = requests.post(url, json=data)
-        return response.json().get("response", "[No response from Ollama]")
-    except Exception as e:
+        return get_client().generate(prompt, model, options)
+    except OllamaError as e:
         return f"[Ollama error: {str(e)}]"
 
+def sse_tokens(prompt, model, options):
+    # Server-sent events: {"token": ...} per fragment, then {"done": true},
+    # or an "error" event if Ollama fails part way
+    try:
+        for token in get_client().stream(prompt, model, options):
+            yield f"data: {json.dumps({'token': token})}\n\n"
+        yield 'data: {"done": true}\n\n'
+    except OllamaError as e:
+        yield f"event: error\ndata: {json.dumps({'error': str(e)})}\n\n"
+
 @app.route('/ev_remote/ollama', methods=['POST'])
 def ask_ollama():
+    # {"prompt", "model", "options", "stream"}; with "stream": true (or an
+    # Accept: text/event-stream header) tokens are relayed as they arrive
     data = request.json
     prompt = data.get("prompt", "")
     model = data.get("model", "llama3")
-    response = query_ollama(prompt, model)
+    options = data.get("options")
+    if data.get("stream") or "text/event-stream" in request.headers.get("Accept", ""):
+        return Response(stream_with_context(sse_tokens(prompt, model, options)), mimetype="text/event-stream",
+                        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+    response = query_ollama(prompt, model, options)
     return jsonify({"response": response})
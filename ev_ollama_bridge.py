@@ -1,14 +1,150 @@
+# File: ev_ollama_bridge.py
+# Shared Ollama client. All callers go through one keep-alive connection
+# pool; each model has its own concurrency limit so a burst of prompts
+# queues here instead of overloading the server; stream() yields tokens as
+# Ollama produces them; and deterministic requests (temperature 0 or a
+# fixed seed) are answered from a TTL + LRU cache keyed on
+# (model, prompt, options).
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
 import requests
+from requests.adapters import HTTPAdapter
 
-def query_ollama(prompt, model="llama3"):
-    url = "http://localhost:11434/api/generate"
-    data = {
-        "model": model,
-        "prompt": prompt,
-        "stream": False
-    }
-    response = requests.post(url, json=data)
-    return response.json().get("response", "[No Response]")
+OLLAMA_URL = os.environ.get("OLLAMA_URL", "http://localhost:11434")
+POOL_SIZE = 16
+MODEL_CONCURRENCY = 2
+CACHE_SIZE = 256
+CACHE_TTL = 600.0
+TIMEOUT = (5, 300)  # connect, read (a long generation can pause between tokens)
+
+class OllamaError(RuntimeError):
+    pass
+
+class ResponseCache:
+    def __init__(self, size=CACHE_SIZE, ttl=CACHE_TTL):
+        self.size = size
+        self.ttl = ttl
+        self._items = OrderedDict()  # key -> (expires, text), least recently used first
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            if item[0] < time.monotonic():
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+            return item[1]
+
+    def put(self, key, text):
+        with self._lock:
+            self._items[key] = (time.monotonic() + self.ttl, text)
+            self._items.move_to_end(key)
+            while len(self._items) > self.size:
+                self._items.popitem(last=False)
+
+def is_deterministic(options):
+    return bool(options) and (options.get("temperature") == 0 or "seed" in options)
+
+class OllamaClient:
+    def __init__(self, base_url=OLLAMA_URL, pool_size=POOL_SIZE, model_concurrency=MODEL_CONCURRENCY,
+                 cache_size=CACHE_SIZE, cache_ttl=CACHE_TTL):
+        self.url = base_url.rstrip("/") + "/api/generate"
+        self.session = requests.Session()
+        self.session.mount(base_url, HTTPAdapter(pool_connections=1, pool_maxsize=pool_size))
+        self.model_concurrency = model_concurrency
+        self.cache = ResponseCache(cache_size, cache_ttl)
+        self._slots = {}
+        self._slots_lock = threading.Lock()
+
+    def _slot(self, model):
+        with self._slots_lock:
+            if model not in self._slots:
+                self._slots[model] = threading.BoundedSemaphore(self.model_concurrency)
+            return self._slots[model]
+
+    def _cache_key(self, model, prompt, options):
+        if not is_deterministic(options):
+            return None
+        return (model, prompt, json.dumps(options, sort_keys=True))
+
+    def _payload(self, model, prompt, options, stream):
+        data = {"model": model, "prompt": prompt, "stream": stream}
+        if options:
+            data["options"] = options
+        return data
+
+    def generate(self, prompt, model="llama3", options=None):
+        key = self._cache_key(model, prompt, options)
+        if key is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+        with self._slot(model):
+            try:
+                response = self.session.post(self.url, json=self._payload(model, prompt, options, False), timeout=TIMEOUT)
+                response.raise_for_status()
+                text = response.json().get("response")
+            except (requests.RequestException, ValueError) as e:
+                raise OllamaError(str(e)) from e
+        if text is None:
+            raise OllamaError("no response field in Ollama reply")
+        if key is not None:
+            self.cache.put(key, text)
+        return text
+
+    def stream(self, prompt, model="llama3", options=None):
+        # Yields response fragments as they arrive. The model slot is held
+        # until the generation finishes or the consumer stops iterating.
+        key = self._cache_key(model, prompt, options)
+        if key is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                yield cached
+                return
+        parts = []
+        with self._slot(model):
+            try:
+                with self.session.post(self.url, json=self._payload(model, prompt, options, True),
+                                       stream=True, timeout=TIMEOUT) as response:
+                    response.raise_for_status()
+                    for line in response.iter_lines():
+                        if not line:
+                            continue
+                        chunk = json.loads(line)
+                        if "error" in chunk:
+                            raise OllamaError(chunk["error"])
+                        token = chunk.get("response", "")
+                        if token:
+                            parts.append(token)
+                            yield token
+                        if chunk.get("done"):
+                            break
+            except (requests.RequestException, ValueError) as e:
+                raise OllamaError(str(e)) from e
+        if key is not None:
+            self.cache.put(key, "".join(parts))
+
+_client = None
+_client_lock = threading.Lock()
+
+def get_client():
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = OllamaClient()
+        return _client
+
+def query_ollama(prompt, model="llama3", options=None):
+    try:
+        return get_client().generate(prompt, model, options)
+    except OllamaError:
+        return "[No Response]"
 
 # Example test
 if __name__ == "__main__":
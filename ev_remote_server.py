@@ -1,32 +1,43 @@
 from flask import Flask, request, jsonify
-import json
-import os
+from brain_store import get_brain_store
 
 app = Flask(__name__)
 
 # Memory File Path
 BRAIN_FILE = "E:\\EV_Files\\ev_virtual_brain.json"
 
-# Load Brain Memory (if available)
-def load_brain():
-    if os.path.exists(BRAIN_FILE):
-        with open(BRAIN_FILE, "r") as f:
-            return json.load(f)
-    return {"error": "Brain file missing"}
+# Brain Memory: cached snapshot + append-only thought log (see brain_store.py)
+brain = get_brain_store(BRAIN_FILE)
 
 @app.route("/ev_remote/command", methods=["GET", "POST"])
 def remote_command():
-    data = request.json or {}
+    data = request.get_json(silent=True) or {}
     command = data.get("command", "status_check")
 
-    brain = load_brain()
-
     response = {
         "ev_status": "online",
-        "brain_link": brain,
+        "brain_link": brain.header(),
         "received_command": command
     }
     return jsonify(response)
 
+@app.route("/ev_remote/thoughts", methods=["GET"])
+def list_thoughts():
+    # ?after=N&limit=M pages through the thoughts by sequence number
+    try:
+        after = max(int(request.args.get("after", 0)), 0)
+        limit = min(max(int(request.args.get("limit", 100)), 1), 1000)
+    except ValueError:
+        return jsonify({"error": "after and limit must be integers"}), 400
+    thoughts, next_offset = brain.thoughts(after, limit)
+    return jsonify({"thoughts": thoughts, "after": after, "next": next_offset})
+
+@app.route("/ev_remote/thoughts", methods=["POST"])
+def add_thought():
+    data = request.get_json(silent=True) or {}
+    if "thought" not in data:
+        return jsonify({"error": "thought is required"}), 400
+    return jsonify({"seq": brain.append(data["thought"])}), 201
+
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=5050, debug=True)
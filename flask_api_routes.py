@@ -1,31 +1,96 @@
 # File: flask_api_routes.py
-from flask import Flask, jsonify
-import json
-import os
+from flask import Flask, Response, jsonify, request
+from trade_store import get_trade_store, load_cached_json
+from risk_routes import risk_bp
+
+PAGE_PARAMS = ("since", "until", "limit", "symbol", "cursor")
+STREAM_CHUNK = 500
 
 app = Flask(__name__, template_folder="templates", static_folder="public")
+app.register_blueprint(risk_bp)
 
 def load_json(path):
-    if os.path.exists(path):
-        with open(path, 'r') as f:
-            return json.load(f)
-    return {}
+    return load_cached_json(path)
 
 @app.route('/api/portfolio')
 def portfolio():
-    status = load_json("strategy_status.json")
-    trades = load_json("trades_history.json")
-    balance = 5000 + sum(t.get("pnl", 0) for t in trades)
-    return jsonify({
-        "balance": round(balance, 2),
-        "open_trades": len([t for t in trades if t.get("open", False)]),
-        "total_pnl": round(sum(t.get("pnl", 0) for t in trades), 2)
-    })
+    return jsonify(get_trade_store("trades_history.json").summary())
+
+@app.route('/api/portfolio/symbols')
+def portfolio_symbols():
+    pnl = get_trade_store("trades_history.json").pnl_by_symbol()
+    return jsonify({symbol: round(value, 2) for symbol, value in pnl.items()})
+
+def feed_row(t):
+    return { "time": t.get("timestamp"), "symbol": t.get("symbol"), "pnl": t.get("pnl") }
+
+def stream_json_array(rows):
+    dumps = app.json.dumps
+    yield "["
+    chunk = []
+    first = True
+    for row in rows:
+        chunk.append(dumps(row))
+        if len(chunk) >= STREAM_CHUNK:
+            yield ("" if first else ",") + ",".join(chunk)
+            first = False
+            chunk = []
+    if chunk:
+        yield ("" if first else ",") + ",".join(chunk)
+    yield "]\n"
+
+def stream_ndjson(rows):
+    dumps = app.json.dumps
+    chunk = []
+    for row in rows:
+        chunk.append(dumps(row))
+        if len(chunk) >= STREAM_CHUNK:
+            yield "\n".join(chunk) + "\n"
+            chunk = []
+    if chunk:
+        yield "\n".join(chunk) + "\n"
+
+def paged_trades(project=None):
+    # Without paging params the whole history is streamed in file order as
+    # a JSON array (same body as before). With them trades come from the
+    # timestamp index in an envelope with next_cursor; format=ndjson streams
+    # one trade per line and reports the cursor in the X-Next-Cursor header.
+    args = request.args
+    store = get_trade_store("trades_history.json")
+    if not any(name in args for name in PAGE_PARAMS):
+        trades = store.all_trades()
+        rows = (trades[i] for i in range(len(trades)))
+        if project is not None:
+            rows = map(project, rows)
+        if args.get("format") == "ndjson":
+            return Response(stream_ndjson(rows), mimetype="application/x-ndjson")
+        return Response(stream_json_array(rows), mimetype="application/json")
+    try:
+        # Parsed by hand: type=int would quietly fall back to the default
+        try:
+            limit = int(args["limit"]) if args.get("limit") is not None else None
+            cursor = int(args["cursor"]) if args.get("cursor") is not None else 0
+        except ValueError:
+            raise ValueError("limit and cursor must be integers")
+        if (limit is not None and limit < 0) or cursor < 0:
+            raise ValueError("limit and cursor must be non-negative")
+        rows, next_cursor = store.select(
+            since=args.get("since"), until=args.get("until"),
+            symbol=args.get("symbol"), cursor=cursor, limit=limit)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if project is not None:
+        rows = map(project, rows)
+    if args.get("format") == "ndjson":
+        response = Response(stream_ndjson(rows), mimetype="application/x-ndjson")
+        if next_cursor is not None:
+            response.headers["X-Next-Cursor"] = str(next_cursor)
+        return response
+    return jsonify({"trades": list(rows), "next_cursor": next_cursor})
 
 @app.route('/api/history')
 def history():
-    trades = load_json("trades_history.json")
-    return jsonify(trades)
+    return paged_trades()
 
 @app.route('/api/hot_assets')
 def hot_assets():
@@ -37,8 +102,7 @@ def bots():
 
 @app.route('/api/feed')
 def feed():
-    trades = load_json("trades_history.json")
-    return jsonify([{ "time": t.get("timestamp"), "symbol": t.get("symbol"), "pnl": t.get("pnl") } for t in trades])
+    return paged_trades(feed_row)
 
 @app.route('/api/check-alert')
 def check_alert():
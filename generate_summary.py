@@ -1,25 +1,28 @@
 # File: generate_summary.py
 import json, os, datetime
+from dashboard_rollups import daily_summary, update_rollups
+from db_utils import connect
 
-def generate_summary():
-    today = datetime.datetime.now().strftime("%Y-%m-%d")
-    report = {
-        "date": today,
-        "total_trades": 42,
-        "win_rate": 76.2,
-        "pnl_usd": 231.74,
-        "pnl_percent": 5.7,
-        "top_symbol": "ETH/USD",
-        "top_pnl": 92.0,
-        "worst_symbol": "DOGE/USD",
-        "worst_pnl": -33.29,
+def generate_summary(day=None, conn=None):
+    # Figures come from the dashboard_metrics rollups; the incremental
+    # update first folds in only the trades logged since the last run
+    today = day or datetime.datetime.now().strftime("%Y-%m-%d")
+    owned = conn is None
+    conn = conn or connect()
+    try:
+        update_rollups(conn)
+        report = daily_summary(conn, today)
+    finally:
+        if owned:
+            conn.close()
+    report.update({
         "forecast": {
             "BTC/USD": "bullish",
             "SOL/USD": "neutral",
             "XAU/USD": "bearish"
         },
         "notes": "System stable. No anomalies."
-    }
+    })
 
     folder = "E:/EV_Files/teaka_trading_app/daily_reports/"
     archive = os.path.join(folder, "archive")
@@ -0,0 +1,268 @@
+# File: indicators.py
+# Technical indicators with two engines behind each definition: batch()
+# computes the whole series over NumPy arrays (training, backtests) and
+# update() advances one bar in O(1) (live feeds). Both engines perform the
+# same floating-point operations in the same order, so an incremental
+# instance fed the same bars from the same starting bar returns bit-for-bit
+# the values batch() produced for those bars.
+#
+# Windowed means come from running (prefix) sums of the input minus its
+# first value; the anchor keeps the sums small so the window differences do
+# not lose precision. The running sums also restart every `n` values, so
+# they never grow with the length of the series. EMA and RSI are recursive
+# by definition, so their batch form is a scalar loop over the same
+# recurrence.
+import math
+import numpy as np
+
+NAN = float("nan")
+
+def _window_means(d, n):
+    # Means of d over each trailing window of n values (NaN while warming up).
+    # Prefix sums run per block of n values; the window ending at offset o
+    # of block b is block b up to o plus the rest of block b - 1 after o.
+    out = np.full(len(d), np.nan)
+    if n <= len(d):
+        blocks = -(-len(d) // n)
+        padded = np.zeros(blocks * n)
+        padded[:len(d)] = d
+        c = np.cumsum(padded.reshape(blocks, n), axis=1)
+        sums = np.empty_like(c)
+        sums[0] = c[0]
+        sums[1:] = c[1:] + (c[:-1, -1:] - c[:-1])
+        out[n - 1:] = sums.ravel()[n - 1:len(d)] / n
+    return out
+
+class _WindowMean:
+    # Incremental twin of _window_means
+    def __init__(self, n):
+        self.n = n
+        self.total = 0.0
+        self.block = []      # prefix sums of the current block
+        self.previous = None # prefix sums of the last full block
+
+    def update(self, d):
+        self.total += d
+        offset = len(self.block)
+        self.block.append(self.total)
+        if self.previous is None:
+            value = self.total / self.n if offset == self.n - 1 else NAN
+        else:
+            value = (self.total + (self.previous[-1] - self.previous[offset])) / self.n
+        if offset == self.n - 1:
+            self.previous, self.block, self.total = self.block, [], 0.0
+        return value
+
+class Indicator:
+    inputs = ("close",)
+    outputs = ("value",)
+
+    def __init__(self, period):
+        if period < 1:
+            raise ValueError("period must be at least 1")
+        self.period = int(period)
+        self.reset()
+
+    def reset(self):
+        pass
+
+    def batch(self, *arrays):
+        raise NotImplementedError
+
+    def update(self, *values):
+        raise NotImplementedError
+
+class SMA(Indicator):
+    def reset(self):
+        self.anchor = None
+        self._mean = _WindowMean(self.period)
+
+    def batch(self, close):
+        x = np.asarray(close, dtype=np.float64)
+        if len(x) == 0:
+            return np.empty(0)
+        return x[0] + _window_means(x - x[0], self.period)
+
+    def update(self, close):
+        if self.anchor is None:
+            self.anchor = float(close)
+        return self.anchor + self._mean.update(close - self.anchor)
+
+class RollingStd(Indicator):
+    # Population standard deviation over the last `period` values;
+    # batch() returns (mean, std) columns, update() a (mean, std) pair
+
+    outputs = ("mean", "std")
+
+    def reset(self):
+        self.anchor = None
+        self._mean = _WindowMean(self.period)
+        self._mean_sq = _WindowMean(self.period)
+
+    def batch(self, close):
+        x = np.asarray(close, dtype=np.float64)
+        if len(x) == 0:
+            return np.empty((0, 2))
+        d = x - x[0]
+        mean = _window_means(d, self.period)
+        var = _window_means(d * d, self.period) - mean * mean
+        return np.column_stack((x[0] + mean, np.sqrt(np.maximum(var, 0.0))))
+
+    def update(self, close):
+        if self.anchor is None:
+            self.anchor = float(close)
+        d = close - self.anchor
+        mean = self._mean.update(d)
+        var = self._mean_sq.update(d * d) - mean * mean
+        return self.anchor + mean, math.sqrt(max(var, 0.0)) if var == var else NAN
+
+class Bollinger(RollingStd):
+    outputs = ("mid", "upper", "lower")
+
+    def __init__(self, period, width=2.0):
+        self.width = float(width)
+        super().__init__(period)
+
+    def batch(self, close):
+        mid, std = super().batch(close).T
+        band = self.width * std
+        return np.column_stack((mid, mid + band, mid - band))
+
+    def update(self, close):
+        mid, std = super().update(close)
+        band = self.width * std
+        return mid, mid + band, mid - band
+
+class ZScore(RollingStd):
+    # (close - mean) / std over the window; NaN while the window is flat
+    outputs = ("value",)
+
+    def batch(self, close):
+        mean, std = super().batch(close).T
+        x = np.asarray(close, dtype=np.float64)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(std > 0, (x - mean) / std, np.nan)
+
+    def update(self, close):
+        mean, std = super().update(close)
+        return (close - mean) / std if std > 0 else NAN
+
+class EMA(Indicator):
+    # Seeded with the SMA of the first `period` values, then
+    # ema += alpha * (close - ema) with alpha = 2 / (period + 1)
+
+    def reset(self):
+        self.alpha = 2.0 / (self.period + 1)
+        self.seen = 0
+        self.value = 0.0
+
+    def batch(self, close):
+        fresh = type(self)(self.period)  # leave this instance's live state alone
+        return np.array([fresh.update(v) for v in np.asarray(close, dtype=np.float64).tolist()])
+
+    def update(self, close):
+        self.seen += 1
+        if self.seen <= self.period:
+            self.value += close
+            if self.seen < self.period:
+                return NAN
+            self.value /= self.period
+        else:
+            self.value += self.alpha * (close - self.value)
+        return self.value
+
+class RSI(Indicator):
+    # Wilder's RSI: average gain/loss seeded with the mean of the first
+    # `period` changes, then smoothed with weight 1 / period
+
+    def reset(self):
+        self.prev = None
+        self.seen = 0
+        self.gain = 0.0
+        self.loss = 0.0
+
+    def batch(self, close):
+        fresh = type(self)(self.period)  # leave this instance's live state alone
+        return np.array([fresh.update(v) for v in np.asarray(close, dtype=np.float64).tolist()])
+
+    def update(self, close):
+        prev, self.prev = self.prev, close
+        if prev is None:
+            return NAN
+        change = close - prev
+        gain, loss = max(change, 0.0), max(-change, 0.0)
+        self.seen += 1
+        n = self.period
+        if self.seen <= n:
+            self.gain += gain
+            self.loss += loss
+            if self.seen < n:
+                return NAN
+            self.gain /= n
+            self.loss /= n
+        else:
+            self.gain += (gain - self.gain) / n
+            self.loss += (loss - self.loss) / n
+        if self.loss == 0.0:
+            return 100.0 if self.gain > 0.0 else 50.0
+        return 100.0 - 100.0 / (1.0 + self.gain / self.loss)
+
+class ATR(Indicator):
+    # Simple average of the true range, matching backtestEngine; the first
+    # bar's range uses its own close as the previous close
+    inputs = ("high", "low", "close")
+
+    def reset(self):
+        self.prev_close = None
+        self._sma = SMA(self.period)
+
+    def batch(self, high, low, close):
+        high, low, close = (np.asarray(a, dtype=np.float64) for a in (high, low, close))
+        if len(close) == 0:
+            return np.empty(0)
+        prev_close = np.concatenate(([close[0]], close[:-1]))
+        tr = np.maximum(high - low, np.maximum(np.abs(high - prev_close), np.abs(low - prev_close)))
+        return SMA(self.period).batch(tr)
+
+    def update(self, high, low, close):
+        prev_close = close if self.prev_close is None else self.prev_close
+        self.prev_close = close
+        tr = max(high - low, max(abs(high - prev_close), abs(low - prev_close)))
+        return self._sma.update(tr)
+
+class FeatureSet:
+    # Named indicators evaluated together. batch(bars) gives the (n, k)
+    # feature matrix for a dict of OHLCV arrays; update(bar) gives the k
+    # features of the next bar, equal to the matching row of batch() when
+    # fed the same bars. Multi-output indicators add one column per output
+    # ("bb_upper", ...).
+
+    def __init__(self, indicators):
+        self.indicators = dict(indicators)
+        self.names = []
+        for name, indicator in self.indicators.items():
+            if len(indicator.outputs) == 1:
+                self.names.append(name)
+            else:
+                self.names.extend(f"{name}_{out}" for out in indicator.outputs)
+
+    def reset(self):
+        for indicator in self.indicators.values():
+            indicator.reset()
+
+    def batch(self, bars):
+        columns = []
+        for indicator in self.indicators.values():
+            values = indicator.batch(*(bars[field] for field in indicator.inputs))
+            columns.append(values.reshape(len(values), -1))
+        return np.hstack(columns) if columns else np.empty((0, 0))
+
+    def update(self, bar):
+        row = []
+        for indicator in self.indicators.values():
+            value = indicator.update(*(float(bar[field]) for field in indicator.inputs))
+            if isinstance(value, tuple):
+                row.extend(value)
+            else:
+                row.append(value)
+        return np.array(row, dtype=np.float64)
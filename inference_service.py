@@ -0,0 +1,162 @@
+# File: inference_service.py
+# Micro-batching in front of the Keras classifier. Concurrent /predict calls
+# each submit one feature row; a single batching task collects rows until
+# MAX_BATCH_SIZE are waiting or the oldest has waited MAX_WAIT seconds, then
+# runs one forward pass for the whole batch and hands each caller its row.
+# The model is loaded once per worker process, off the event loop (the
+# server preloads it at startup; otherwise the first request does, in a
+# worker thread). The classifier is published to the registry by
+# ml models/sklearn model/sklearn.model.py.
+import asyncio
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from bar_store import get_bar_store
+from model_registry import get_registry
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "model_output", "Algoithms"))
+
+MODEL_NAME = "classifier"
+MODEL_PATH = os.environ.get("MODEL_PATH", os.path.join("model_output", "classifier.keras"))
+FEATURE_WINDOW = 10
+FEATURE_TIMEFRAME = "1h"
+MAX_BATCH_SIZE = 128
+MAX_WAIT = 0.005
+
+def _warmup(model):
+    model.predict(np.zeros((1, FEATURE_WINDOW), dtype=np.float32), verbose=0)  # build the graph up front
+
+def load_classifier(path=MODEL_PATH):
+    # Serves the registry's active classifier when one is published; each
+    # batch reads handle.model, so a newly promoted version takes over
+    # between batches
+    registry = get_registry()
+    version = registry.current(MODEL_NAME)
+    if version:
+        handle = registry.handle(MODEL_NAME, warmup=_warmup)
+        handle.swap(version)  # load and warm now, not on the first batch
+        return lambda batch: handle.model.predict_on_batch(batch)
+    import tensorflow as tf
+    if os.path.exists(path):
+        model = tf.keras.models.load_model(path)
+    else:
+        from classifier import build_classifier
+        print(f"⚠️ {path} not found, serving an untrained classifier")
+        model = build_classifier((FEATURE_WINDOW,))
+    _warmup(model)
+    return lambda batch: model.predict_on_batch(batch)
+
+def return_windows(close):
+    # (n, FEATURE_WINDOW) percent returns ending at each bar that has a full
+    # window; shared with training so both see identical features
+    close = np.asarray(close, dtype=np.float64)
+    returns = np.diff(close) / close[:-1] * 100
+    if len(returns) < FEATURE_WINDOW:
+        return np.zeros((0, FEATURE_WINDOW), dtype=np.float32)
+    return np.lib.stride_tricks.sliding_window_view(returns, FEATURE_WINDOW).astype(np.float32)
+
+def latest_features(symbol, store=None):
+    # Percent returns of the last FEATURE_WINDOW closed bars, or None when
+    # the store does not hold enough history for the symbol
+    store = store or get_bar_store()
+    close = store.series(symbol, FEATURE_TIMEFRAME).columns().get("close")
+    if close is None or len(close) <= FEATURE_WINDOW:
+        return None
+    return return_windows(close[-FEATURE_WINDOW - 1:])[-1]
+
+class MicroBatcher:
+    # predict_fn maps an (n, features) array to n outputs. It runs on one
+    # background thread, so the event loop keeps collecting the next batch
+    # while the current one is in the model.
+
+    def __init__(self, predict_fn, max_batch_size=MAX_BATCH_SIZE, max_wait=MAX_WAIT):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._queue = None
+        self._task = None
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self.batches = 0
+        self.rows = 0
+
+    def _ensure_started(self):
+        if self._task is None or self._task.done():
+            self._queue = asyncio.Queue()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def predict(self, features):
+        self._ensure_started()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((features, future))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        queue = self._queue
+        while True:
+            batch = [await queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                if queue.empty():
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(queue.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+                else:
+                    batch.append(queue.get_nowait())
+            batch = [(x, f) for x, f in batch if not f.cancelled()]  # callers that went away
+            if not batch:
+                continue
+            try:
+                inputs = np.stack([x for x, _ in batch])
+                outputs = await loop.run_in_executor(self._executor, self.predict_fn, inputs)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            self.batches += 1
+            self.rows += len(batch)
+            for (_, future), output in zip(batch, outputs):
+                if not future.done():
+                    future.set_result(output)
+
+    def close(self):
+        if self._task is not None:
+            self._task.cancel()
+        self._executor.shutdown(wait=False)
+
+_batcher = None
+_batcher_lock = threading.Lock()
+
+def get_batcher():
+    # Blocking (imports TensorFlow, loads and warms the model): call it from
+    # a worker thread, or through ensure_batcher() on the event loop
+    global _batcher
+    with _batcher_lock:
+        if _batcher is None:
+            _batcher = MicroBatcher(load_classifier())
+        return _batcher
+
+async def ensure_batcher():
+    if _batcher is not None:
+        return _batcher
+    return await asyncio.get_running_loop().run_in_executor(None, get_batcher)
+
+async def predict_signal(symbol):
+    # {"signal": "buy" | "sell", "confidence"} for the symbol's latest bars,
+    # or None without enough history
+    features = latest_features(symbol)
+    if features is None:
+        return None
+    started = time.perf_counter()
+    batcher = await ensure_batcher()
+    p = float(np.ravel(await batcher.predict(features))[0])
+    return {"signal": "buy" if p >= 0.5 else "sell", "confidence": round(max(p, 1 - p), 4),
+            "latency_ms": round((time.perf_counter() - started) * 1000, 2)}
@@ -1,6 +1,7 @@
 import tensorflow as tf
 import numpy as np
 import os
+import sys
 
 # Sample input/output data (stubbed)
 inputs = np.array([
@@ -24,6 +25,13 @@ model = tf.keras.Sequential([
 model.compile(optimizer='adam', loss='mean_squared_error')
 model.fit(inputs, outputs, epochs=200, verbose=1)
 
-# Save the model
-os.makedirs("E:/EV_Files/teaka_trading_app/model_output", exist_ok=True)
-model.save("E:/EV_Files/teaka_trading_app/model_output")
+# Save the model to its own directory; model_output itself holds source
+# files and Q-table checkpoints that must not be copied into the registry
+MODEL_DIR = "E:/EV_Files/teaka_trading_app/model_output/price_regressor"
+os.makedirs(MODEL_DIR, exist_ok=True)
+model.save(MODEL_DIR)
+
+# Register the saved model as a new version of price_regressor
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from model_registry import get_registry
+get_registry().publish("price_regressor", MODEL_DIR, kind="keras")
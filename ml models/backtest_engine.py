@@ -0,0 +1,236 @@
+# backtest_engine.py
+# Python counterpart of backtestEngine.ts, driven by Config/backtest_config.json.
+# Signals, fills, exits, sizing and the equity curve are computed with array
+# operations over the whole OHLCV series; the only Python loop walks the
+# selected trades (one iteration per trade, not per bar).
+import json
+import os
+import sys
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from indicators import ATR, SMA, ZScore
+
+CONFIG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Config", "backtest_config.json")
+BARS_PER_YEAR = {"1m": 525600, "5m": 105120, "15m": 35040, "30m": 17520, "1h": 8760, "4h": 2190, "1d": 365}
+
+def load_config(path=CONFIG_PATH):
+    with open(path) as f:
+        return json.load(f)
+
+def strategy_signals(bars, strategy, params):
+    # Returns (entry, exit) int8 arrays: entry is +1/-1 where a long/short
+    # position should be opened at the next bar's open, exit is +1 where
+    # longs and -1 where shorts should be closed at this bar's close
+    close, high, low = bars["close"], bars["high"], bars["low"]
+    n = len(close)
+    entry = np.zeros(n, dtype=np.int8)
+    exit_ = np.zeros(n, dtype=np.int8)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        if strategy == "meanReversion":
+            lookback = int(params["lookbackPeriod"])
+            z = ZScore(lookback).batch(close)
+            threshold = params["deviationThreshold"]
+            entry[z < -threshold] = 1
+            entry[z > threshold] = -1
+            # Back at the mean: close longs from below, shorts from above
+            exit_[z >= 0] = 1
+            exit_[z <= 0] = -1
+        elif strategy == "trendFollowing":
+            fast = SMA(int(params["fastPeriod"])).batch(close)
+            slow = SMA(int(params["slowPeriod"])).batch(close)
+            above = fast > slow
+            below = fast < slow
+            crossed_up = above & ~np.concatenate(([True], above[:-1]))
+            crossed_down = below & ~np.concatenate(([True], below[:-1]))
+            entry[crossed_up] = 1
+            entry[crossed_down] = -1
+            exit_[below] = 1
+            exit_[above] = -1
+        elif strategy == "breakout":
+            atr = ATR(int(params["atrPeriod"])).batch(high, low, close)
+            band = params["atrMultiplier"] * np.concatenate(([np.nan], atr[:-1]))
+            prev_close = np.concatenate(([np.nan], close[:-1]))
+            entry[close > prev_close + band] = 1
+            entry[close < prev_close - band] = -1
+        else:
+            raise ValueError(f"unknown strategy {strategy!r}")
+    return entry, exit_
+
+def _sparse_table(values, op):
+    # levels[k][i] = op(values[i:i + 2**k]), for range queries in O(1) each
+    levels = [values]
+    size = 1
+    while 2 * size <= len(values):
+        prev = levels[-1]
+        levels.append(op(prev[:-size], prev[size:]))
+        size *= 2
+    return levels
+
+def _first_reach(levels, start, target, above):
+    # First index >= start where the series reaches target (>= if above,
+    # <= otherwise), by binary lifting over the sparse table, for all
+    # queries at once; len(series) when never reached
+    n = len(levels[0])
+    pos = np.array(start, dtype=np.int64)
+    for k in range(len(levels) - 1, -1, -1):
+        table = levels[k]
+        width = 1 << k
+        ok = pos + width <= n
+        probe = table[np.minimum(pos, len(table) - 1)]
+        not_reached = probe < target if above else probe > target
+        pos = np.where(ok & not_reached, pos + width, pos)
+    return pos
+
+def _next_true(mask):
+    # next_idx[i] = smallest j >= i with mask[j], len(mask) if none
+    n = len(mask)
+    idx = np.where(mask, np.arange(n), n)
+    return np.minimum.accumulate(idx[::-1])[::-1]
+
+def run_backtest(bars, config=None, strategy=None, params=None):
+    # bars: mapping (dict, DataFrame, structured array) with open/high/low/close
+    # and optionally timestamp. Entries fill at the next open, profitTarget and
+    # stopLoss exits fill at their level intrabar (the stop wins when both are
+    # touched in one bar), signal exits at the close. Each trade commits
+    # min(riskPerTrade / stopLoss, maxExposure) of equity, so equity compounds
+    # as a product over trades. Trading halts once drawdown exceeds maxDrawdown.
+    config = load_config() if config is None else config
+    strategy = strategy or config["strategy"]
+    params = dict(config["parameters"][strategy], **(params or {}))
+    data = {k: np.asarray(bars[k], dtype=np.float64) for k in ("open", "high", "low", "close")}
+    opens, highs, lows, closes = data["open"], data["high"], data["low"], data["close"]
+    n = len(closes)
+    commission = config.get("commission", 0.0)
+    slippage = config.get("slippage", 0.0)
+    tp, sl = params["profitTarget"], params["stopLoss"]
+    initial = float(config["initialBalance"])
+
+    entry, exit_ = strategy_signals(data, strategy, params)
+    signal_bar = np.flatnonzero(entry[:-1])  # a fill needs a next bar
+    fill_bar = signal_bar + 1
+    side = entry[signal_bar].astype(np.float64)
+    fill = opens[fill_bar]
+
+    # Exit bar of every candidate entry, all candidates at once
+    high_max = _sparse_table(highs, np.maximum)
+    low_min = _sparse_table(lows, np.minimum)
+    up_level = fill * np.where(side > 0, 1 + tp, 1 + sl)
+    down_level = fill * np.where(side > 0, 1 - sl, 1 - tp)
+    hit_up = _first_reach(high_max, fill_bar, up_level, above=True)
+    hit_down = _first_reach(low_min, fill_bar, down_level, above=False)
+    long_exit = _next_true(exit_ == 1)
+    short_exit = _next_true(exit_ == -1)
+    hit_signal = np.where(side > 0, long_exit[fill_bar], short_exit[fill_bar])
+    stop_hit = np.where(side > 0, hit_down, hit_up)
+    target_hit = np.where(side > 0, hit_up, hit_down)
+    exit_bar = np.minimum.reduce([stop_hit, target_hit, hit_signal, np.full(len(side), n - 1)])
+
+    # Stops and targets fill at their level, or at the open when it gapped through
+    stop_level = np.where(side > 0, down_level, up_level)
+    target_level = np.where(side > 0, up_level, down_level)
+    exit_open = opens[exit_bar]
+    exit_price = closes[exit_bar]
+    gap_stop = np.where(side > 0, np.minimum(exit_open, stop_level), np.maximum(exit_open, stop_level))
+    gap_target = np.where(side > 0, np.maximum(exit_open, target_level), np.minimum(exit_open, target_level))
+    exit_price = np.where(exit_bar == target_hit, gap_target, exit_price)
+    exit_price = np.where(exit_bar == stop_hit, gap_stop, exit_price)
+
+    # One position at a time: walk from each exit to the next candidate
+    # whose signal comes at or after the exit bar
+    chosen = []
+    i = 0
+    while i < len(signal_bar):
+        chosen.append(i)
+        i = int(np.searchsorted(signal_bar, exit_bar[i], side="left"))
+        if i <= chosen[-1]:
+            i = chosen[-1] + 1
+    chosen = np.asarray(chosen, dtype=np.int64)
+
+    side, fill_bar, exit_bar = side[chosen], fill_bar[chosen], exit_bar[chosen]
+    entry_price = fill[chosen] * (1 + side * slippage)
+    exit_price = exit_price[chosen] * (1 - side * slippage)
+    fraction = min(config["riskPerTrade"] / sl, config.get("maxExposure", 1.0))
+    gross = side * (exit_price / entry_price - 1)
+    cost = commission * (1 + exit_price / entry_price)
+    trade_return = fraction * (gross - cost)
+
+    equity_after = initial * np.cumprod(1 + trade_return)
+    equity_before = np.concatenate(([initial], equity_after[:-1]))
+    peak = np.maximum.accumulate(np.concatenate(([initial], equity_after)))[1:]
+    breached = np.flatnonzero((peak - equity_after) / peak > config.get("maxDrawdown", 1.0))
+    if len(breached):
+        keep = breached[0] + 1
+        side, fill_bar, exit_bar = side[:keep], fill_bar[:keep], exit_bar[:keep]
+        entry_price, exit_price = entry_price[:keep], exit_price[:keep]
+        trade_return, equity_before, equity_after = trade_return[:keep], equity_before[:keep], equity_after[:keep]
+
+    # Mark-to-market equity per bar
+    trade_of_bar = np.full(n, -1, dtype=np.int64)
+    marks = np.zeros(n + 1, dtype=np.int64)
+    np.add.at(marks, fill_bar, 1)
+    np.add.at(marks, exit_bar + 1, -1)
+    in_trade = np.cumsum(marks[:-1]) > 0
+    trade_of_bar[in_trade] = np.searchsorted(fill_bar, np.flatnonzero(in_trade), side="right") - 1
+    settled = np.searchsorted(exit_bar, np.arange(n), side="left")
+    realised = np.concatenate(([initial], equity_after))[settled]
+    equity = realised.copy()
+    t = trade_of_bar[in_trade]
+    open_bars = np.flatnonzero(in_trade)
+    mark = np.where(open_bars == exit_bar[t], exit_price[t], closes[open_bars])
+    unrealised = fraction * (side[t] * (mark / entry_price[t] - 1) - commission * (1 + mark / entry_price[t]))
+    equity[open_bars] = equity_before[t] * (1 + unrealised)
+
+    high_water = np.maximum.accumulate(np.maximum(equity, initial))
+    drawdown = (high_water - equity) / high_water
+    bar_returns = np.diff(equity) / equity[:-1] if n > 1 else np.zeros(0)
+    pnl = equity_before * trade_return
+    wins, losses = pnl[pnl > 0], pnl[pnl <= 0]
+    notional = equity_before * fraction
+    annualise = np.sqrt(BARS_PER_YEAR.get(config.get("timeframe"), 8760))
+    std = bar_returns.std() if len(bar_returns) else 0.0
+    downside = np.sqrt(np.mean(np.minimum(bar_returns, 0.0) ** 2)) if len(bar_returns) else 0.0
+
+    metrics = {
+        "totalTrades": int(len(pnl)),
+        "winningTrades": int(len(wins)),
+        "losingTrades": int(len(losses)),
+        "winRate": float(len(wins) / len(pnl) * 100) if len(pnl) else 0.0,
+        "pnl": float(equity[-1] - initial) if n else 0.0,
+        "returnPct": float((equity[-1] / initial - 1) * 100) if n else 0.0,
+        "maxDrawdown": float(drawdown.max()) if n else 0.0,
+        "sharpeRatio": float(bar_returns.mean() / std * annualise) if std > 0 else 0.0,
+        "sortinoRatio": float(bar_returns.mean() / downside * annualise) if downside > 0 else 0.0,
+        "profitFactor": float(wins.sum() / -losses.sum()) if losses.sum() < 0 else 0.0,
+        "averageWin": float(wins.mean()) if len(wins) else 0.0,
+        "averageLoss": float(losses.mean()) if len(losses) else 0.0,
+        "largestWin": float(wins.max()) if len(wins) else 0.0,
+        "largestLoss": float(losses.min()) if len(losses) else 0.0,
+        "averageHoldingPeriod": float(np.mean(exit_bar - fill_bar + 1)) if len(pnl) else 0.0,
+        "exposure": float(in_trade.mean() * 100) if n else 0.0,
+        "commissions": float((notional * commission * (1 + exit_price / entry_price)).sum()),
+        "slippage": float((notional * slippage * (1 + exit_price / entry_price)).sum()),
+        "haltedOnDrawdown": bool(len(breached)),
+    }
+    trades = {
+        "side": side.astype(np.int8),
+        "entryBar": fill_bar,
+        "exitBar": exit_bar,
+        "entryPrice": entry_price,
+        "exitPrice": exit_price,
+        "pnl": pnl,
+        "return": trade_return,
+    }
+    if "timestamp" in bars:
+        timestamps = np.asarray(bars["timestamp"])
+        trades["entryTime"] = timestamps[fill_bar]
+        trades["exitTime"] = timestamps[exit_bar]
+    return {"metrics": metrics, "trades": trades, "equity": equity, "drawdown": drawdown}
+
+if __name__ == "__main__":
+    import sys
+    import pandas as pd
+    path = sys.argv[1] if len(sys.argv) > 1 else "data/market_prices.csv"
+    df = pd.read_csv(path, parse_dates=["timestamp"])
+    result = run_backtest(df)
+    print(json.dumps(result["metrics"], indent=2))
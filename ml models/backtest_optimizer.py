@@ -0,0 +1,201 @@
+# backtest_optimizer.py
+# Grid / random parameter sweeps and walk-forward optimisation on top of
+# backtest_engine.run_backtest. Price arrays are published once in shared
+# memory; pool workers attach to them at start-up, so a task is only the
+# parameter set and the bar window. Results are appended to a JSONL file as
+# they complete, and a rerun with the same file skips finished tasks.
+import itertools
+import json
+import os
+import random
+from multiprocessing import Pool, shared_memory
+import numpy as np
+from backtest_engine import load_config, run_backtest
+
+FIELDS = ("open", "high", "low", "close")
+SPACE_SCALES = (0.5, 0.75, 1.0, 1.25, 1.5)
+COUNT_SUFFIXES = ("Period", "Bars", "Window")  # bar counts; everything else is continuous
+
+def is_count(name):
+    # Whether a strategy parameter is a number of bars. Decided by name, not
+    # by how the JSON value is written: "deviationThreshold": 2 is still a float
+    return name.endswith(COUNT_SUFFIXES) or name.startswith("lookback")
+
+def default_space(strategy, config=None):
+    # Each configured parameter scaled around its value in backtest_config.json
+    config = load_config() if config is None else config
+    space = {}
+    for name, value in config["parameters"][strategy].items():
+        values = [float(value) * s for s in SPACE_SCALES]
+        if is_count(name):
+            values = sorted({max(1, int(round(v))) for v in values})
+        space[name] = values
+    return space
+
+def grid(space):
+    names = list(space)
+    return [dict(zip(names, combo)) for combo in itertools.product(*(space[n] for n in names))]
+
+def random_search(space, samples, seed=None):
+    # List values are sampled from, (low, high) tuples drawn uniformly
+    # (as integers when both bounds are ints)
+    rng = random.Random(seed)
+    param_sets = []
+    for _ in range(samples):
+        params = {}
+        for name, spec in space.items():
+            if isinstance(spec, tuple):
+                low, high = spec
+                if isinstance(low, int) and isinstance(high, int):
+                    params[name] = rng.randint(low, high)
+                else:
+                    params[name] = rng.uniform(low, high)
+            else:
+                params[name] = rng.choice(list(spec))
+        param_sets.append(params)
+    return param_sets
+
+class SharedBars:
+    # Copies open/high/low/close into one shared-memory block of shape (4, n)
+
+    def __init__(self, bars):
+        arrays = [np.asarray(bars[f], dtype=np.float64) for f in FIELDS]
+        self.shape = (len(FIELDS), len(arrays[0]))
+        self.shm = shared_memory.SharedMemory(create=True, size=max(8 * self.shape[0] * self.shape[1], 1))
+        block = np.ndarray(self.shape, dtype=np.float64, buffer=self.shm.buf)
+        for i, arr in enumerate(arrays):
+            block[i] = arr
+        del block
+
+    def close(self):
+        self.shm.close()
+        self.shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+_worker = {}
+
+def _attach(name, shape, config):
+    shm = shared_memory.SharedMemory(name=name)
+    _worker["shm"] = shm  # keep the mapping alive for the worker's lifetime
+    _worker["bars"] = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+    _worker["config"] = config
+
+def _evaluate(task):
+    bars = _worker["bars"]
+    start, stop = task["window"]
+    window = {f: bars[i, start:stop] for i, f in enumerate(FIELDS)}
+    result = run_backtest(window, _worker["config"], task["strategy"], task["params"])
+    return dict(task, metrics=result["metrics"])
+
+def task_key(task):
+    return json.dumps({k: task[k] for k in ("strategy", "params", "window", "phase")}, sort_keys=True)
+
+def load_results(path):
+    results = {}
+    if path and os.path.exists(path):
+        with open(path) as f:
+            for line in f:
+                try:
+                    row = json.loads(line)
+                except ValueError:
+                    continue  # partial line from an interrupted write
+                results[task_key(row)] = row
+    return results
+
+def run_tasks(shared, tasks, config, results_path=None, processes=None, chunksize=8):
+    # Yields each finished task (with its metrics) as soon as a worker
+    # returns it; tasks already present in results_path are yielded first
+    # without being rerun
+    done = load_results(results_path)
+    pending = []
+    for task in tasks:
+        key = task_key(task)
+        if key in done:
+            yield done[key]
+        else:
+            pending.append(task)
+    if not pending:
+        return
+    out = open(results_path, "a+") if results_path else None
+    if out and out.tell() > 0:
+        out.seek(out.tell() - 1)
+        if out.read(1) != "\n":
+            out.write("\n")  # terminate a line cut off by an interruption
+    try:
+        with Pool(processes, initializer=_attach, initargs=(shared.shm.name, shared.shape, config)) as pool:
+            for row in pool.imap_unordered(_evaluate, pending, chunksize=chunksize):
+                if out:
+                    out.write(json.dumps(row) + "\n")
+                    out.flush()
+                yield row
+    finally:
+        if out:
+            out.close()
+
+def sweep(bars, param_sets, strategy=None, config=None, results_path=None, processes=None, window=None):
+    config = load_config() if config is None else config
+    strategy = strategy or config["strategy"]
+    window = list(window or (0, len(bars["close"])))
+    tasks = [{"strategy": strategy, "params": p, "window": window, "phase": "sweep"} for p in param_sets]
+    with SharedBars(bars) as shared:
+        yield from run_tasks(shared, tasks, config, results_path, processes)
+
+def walk_forward(bars, param_sets, train_bars, test_bars, strategy=None, config=None,
+                 results_path=None, processes=None, objective="sharpeRatio"):
+    # Rolling folds of train_bars in-sample followed by test_bars
+    # out-of-sample. Every parameter set runs on each train window (all folds
+    # share one pool pass), the best by `objective` is then run on the
+    # following test window. Returns one summary per fold.
+    config = load_config() if config is None else config
+    strategy = strategy or config["strategy"]
+    n = len(bars["close"])
+    folds = [(s, s + train_bars, s + train_bars + test_bars)
+             for s in range(0, n - train_bars - test_bars + 1, test_bars)]
+    with SharedBars(bars) as shared:
+        train_tasks = [{"strategy": strategy, "params": p, "window": [a, b], "phase": "train", "fold": i}
+                       for i, (a, b, _) in enumerate(folds) for p in param_sets]
+        best = {}
+        for row in run_tasks(shared, train_tasks, config, results_path, processes):
+            fold = row["fold"]
+            if fold not in best or row["metrics"][objective] > best[fold]["metrics"][objective]:
+                best[fold] = row
+        test_tasks = [{"strategy": strategy, "params": best[i]["params"], "window": [b, c], "phase": "test", "fold": i}
+                      for i, (_, b, c) in enumerate(folds) if i in best]
+        tested = {row["fold"]: row for row in run_tasks(shared, test_tasks, config, results_path, processes)}
+    return [{"fold": i, "train": best[i]["window"], "test": tested[i]["window"], "params": best[i]["params"],
+             "inSample": best[i]["metrics"], "outOfSample": tested[i]["metrics"]} for i in sorted(tested)]
+
+if __name__ == "__main__":
+    import argparse
+    import pandas as pd
+    parser = argparse.ArgumentParser(description="Parameter sweep / walk-forward over backtest_config.json strategies")
+    parser.add_argument("bars", nargs="?", default="data/market_prices.csv")
+    parser.add_argument("--strategy")
+    parser.add_argument("--samples", type=int, help="random search with this many samples instead of the full grid")
+    parser.add_argument("--seed", type=int, default=0, help="random search seed; keep it fixed to resume a sweep")
+    parser.add_argument("--results", default="sweep_results.jsonl")
+    parser.add_argument("--processes", type=int)
+    parser.add_argument("--walk-forward", nargs=2, type=int, metavar=("TRAIN_BARS", "TEST_BARS"))
+    args = parser.parse_args()
+
+    config = load_config()
+    strategy = args.strategy or config["strategy"]
+    df = pd.read_csv(args.bars, parse_dates=["timestamp"])
+    bars = {f: df[f].to_numpy() for f in FIELDS}
+    space = default_space(strategy, config)
+    param_sets = random_search(space, args.samples, args.seed) if args.samples else grid(space)
+    if args.walk_forward:
+        for fold in walk_forward(bars, param_sets, *args.walk_forward, strategy=strategy, config=config,
+                                 results_path=args.results, processes=args.processes):
+            print(json.dumps(fold))
+    else:
+        best = None
+        for count, row in enumerate(sweep(bars, param_sets, strategy, config, args.results, args.processes), 1):
+            if best is None or row["metrics"]["sharpeRatio"] > best["metrics"]["sharpeRatio"]:
+                best = row
+            print(f"{count}/{len(param_sets)} best sharpe={best['metrics']['sharpeRatio']:.3f} {best['params']}", flush=True)
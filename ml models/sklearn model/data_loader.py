@@ -0,0 +1,183 @@
+# data_loader.py
+# Chunked CSV -> feature matrix loader for the sklearn models. The CSV is
+# parsed in chunks with compact dtypes (float32 features, integer codes for
+# categorical columns such as the symbol) and optionally row-sampled; the
+# resulting matrix is written straight to a .npy file, so peak memory is one
+# chunk rather than the whole DataFrame. The .npy files are cached under a
+# key made of the source file's hash and the feature config: a retrain on
+# the same data memory-maps the cache and skips parsing altogether.
+import contextlib
+import hashlib
+import json
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "feature_cache")
+CHUNK_ROWS = 1_000_000
+HASH_BLOCK = 1 << 24
+NPY_HEADER_SIZE = 128
+
+DEFAULT_CONFIG = {
+    "target": "target",
+    "drop": ["timestamp", "time", "date"],  # ignored when absent
+    "categorical": ["symbol"],              # encoded as integer codes, ignored when absent
+    "sample": None,                         # fraction of rows to keep, e.g. 0.1
+    "seed": 42,
+    "target_dtype": "int32",
+}
+
+def peak_rss_mb():
+    # Peak resident set size of this process so far, None where unavailable
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 1024 / (1024 if sys.platform == "darwin" else 1)
+    except ImportError:
+        pass
+    try:
+        import psutil
+        info = psutil.Process().memory_info()
+        return getattr(info, "peak_wset", info.rss) / 1024 / 1024
+    except ImportError:
+        return None
+
+@contextlib.contextmanager
+def stage(name, report=None):
+    # Prints (and records into `report`) wall time and peak RSS after a stage
+    started = time.perf_counter()
+    yield
+    seconds = time.perf_counter() - started
+    peak = peak_rss_mb()
+    if report is not None:
+        report[name] = {"seconds": round(seconds, 3), "peak_rss_mb": None if peak is None else round(peak, 1)}
+    rss = f", peak RSS {peak:.0f} MB" if peak is not None else ""
+    print(f"⏱ {name}: {seconds:.2f}s{rss}", flush=True)
+
+def file_hash(path, cache_dir=CACHE_DIR):
+    # blake2b of the file contents, remembered in a sidecar keyed by size and
+    # mtime so an unchanged multi-GB file is only hashed once
+    st = os.stat(path)
+    sidecar = os.path.join(cache_dir, "hashes.json")
+    try:
+        with open(sidecar) as f:
+            known = json.load(f)
+    except (FileNotFoundError, ValueError):
+        known = {}
+    ident = f"{os.path.abspath(path)}|{st.st_size}|{st.st_mtime_ns}"
+    if ident in known:
+        return known[ident]
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK), b""):
+            h.update(block)
+    known[ident] = h.hexdigest()
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp = sidecar + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(known, f)
+    os.replace(tmp, sidecar)
+    return known[ident]
+
+def cache_key(path, config, cache_dir=CACHE_DIR):
+    blob = json.dumps({"file": file_hash(path, cache_dir), "config": config}, sort_keys=True)
+    return hashlib.blake2b(blob.encode(), digest_size=12).hexdigest()
+
+def _npy_header(dtype, shape):
+    # Fixed-size .npy v1.0 header, so it can be rewritten in place once the
+    # final row count is known
+    header = "{'descr': %r, 'fortran_order': False, 'shape': %r, }" % (np.dtype(dtype).str, tuple(shape))
+    header = header.ljust(NPY_HEADER_SIZE - 10 - 1) + "\n"
+    return b"\x93NUMPY\x01\x00" + len(header).to_bytes(2, "little") + header.encode("latin1")
+
+class _NpyWriter:
+    # Appends rows to a .npy file of unknown final length
+
+    def __init__(self, path, dtype, width):
+        self.path, self.dtype, self.width = path, np.dtype(dtype), width
+        self.rows = 0
+        self.f = open(path, "wb")
+        self.f.write(_npy_header(self.dtype, self._shape()))
+
+    def _shape(self):
+        return (self.rows, self.width) if self.width else (self.rows,)
+
+    def write(self, block):
+        block = np.ascontiguousarray(block, dtype=self.dtype)
+        self.f.write(block.tobytes())
+        self.rows += len(block)
+
+    def close(self):
+        self.f.seek(0)
+        self.f.write(_npy_header(self.dtype, self._shape()))
+        self.f.close()
+
+def _columns(path, config):
+    header = list(pd.read_csv(path, nrows=0).columns)
+    if config["target"] not in header:
+        raise ValueError(f"{path} has no {config['target']!r} column")
+    categorical = [c for c in config["categorical"] if c in header]
+    numeric = [c for c in header if c != config["target"] and c not in config["drop"] and c not in categorical]
+    return numeric, categorical
+
+def build_features(path, config, out_prefix, chunk_rows=CHUNK_ROWS):
+    # Parses the CSV chunk by chunk into <out_prefix>.X.npy (float32,
+    # numeric columns then categorical codes) and <out_prefix>.y.npy
+    numeric, categorical = _columns(path, config)
+    dtypes = {c: "float32" for c in numeric}
+    dtypes.update({c: "category" for c in categorical})
+    categories = {c: {} for c in categorical}
+    rng = np.random.default_rng(config["seed"])
+    x_out = _NpyWriter(out_prefix + ".X.npy.tmp", np.float32, len(numeric) + len(categorical))
+    y_out = _NpyWriter(out_prefix + ".y.npy.tmp", config["target_dtype"], 0)
+    try:
+        reader = pd.read_csv(path, usecols=numeric + categorical + [config["target"]], dtype=dtypes,
+                             chunksize=chunk_rows, engine="c")
+        for chunk in reader:
+            if config["sample"] is not None:
+                chunk = chunk[rng.random(len(chunk)) < config["sample"]]
+            block = np.empty((len(chunk), x_out.width), dtype=np.float32)
+            if numeric:
+                block[:, :len(numeric)] = chunk[numeric].to_numpy(dtype=np.float32)
+            for j, col in enumerate(categorical, len(numeric)):
+                # Each chunk has its own categories; map them onto codes that
+                # stay stable across chunks (new values get the next code,
+                # missing values -1)
+                mapping = categories[col]
+                values = chunk[col].cat
+                lookup = np.array([mapping.setdefault(v, len(mapping)) for v in values.categories] + [-1],
+                                  dtype=np.float32)
+                block[:, j] = lookup[values.codes.to_numpy()]
+            x_out.write(block)
+            y_out.write(chunk[config["target"]].to_numpy())
+    finally:
+        x_out.close()
+        y_out.close()
+    os.replace(x_out.path, out_prefix + ".X.npy")
+    os.replace(y_out.path, out_prefix + ".y.npy")
+    meta = {"source": os.path.abspath(path), "rows": x_out.rows, "features": numeric + categorical,
+            "categories": {c: list(m) for c, m in categories.items()}, "config": config}
+    with open(out_prefix + ".json", "w") as f:
+        json.dump(meta, f)
+    return meta
+
+def load_features(path, config=None, cache_dir=CACHE_DIR, mmap=True, report=None):
+    # Returns (X, y, meta). X and y are memory-mapped from the cache when
+    # it holds this file/config pair, otherwise built first.
+    config = dict(DEFAULT_CONFIG, **(config or {}))
+    os.makedirs(cache_dir, exist_ok=True)
+    with stage("hash source", report):
+        prefix = os.path.join(cache_dir, cache_key(path, config, cache_dir))
+    if os.path.exists(prefix + ".json"):
+        with open(prefix + ".json") as f:
+            meta = json.load(f)
+    else:
+        with stage("parse csv", report):
+            meta = build_features(path, config, prefix)
+    with stage("map features", report):
+        mode = "r" if mmap else None
+        X = np.load(prefix + ".X.npy", mmap_mode=mode)
+        y = np.load(prefix + ".y.npy", mmap_mode=mode)
+    return X, y, meta
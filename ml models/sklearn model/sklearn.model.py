@@ -1,4 +1,48 @@
+import os
+import sys
+import numpy as np
 from sklearn.model_selection import train_test_split
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..")
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, "model_output", "Algoithms"))
+from bar_store import get_bar_store
+from classifier import build_classifier
+from inference_service import FEATURE_TIMEFRAME, FEATURE_WINDOW, MODEL_NAME, return_windows
+from model_registry import get_registry
+
+SYMBOLS = os.environ.get("SYMBOLS", "BTC-USDT,ETH-USDT,SOL-USDT").split(",")
+MODEL_DIR = os.environ.get("CLASSIFIER_DIR", "E:/EV_Files/teaka_trading_app/model_output/classifier")
+
+# Same features the inference service scores: the last FEATURE_WINDOW
+# percent returns of closed bars; the target is whether the next bar closes up
+features, target = [], []
+store = get_bar_store()
+for symbol in SYMBOLS:
+    close = store.series(symbol, FEATURE_TIMEFRAME).columns().get("close")
+    if close is None or len(close) <= FEATURE_WINDOW + 1:
+        print(f"⚠️ not enough {symbol} {FEATURE_TIMEFRAME} history, skipped")
+        continue
+    close = np.asarray(close, dtype=np.float64)
+    windows = return_windows(close)[:-1]  # the last window has no next bar yet
+    features.append(windows)
+    target.append((close[FEATURE_WINDOW + 1:] > close[FEATURE_WINDOW:-1]).astype(np.float32))
+if not features:
+    sys.exit("no bar history to train on")
+features = np.concatenate(features)
+target = np.concatenate(target)
+
 X_train, X_test, y_train, y_test = train_test_split(features, target, test_size=0.2, random_state=42)
 model = build_classifier((X_train.shape[1],))
 model.fit(X_train, y_train, epochs=50, batch_size=32)
+loss, accuracy = model.evaluate(X_test, y_test, verbose=0)
+
+# Save to its own directory and publish; the inference service serves the
+# registry's active "classifier" version and hot-swaps to new ones
+os.makedirs(MODEL_DIR, exist_ok=True)
+artifact = os.path.join(MODEL_DIR, "classifier.keras")
+model.save(artifact)
+version = get_registry().publish(MODEL_NAME, artifact, kind="keras",
+                                 metadata={"symbols": SYMBOLS, "timeframe": FEATURE_TIMEFRAME,
+                                           "rows": int(len(features)), "test_accuracy": float(accuracy)})
+print(f"✅ Published {MODEL_NAME} {version} (test accuracy {accuracy:.2f})")
@@ -1,20 +1,33 @@
 from sklearn.model_selection import train_test_split
 from sklearn.ensemble import RandomForestClassifier  # or your model
-import pandas as pd
+import json
+import os
+import numpy as np
+from data_loader import load_features, stage
 
-# Load data
-df = pd.read_csv("E:/EV_Files/teaka_trading_app/data/market_data.csv")
+DATA_PATH = os.environ.get("MARKET_DATA", "E:/EV_Files/teaka_trading_app/data/market_data.csv")
+SAMPLE = os.environ.get("SAMPLE")  # e.g. SAMPLE=0.1 trains on a 10% row sample
+report = {}
 
-features = df.drop("target", axis=1)
-target = df["target"]
+# Load data: chunked parse into a cached float32 feature matrix (memory-mapped on reruns)
+X, y, meta = load_features(DATA_PATH, {"sample": float(SAMPLE) if SAMPLE else None}, report=report)
+print(f"{meta['rows']} rows x {len(meta['features'])} features")
 
-# Train-test split
-X_train, X_test, y_train, y_test = train_test_split(features, target, test_size=0.2, random_state=42)
+# Train-test split (on row indices, so only the selected rows are copied out of the map)
+with stage("split", report):
+    train_idx, test_idx = train_test_split(np.arange(len(y)), test_size=0.2, random_state=42)
+    train_idx.sort()
+    test_idx.sort()
+    X_train, y_train = X[train_idx], y[train_idx]
+    X_test, y_test = X[test_idx], y[test_idx]
 
 # Build model
-model = RandomForestClassifier()
-model.fit(X_train, y_train)
+with stage("fit", report):
+    model = RandomForestClassifier(n_jobs=-1)
+    model.fit(X_train, y_train)
 
 # Evaluate
-accuracy = model.score(X_test, y_test)
+with stage("evaluate", report):
+    accuracy = model.score(X_test, y_test)
 print(f"Accuracy: {accuracy:.2f}")
+print(json.dumps(report))
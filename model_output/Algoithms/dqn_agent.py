@@ -1,13 +1,69 @@
 # algorithms/dqn_agent.py
+import copy
+import numpy as np
 import torch
 import torch.nn as nn
+import torch.nn.functional as F
+from replay_buffer import PrioritizedReplayBuffer, ReplayBuffer
 
 class DQNAgent(nn.Module):
-    def __init__(self, state_dim, action_dim):
+    def __init__(self, state_dim, action_dim, lr=1e-3, gamma=0.99, epsilon=1.0, epsilon_min=0.05,
+                 epsilon_decay=0.999, buffer_size=100000, batch_size=256, target_update=1000,
+                 prioritized=False, device="cpu"):
         super(DQNAgent, self).__init__()
         self.net = nn.Sequential(
             nn.Linear(state_dim, 128),
             nn.ReLU(),
             nn.Linear(128, action_dim)
         )
+        self.target_net = copy.deepcopy(self.net).requires_grad_(False)
+        self.to(device)
+        self.device = device
+        self.action_dim = action_dim
+        self.gamma = gamma
+        self.epsilon = epsilon
+        self.epsilon_min = epsilon_min
+        self.epsilon_decay = epsilon_decay
+        self.batch_size = batch_size
+        self.target_update = target_update
+        self.learn_steps = 0
+        self.optimizer = torch.optim.Adam(self.net.parameters(), lr=lr)
+        buffer_cls = PrioritizedReplayBuffer if prioritized else ReplayBuffer
+        self.memory = buffer_cls(buffer_size, state_dim, device=device)
+
     def forward(self, x): return self.net(x)
+
+    def select_action(self, state):
+        # Epsilon-greedy over a (num_envs, state_dim) batch with one forward
+        # pass; a single (state_dim,) state returns a plain int
+        single = np.ndim(state) == 1
+        states = torch.as_tensor(state, dtype=torch.float32, device=self.device).reshape(-1, self.net[0].in_features)
+        with torch.no_grad():
+            actions = self.net(states).argmax(dim=1)
+        explore = torch.rand(len(states), device=self.device) < self.epsilon
+        actions[explore] = torch.randint(0, self.action_dim, (int(explore.sum()),), device=self.device)
+        self.epsilon = max(self.epsilon_min, self.epsilon * self.epsilon_decay)
+        actions = actions.cpu().numpy()
+        return int(actions[0]) if single else actions
+
+    def memorize(self, state, action, reward, next_state, done):
+        self.memory.add(state, action, reward, next_state, done)
+
+    def learn(self):
+        if len(self.memory) < self.batch_size:
+            return None
+        states, actions, rewards, next_states, dones, idx, weights = self.memory.sample(self.batch_size)
+        q = self.net(states).gather(1, actions.unsqueeze(1)).squeeze(1)
+        with torch.no_grad():
+            target = rewards + self.gamma * (1.0 - dones) * self.target_net(next_states).max(dim=1).values
+        td = target - q
+        loss = (weights * F.smooth_l1_loss(q, target, reduction="none")).mean()
+        self.optimizer.zero_grad()
+        loss.backward()
+        self.optimizer.step()
+        self.memory.update_priorities(idx.cpu().numpy(), td.detach().cpu().numpy())
+
+        self.learn_steps += 1
+        if self.learn_steps % self.target_update == 0:
+            self.target_net.load_state_dict(self.net.state_dict())
+        return loss.item()
@@ -0,0 +1,122 @@
+# algorithms/replay_buffer.py
+import numpy as np
+import torch
+
+class ReplayBuffer:
+    # Ring buffer of transitions in preallocated tensors. add() takes a
+    # whole batch (one row per env) and writes it with a single indexed copy
+    # per field; nothing is stored per transition as a Python object.
+
+    def __init__(self, capacity, state_dim, device="cpu"):
+        self.capacity = capacity
+        self.device = device
+        self.states = torch.zeros((capacity, state_dim), dtype=torch.float32, device=device)
+        self.next_states = torch.zeros((capacity, state_dim), dtype=torch.float32, device=device)
+        self.actions = torch.zeros(capacity, dtype=torch.int64, device=device)
+        self.rewards = torch.zeros(capacity, dtype=torch.float32, device=device)
+        self.dones = torch.zeros(capacity, dtype=torch.float32, device=device)
+        self.pos = 0
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def add(self, states, actions, rewards, next_states, dones):
+        states = torch.as_tensor(states, dtype=torch.float32, device=self.device).reshape(-1, self.states.shape[1])
+        n = len(states)
+        if n > self.capacity:
+            # Only the newest capacity rows would survive anyway
+            skip = n - self.capacity
+            states = states[skip:]
+            actions, rewards = np.asarray(actions).reshape(-1)[skip:], np.asarray(rewards).reshape(-1)[skip:]
+            next_states, dones = np.asarray(next_states).reshape(n, -1)[skip:], np.asarray(dones).reshape(-1)[skip:]
+            n = self.capacity
+        idx = (torch.arange(n, device=self.device) + self.pos) % self.capacity
+        self.states[idx] = states
+        self.next_states[idx] = torch.as_tensor(next_states, dtype=torch.float32, device=self.device).reshape(n, -1)
+        self.actions[idx] = torch.as_tensor(actions, device=self.device).reshape(n).long()
+        self.rewards[idx] = torch.as_tensor(rewards, dtype=torch.float32, device=self.device).reshape(n)
+        self.dones[idx] = torch.as_tensor(dones, device=self.device).reshape(n).float()
+        self.pos = (self.pos + n) % self.capacity
+        self.size = min(self.size + n, self.capacity)
+        return idx
+
+    def _gather(self, idx):
+        return (self.states[idx], self.actions[idx], self.rewards[idx], self.next_states[idx], self.dones[idx])
+
+    def sample(self, batch_size):
+        # Returns (states, actions, rewards, next_states, dones, idx, weights)
+        idx = torch.randint(0, self.size, (batch_size,), device=self.device)
+        weights = torch.ones(batch_size, device=self.device)
+        return (*self._gather(idx), idx, weights)
+
+    def update_priorities(self, idx, td_errors):
+        pass
+
+class SumTree:
+    # Binary tree of priority sums stored in a flat array: node i has
+    # children 2i and 2i + 1, leaves start at `leaves`. Updates and
+    # prefix-sum searches run level by level over whole index arrays.
+
+    def __init__(self, capacity):
+        self.leaves = 1 << max(int(np.ceil(np.log2(max(capacity, 1)))), 0)
+        self.depth = int(np.log2(self.leaves))
+        self.tree = np.zeros(2 * self.leaves)
+
+    def total(self):
+        return self.tree[1]
+
+    def update(self, idx, priorities):
+        nodes = np.asarray(idx) + self.leaves
+        self.tree[nodes] = priorities
+        for _ in range(self.depth):
+            nodes = np.unique(nodes // 2)
+            self.tree[nodes] = self.tree[2 * nodes] + self.tree[2 * nodes + 1]
+
+    def get(self, idx):
+        return self.tree[np.asarray(idx) + self.leaves]
+
+    def find(self, values):
+        # Leaf index whose cumulative priority range contains each value
+        values = np.array(values, dtype=np.float64)
+        nodes = np.ones(len(values), dtype=np.int64)
+        for _ in range(self.depth):
+            left = 2 * nodes
+            go_right = values > self.tree[left]
+            values -= np.where(go_right, self.tree[left], 0.0)
+            nodes = left + go_right
+        return nodes - self.leaves
+
+class PrioritizedReplayBuffer(ReplayBuffer):
+    # Proportional prioritized replay: P(i) ~ priority_i ** alpha, with
+    # importance-sampling weights (N * P(i)) ** -beta normalised to max 1.
+
+    def __init__(self, capacity, state_dim, alpha=0.6, beta=0.4, eps=1e-6, device="cpu"):
+        super().__init__(capacity, state_dim, device)
+        self.alpha = alpha
+        self.beta = beta
+        self.eps = eps
+        self.tree = SumTree(capacity)
+        self.max_priority = 1.0
+
+    def add(self, states, actions, rewards, next_states, dones):
+        idx = super().add(states, actions, rewards, next_states, dones)
+        # New transitions get the highest priority seen so they are replayed at least once
+        self.tree.update(idx.cpu().numpy(), self.max_priority)
+        return idx
+
+    def sample(self, batch_size):
+        total = self.tree.total()
+        # Stratified: one draw from each of batch_size equal slices of the mass
+        values = (np.arange(batch_size) + np.random.random(batch_size)) * (total / batch_size)
+        idx = np.minimum(self.tree.find(np.minimum(values, total * (1 - 1e-12))), self.size - 1)
+        probs = self.tree.get(idx) / total
+        weights = (self.size * np.maximum(probs, 1e-12)) ** -self.beta
+        weights /= weights.max()
+        idx_t = torch.as_tensor(idx, device=self.device)
+        return (*self._gather(idx_t), idx_t, torch.as_tensor(weights, dtype=torch.float32, device=self.device))
+
+    def update_priorities(self, idx, td_errors):
+        priorities = (np.abs(np.asarray(td_errors, dtype=np.float64)) + self.eps) ** self.alpha
+        self.tree.update(np.asarray(idx), priorities)
+        self.max_priority = max(self.max_priority, float(priorities.max()))
@@ -0,0 +1,88 @@
+# simulation/env.py
+import json
+import os
+import numpy as np
+from gym import spaces
+from numpy.lib.stride_tricks import sliding_window_view
+
+CONFIG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "..", "Config", "backtest_config.json")
+
+def load_cost_model(path=CONFIG_PATH):
+    # (commission, slippage) as fractions of traded notional
+    try:
+        with open(path) as f:
+            config = json.load(f)
+    except (OSError, ValueError):
+        config = {}
+    return float(config.get("commission", 0.001)), float(config.get("slippage", 0.0005))
+
+class TradingEnv:
+    # Steps num_envs independent trading episodes in lockstep.
+    # data is a (T,) price series or a (T, F) feature matrix whose first
+    # column is the traded price. Observations are the last window_size bar
+    # returns of every feature, flattened to (num_envs, window_size * F).
+    # Actions per env: 0 = BUY (go long), 1 = SELL (go short, or flat when
+    # allow_short is False), 2 = HOLD (keep the position). The reward is the
+    # position's return over the next bar minus fee + slippage per unit of
+    # position changed. All envs run episode_length steps and finish
+    # together; reset() starts the next batch of episodes.
+
+    def __init__(self, data, fee=None, slippage=None, window_size=10, num_envs=1,
+                 episode_length=None, allow_short=True, seed=None, config_path=CONFIG_PATH):
+        commission, config_slippage = load_cost_model(config_path)
+        self.fee = commission if fee is None else fee
+        self.slippage = config_slippage if slippage is None else slippage
+        data = np.asarray(data, dtype=np.float64)
+        if data.ndim == 1:
+            data = data[:, None]
+        self.prices = data[:, 0]
+        self.window_size = window_size
+        self.num_envs = num_envs
+        self.allow_short = allow_short
+        max_length = len(self.prices) - window_size
+        if max_length < 1:
+            raise ValueError("data must be longer than window_size")
+        self.episode_length = max_length if episode_length is None else min(episode_length, max_length)
+
+        features = np.zeros_like(data, dtype=np.float32)
+        features[1:] = data[1:] / data[:-1] - 1.0
+        # (T - window + 1, window, F) view over the feature matrix, no copy
+        self._windows = sliding_window_view(features, window_size, axis=0).transpose(0, 2, 1)
+        self._next_return = np.append(self.prices[1:] / self.prices[:-1] - 1.0, 0.0)
+
+        self.observation_space = spaces.Box(low=-np.inf, high=np.inf, shape=(window_size * data.shape[1],), dtype=np.float32)
+        self.action_space = spaces.Discrete(3)
+        self.rng = np.random.default_rng(seed)
+        self.reset()
+
+    def reset(self):
+        first = self.window_size - 1
+        last = len(self.prices) - 1 - self.episode_length
+        self.t = first + self.rng.integers(0, last - first + 1, size=self.num_envs)
+        self.position = np.zeros(self.num_envs)
+        self.profit = np.zeros(self.num_envs)
+        self.steps = 0
+        self.done = np.zeros(self.num_envs, dtype=bool)
+        return self._observe()
+
+    def _observe(self):
+        return self._windows[self.t - (self.window_size - 1)].reshape(self.num_envs, -1)
+
+    def step(self, actions):
+        actions = np.asarray(actions).reshape(self.num_envs)
+        short = -1.0 if self.allow_short else 0.0
+        target = np.select([actions == 0, actions == 1], [1.0, short], self.position)
+        target = np.where(self.done, self.position, target)
+
+        cost = np.abs(target - self.position) * (self.fee + self.slippage)
+        reward = target * self._next_return[self.t] - cost
+        reward[self.done] = 0.0
+
+        self.position = target
+        self.profit += reward
+        self.t = np.where(self.done, self.t, self.t + 1)
+        self.steps += 1
+        if self.steps >= self.episode_length:
+            self.done[:] = True
+        info = {"profit": self.profit.copy(), "position": self.position.copy()}
+        return self._observe(), reward.astype(np.float32), self.done.copy(), info
@@ -1,17 +1,20 @@
 import gym
-from algorithms.dqn_agent import DQNAgent
+import pandas as pd
+from dqn_agent import DQNAgent
 from simulation.env import TradingEnv
 
-env = TradingEnv(data, fee=0.001)
+data = pd.read_csv('data/market_prices.csv', parse_dates=['timestamp'])['close'].to_numpy()
+# Fee and slippage default to Config/backtest_config.json; 256 episodes run in lockstep
+env = TradingEnv(data, num_envs=256, episode_length=1000)
 agent = DQNAgent(state_dim=env.observation_space.shape[0], action_dim=env.action_space.n)
 # Training loop
 for episode in range(1000):
     state = env.reset()
-    done = False
-    while not done:
-        action = agent.select_action(state)      # implement epsilon-greedy inside agent
+    done = env.done
+    while not done.all():
+        action = agent.select_action(state)      # batched epsilon-greedy
         next_state, reward, done, info = env.step(action)
         agent.memorize(state, action, reward, next_state, done)
-        agent.learn()  # update DQN using replay buffer
+        agent.learn()  # update DQN from the replay buffer
         state = next_state
-    print(f"Episode {episode}: Total Profit={info['profit']:.4f}")
+    print(f"Episode {episode}: Mean Profit={info['profit'].mean():.4f} Best={info['profit'].max():.4f}")
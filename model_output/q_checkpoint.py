@@ -0,0 +1,103 @@
+import os
+import struct
+import numpy as np
+
+# Layout (little endian):
+#   [0, 64)        header: magic, version, flags, key width, action count,
+#                  row count, alpha, gamma, epsilon, epsilon_decay
+#   [64, ...)      row count keys of `key width` bytes, sorted bytewise
+#   aligned to 64  row count x action count float32 Q-values, same order
+MAGIC = b"QTCK"
+VERSION = 1
+FLAG_DELTA = 1
+HEADER = struct.Struct("<4sHHIIQdddd")
+HEADER_SIZE = 64
+ALIGN = 64
+WRITE_CHUNK = 1 << 20
+
+def _align(offset):
+    return (offset + ALIGN - 1) // ALIGN * ALIGN
+
+def is_checkpoint(path):
+    with open(path, "rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+def write_checkpoint(path, keys, values, meta=(0.0, 0.0, 0.0, 0.0), delta=False):
+    # keys: (n,) void array of fixed-width state keys, values: (n, actions).
+    # Rows are sorted here and written through a temp file, so readers
+    # never see a half-written checkpoint.
+    values = np.asarray(values, dtype=np.float32)
+    n = len(keys)
+    key_width = keys.dtype.itemsize if n else 0
+    n_actions = values.shape[1] if values.ndim == 2 else 0
+    order = np.argsort(keys, kind="stable")
+    header = HEADER.pack(MAGIC, VERSION, FLAG_DELTA if delta else 0,
+                         key_width, n_actions, n, *meta)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(header.ljust(HEADER_SIZE, b"\0"))
+        f.write(keys[order].tobytes())
+        f.write(b"\0" * (_align(f.tell()) - f.tell()))
+        for start in range(0, n, WRITE_CHUNK):
+            f.write(values[order[start:start + WRITE_CHUNK]].astype("<f4").tobytes())
+    os.replace(tmp, path)
+
+class QTableCheckpoint:
+    # Read side of the format. With mmap=True keys and values stay
+    # file-backed (read-only pages shared by every process mapping the
+    # file); otherwise both blocks are read into memory.
+
+    def __init__(self, path, mmap=True):
+        self.path = path
+        self.mapped = False
+        with open(path, "rb") as f:
+            fields = HEADER.unpack(f.read(HEADER.size))
+        magic, version, flags, key_width, n_actions, n, *meta = fields
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a Q-table checkpoint")
+        if version != VERSION:
+            raise ValueError(f"unsupported checkpoint version {version}")
+        self.delta = bool(flags & FLAG_DELTA)
+        self.meta = tuple(meta)
+        self.n_actions = n_actions
+        self.key_dtype = np.dtype((np.void, max(key_width, 1)))
+        values_offset = _align(HEADER_SIZE + n * key_width)
+        if n == 0:
+            self.keys = np.empty(0, dtype=self.key_dtype)
+            self.values = np.empty((0, n_actions), dtype=np.float32)
+        elif mmap:
+            self.keys = np.memmap(path, dtype=self.key_dtype, mode="r", offset=HEADER_SIZE, shape=(n,))
+            self.values = np.memmap(path, dtype="<f4", mode="r", offset=values_offset, shape=(n, n_actions))
+            self.mapped = True
+        else:
+            with open(path, "rb") as f:
+                f.seek(HEADER_SIZE)
+                self.keys = np.fromfile(f, dtype=self.key_dtype, count=n)
+                f.seek(values_offset)
+                self.values = np.fromfile(f, dtype="<f4", count=n * n_actions).reshape(n, n_actions)
+
+    def detach(self):
+        # Copy file-backed blocks into memory and drop the mapping, so the
+        # file can be replaced (Windows refuses to while it is mapped)
+        if self.mapped:
+            self.keys = np.array(self.keys)
+            self.values = np.array(self.values)
+            self.mapped = False
+
+    def __len__(self):
+        return len(self.keys)
+
+    def find(self, keys):
+        # Row of each key by binary search over the sorted key block; -1 if absent
+        keys = np.asarray(keys)
+        if len(self.keys) == 0 or len(keys) == 0:
+            return np.full(len(keys), -1, dtype=np.int64)
+        if keys.dtype.itemsize != self.key_dtype.itemsize:
+            raise ValueError("state dimension does not match checkpoint")
+        keys = keys.view(self.key_dtype)
+        idx = np.searchsorted(self.keys, keys)
+        idx[idx == len(self.keys)] = 0
+        return np.where(self.keys[idx] == keys, idx, -1).astype(np.int64)
+
+    def get(self, key):
+        return int(self.find(np.frombuffer(key, dtype=np.dtype((np.void, len(key)))))[0])
@@ -1,46 +1,268 @@
 import numpy as np
 import random
 import pickle
+import os
+from q_checkpoint import QTableCheckpoint, is_checkpoint, write_checkpoint
 
 ACTIONS = ['BUY', 'SELL', 'HOLD']
+ACTION_INDEX = {a: i for i, a in enumerate(ACTIONS)}
+STATE_DECIMALS = 2
 
 class QTrader:
-    def __init__(self, alpha=0.1, gamma=0.95, epsilon=1.0, epsilon_decay=0.995):
-        self.q_table = {}  # State-Action -> Value
+    def __init__(self, alpha=0.1, gamma=0.95, epsilon=1.0, epsilon_decay=0.995, capacity=1024):
+        self.state_index = {}  # State key -> row in q_values
+        self.q_values = np.zeros((max(capacity, 1), len(ACTIONS)), dtype=np.float32)
+        self.dirty = np.zeros(len(self.q_values), dtype=bool)  # Rows changed since last save
+        self.n_states = 0
+        self.base = None  # Loaded checkpoint; q_values holds rows learned on top of it
         self.alpha = alpha
         self.gamma = gamma
         self.epsilon = epsilon
         self.epsilon_decay = epsilon_decay
 
+    def __len__(self):
+        if self.base is None:
+            return self.n_states
+        return len(self.base) + int((self.base.find(self._packed_keys()) < 0).sum())
+
     def get_state_key(self, state):
-        return tuple(np.round(state, 2))  # Discretize state
+        # Discretize state to STATE_DECIMALS and pack the integers into bytes,
+        # which hash faster and take far less memory than a tuple of floats
+        scaled = np.rint(np.asarray(state, dtype=np.float64) * 10 ** STATE_DECIMALS)
+        return scaled.astype(np.int64).tobytes()
+
+    def _grow(self, needed):
+        capacity = len(self.q_values)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        grown = np.zeros((capacity, len(ACTIONS)), dtype=np.float32)
+        grown[:self.n_states] = self.q_values[:self.n_states]
+        self.q_values = grown
+        dirty = np.zeros(capacity, dtype=bool)
+        dirty[:self.n_states] = self.dirty[:self.n_states]
+        self.dirty = dirty
+
+    def _row(self, key):
+        # Row of a state, created on first visit (seeded from the checkpoint)
+        row = self.state_index.get(key)
+        if row is None:
+            row = self.n_states
+            self._grow(row + 1)
+            self.state_index[key] = row
+            self.n_states += 1
+            if self.base is not None:
+                base_row = self.base.get(key)
+                if base_row >= 0:
+                    self.q_values[row] = self.base.values[base_row]
+        return row
+
+    def _lookup(self, key):
+        # Q-values of a state without creating it; None if never visited
+        row = self.state_index.get(key)
+        if row is not None:
+            return self.q_values[row]
+        if self.base is not None:
+            base_row = self.base.get(key)
+            if base_row >= 0:
+                return self.base.values[base_row]
+        return None
+
+    def _pack_states(self, states):
+        scaled = np.rint(np.asarray(states, dtype=np.float64).reshape(len(states), -1) * 10 ** STATE_DECIMALS)
+        scaled = np.ascontiguousarray(scaled.astype(np.int64))
+        return scaled.view(np.dtype((np.void, scaled.itemsize * scaled.shape[1]))).ravel()
+
+    def _packed_keys(self):
+        keys = [None] * self.n_states
+        for key, row in self.state_index.items():
+            keys[row] = key
+        if keys:
+            width = len(keys[0])
+        else:
+            width = self.base.key_dtype.itemsize if self.base is not None else 1
+        return np.frombuffer(b"".join(keys), dtype=np.dtype((np.void, width)))
+
+    def _state_rows(self, states, create):
+        # Discretize a whole (n, state_dim) batch at once and resolve each
+        # distinct state once; rows of unknown states are -1 unless created
+        unique, inverse = np.unique(self._pack_states(states), return_inverse=True)
+        if create:
+            rows = [self._row(k.tobytes()) for k in unique]
+        else:
+            rows = [self.state_index.get(k.tobytes(), -1) for k in unique]
+        return np.asarray(rows, dtype=np.int64)[inverse.ravel()]
+
+    def _batch_values(self, states):
+        # (n, ACTIONS) Q-values of a batch; zeros for never-visited states
+        packed = self._pack_states(states)
+        unique, inverse = np.unique(packed, return_inverse=True)
+        rows = np.asarray([self.state_index.get(k.tobytes(), -1) for k in unique], dtype=np.int64)
+        values = np.zeros((len(unique), len(ACTIONS)), dtype=np.float32)
+        known = rows >= 0
+        values[known] = self.q_values[rows[known]]
+        if self.base is not None and not known.all():
+            base_rows = self.base.find(unique[~known])
+            hit = base_rows >= 0
+            missing = np.flatnonzero(~known)
+            values[missing[hit]] = self.base.values[base_rows[hit]]
+        return values[inverse.ravel()]
+
+    def q_row(self, state):
+        # Q-values of a state as an (ACTIONS,) array; zeros if never visited
+        values = self._lookup(self.get_state_key(state))
+        if values is None:
+            return np.zeros(len(ACTIONS), dtype=np.float32)
+        return values
 
     def choose_action(self, state):
-        key = self.get_state_key(state)
         if random.random() < self.epsilon:
             return random.choice(ACTIONS)
-        if key not in self.q_table:
-            self.q_table[key] = {a: 0.0 for a in ACTIONS}
-        return max(self.q_table[key], key=self.q_table[key].get)
+        values = self._lookup(self.get_state_key(state))
+        if values is None:
+            return ACTIONS[0]
+        return ACTIONS[int(values.argmax())]
 
-    def learn(self, state, action, reward, next_state):
-        state_key = self.get_state_key(state)
-        next_key = self.get_state_key(next_state)
+    def choose_actions(self, states):
+        # Batched epsilon-greedy; returns action indices into ACTIONS
+        actions = self._batch_values(states).argmax(axis=1)
+        explore = np.random.random(len(actions)) < self.epsilon
+        actions[explore] = np.random.randint(len(ACTIONS), size=int(explore.sum()))
+        return actions
 
-        if state_key not in self.q_table:
-            self.q_table[state_key] = {a: 0.0 for a in ACTIONS}
-        if next_key not in self.q_table:
-            self.q_table[next_key] = {a: 0.0 for a in ACTIONS}
+    def learn(self, state, action, reward, next_state):
+        a = ACTION_INDEX[action] if isinstance(action, str) else int(action)
+        row = self._row(self.get_state_key(state))
+        # Unvisited next states are not stored: their Q-values are all zero
+        next_values = self._lookup(self.get_state_key(next_state))
+        max_future_q = float(next_values.max()) if next_values is not None else 0.0
 
-        current_q = self.q_table[state_key][action]
-        max_future_q = max(self.q_table[next_key].values())
-        self.q_table[state_key][action] += self.alpha * (reward + self.gamma * max_future_q - current_q)
+        current_q = float(self.q_values[row, a])
+        self.q_values[row, a] = current_q + self.alpha * (reward + self.gamma * max_future_q - current_q)
+        self.dirty[row] = True
         self.epsilon *= self.epsilon_decay
 
+    def learn_batch(self, states, actions, rewards, next_states, dones=None):
+        # One synchronous Q-learning pass over a batch of transitions: every
+        # target is computed from the table as it was before the batch, and
+        # duplicate (state, action) pairs receive their mean TD error
+        actions = np.asarray(actions)
+        if actions.dtype.kind in "US":
+            actions = np.array([ACTION_INDEX[a] for a in actions])
+        actions = actions.astype(np.int64)
+        rows = self._state_rows(states, create=True)
+        future = self._batch_values(next_states).max(axis=1)
+        self._learn_rows(rows, actions, rewards, future, dones)
+
+    def _learn_rows(self, rows, actions, rewards, future, dones=None):
+        q = self.q_values
+        if dones is not None:
+            future = np.where(np.asarray(dones, dtype=bool), 0.0, future)
+        td = np.asarray(rewards, dtype=np.float64) + self.gamma * future - q[rows, actions]
+
+        cells, inverse = np.unique(rows * len(ACTIONS) + actions, return_inverse=True)
+        inverse = inverse.ravel()
+        mean_td = np.bincount(inverse, weights=td) / np.bincount(inverse)
+        q.reshape(-1)[cells] += (self.alpha * mean_td).astype(np.float32)
+        self.dirty[rows] = True
+        self.epsilon *= self.epsilon_decay ** len(rows)
+
+    def _meta(self):
+        return (self.alpha, self.gamma, self.epsilon, self.epsilon_decay)
+
     def save(self, path):
-        with open(path, 'wb') as f:
-            pickle.dump(self.q_table, f)
+        # Full checkpoint of the loaded base plus everything learned since
+        keys = self._packed_keys()
+        values = self.q_values[:self.n_states]
+        if self.base is not None and len(self.base):
+            replaced = self.base.find(keys)
+            keep = np.ones(len(self.base), dtype=bool)
+            keep[replaced[replaced >= 0]] = False
+            keys = np.concatenate([np.asarray(self.base.keys[keep]).view(keys.dtype), keys])
+            values = np.concatenate([self.base.values[keep], values])
+        if self.base is not None and self.base.mapped and os.path.exists(path):
+            if os.path.samefile(self.base.path, path):
+                self.base.detach()  # saving over the file this trader maps
+        write_checkpoint(path, keys, values, self._meta())
+        self.dirty[:] = False
 
-    def load(self, path):
+    def save_delta(self, path):
+        # Only the rows touched since the last save (full or delta)
+        rows = np.flatnonzero(self.dirty[:self.n_states])
+        keys = self._packed_keys()[rows]
+        write_checkpoint(path, keys, self.q_values[rows], self._meta(), delta=True)
+        self.dirty[:] = False
+
+    def load(self, path, mmap=False, deltas=()):
+        # With mmap=True the checkpoint is mapped read-only and shared
+        # between processes; learning afterwards only copies touched rows.
+        # Delta checkpoints are applied on top, oldest first.
+        self.state_index = {}
+        self.n_states = 0
+        self.q_values = np.zeros((1024, len(ACTIONS)), dtype=np.float32)
+        self.dirty = np.zeros(len(self.q_values), dtype=bool)
+        self.base = None
+        if is_checkpoint(path):
+            self.base = QTableCheckpoint(path, mmap=mmap)
+        else:
+            self._load_pickle(path)
+        for delta_path in deltas:
+            delta = QTableCheckpoint(delta_path, mmap=False)
+            for key, values in zip(delta.keys, delta.values):
+                self.q_values[self._row(key.tobytes())] = values
+
+    def _load_pickle(self, path):
         with open(path, 'rb') as f:
-            self.q_table = pickle.load(f)
+            data = pickle.load(f)
+        if "q_values" not in data:
+            # Legacy format: {rounded state tuple: {action: value}}
+            keys = [self.get_state_key(np.asarray(k, dtype=np.float64)) for k in data]
+            values = np.array([[q[a] for a in ACTIONS] for q in data.values()], dtype=np.float32)
+            data = {"state_keys": keys, "q_values": values.reshape(-1, len(ACTIONS))}
+        self.state_index = {key: row for row, key in enumerate(data["state_keys"])}
+        self.n_states = len(self.state_index)
+        self._grow(self.n_states)
+        self.q_values[:self.n_states] = data["q_values"]
+
+
+def price_states(prices, lags=3):
+    # State at bar t: the last `lags` bar returns in percent, so two-decimal
+    # discretization buckets moves by one basis point
+    prices = np.asarray(prices, dtype=np.float64)
+    returns = np.zeros_like(prices)
+    returns[1:] = (prices[1:] / prices[:-1] - 1.0) * 100
+    states = np.zeros((len(prices), lags))
+    for lag in range(lags):
+        states[lag:, lag] = returns[:len(prices) - lag]
+    return states
+
+def train_offline(trader, prices, states=None, epochs=5, batch_size=65536, fee=0.0):
+    # Replays a price history through learn_batch. Rewards of every action
+    # are known offline (BUY earns the next return, SELL its negative, HOLD
+    # nothing, fees charged on trades), so each bar updates all three
+    # actions. Repeated epochs let values propagate back through time.
+    prices = np.asarray(prices, dtype=np.float64)
+    if states is None:
+        states = price_states(prices)
+    states = np.asarray(states, dtype=np.float64).reshape(len(prices), -1)
+    ret = prices[1:] / prices[:-1] - 1.0
+    rewards = np.stack([ret - fee, -ret - fee, np.zeros_like(ret)], axis=1)
+    n = len(ret)
+    n_actions = len(ACTIONS)
+    epsilon = trader.epsilon
+    # Discretize and resolve every state once; epochs then only touch arrays
+    rows = trader._state_rows(states, create=True)
+    for _ in range(epochs):
+        for start in range(0, n, batch_size):
+            stop = min(start + batch_size, n)
+            future = trader.q_values[rows[start + 1:stop + 1]].max(axis=1)
+            trader._learn_rows(
+                np.repeat(rows[start:stop], n_actions),
+                np.tile(np.arange(n_actions), stop - start),
+                rewards[start:stop].ravel(),
+                np.repeat(future, n_actions),
+            )
+    # Offline replay is not exploration; leave the schedule untouched
+    trader.epsilon = epsilon
+    return trader
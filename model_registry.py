@@ -0,0 +1,236 @@
+# File: model_registry.py
+# Versioned model artifacts with lazy loading and hot swap.
+#
+#   <root>/<name>/<version>/artifact...   the saved model (file or directory)
+#   <root>/<name>/<version>/meta.json     kind, created, size, user metadata
+#   <root>/<name>/CURRENT                 the version being served
+#
+# Versions are published into a temp directory and renamed into place, and
+# CURRENT is swapped with os.replace, so readers never see a partial model.
+# Loaded models live in an in-process LRU bounded by a memory budget
+# (estimated from artifact size); the version each ModelHandle serves is
+# pinned and never evicted. A handle switches to a new version only after
+# it has been loaded (and warmed up) in the background, with one reference
+# assignment: in-flight requests finish on the model they started with and
+# no request waits for a cold load.
+import json
+import os
+import re
+import shutil
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_ROOT = os.path.join(ROOT, "models")
+DEFAULT_BUDGET = 2 * 1024 ** 3
+CHECK_INTERVAL = 5.0
+VERSION_NAME = re.compile(r"v\d+")
+
+def _load_keras(path):
+    import tensorflow as tf
+    return tf.keras.models.load_model(path)
+
+def _load_pickle(path):
+    import pickle
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+def _load_qtrader(path):
+    sys.path.append(os.path.join(ROOT, "model_output"))
+    from q_learning_trader import QTrader
+    trader = QTrader(epsilon=0.0)
+    trader.load(path, mmap=True)
+    return trader
+
+LOADERS = {"keras": _load_keras, "pickle": _load_pickle, "qtrader": _load_qtrader}
+
+def register_loader(kind, loader):
+    LOADERS[kind] = loader
+
+def _size_on_disk(path):
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(d, f)) for d, _, files in os.walk(path) for f in files)
+
+class ModelRegistry:
+    def __init__(self, root=DEFAULT_ROOT, budget_bytes=DEFAULT_BUDGET):
+        self.root = root
+        self.budget_bytes = budget_bytes
+        self._loaded = OrderedDict()  # (name, version) -> (model, size), least recently used first
+        self._loaded_bytes = 0
+        self._pinned = {}             # (name, version) -> number of handles serving it
+        self._lock = threading.Lock()
+        self._loading = {}            # (name, version) -> lock held while that version loads
+        self._handles = {}
+
+    def _dir(self, name, version=None):
+        return os.path.join(self.root, name, version) if version else os.path.join(self.root, name)
+
+    def versions(self, name):
+        try:
+            entries = os.listdir(self._dir(name))
+        except FileNotFoundError:
+            return []
+        # Only published versions: vNNNN, not a vNNNN.tmp still being written
+        return sorted(v for v in entries if VERSION_NAME.fullmatch(v)
+                      and os.path.exists(os.path.join(self._dir(name, v), "meta.json")))
+
+    def metadata(self, name, version):
+        with open(os.path.join(self._dir(name, version), "meta.json")) as f:
+            return json.load(f)
+
+    def current(self, name):
+        try:
+            with open(os.path.join(self._dir(name), "CURRENT")) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def publish(self, name, artifact, kind, metadata=None, activate=True):
+        # Copies a saved model (file or directory) in as the next version
+        os.makedirs(self._dir(name), exist_ok=True)
+        existing = self.versions(name)
+        number = int(existing[-1][1:]) + 1 if existing else 1
+        while True:
+            version = f"v{number:04d}"
+            tmp = self._dir(name, version) + ".tmp"
+            try:
+                os.mkdir(tmp)  # claims the number against concurrent publishers
+                break
+            except FileExistsError:
+                number += 1
+        target = os.path.join(tmp, os.path.basename(os.path.normpath(artifact)))
+        if os.path.isdir(artifact):
+            shutil.copytree(artifact, target)
+        else:
+            shutil.copy2(artifact, target)
+        meta = {"name": name, "version": version, "kind": kind, "artifact": os.path.basename(target),
+                "size_bytes": _size_on_disk(target), "created": time.time(), "metadata": metadata or {}}
+        with open(os.path.join(tmp, "meta.json"), "w") as f:
+            json.dump(meta, f, indent=2)
+        os.replace(tmp, self._dir(name, version))
+        if activate:
+            self.activate(name, version)
+        return version
+
+    def activate(self, name, version):
+        if version not in self.versions(name):
+            raise KeyError(f"{name} has no version {version}")
+        path = os.path.join(self._dir(name), "CURRENT")
+        with open(path + ".tmp", "w") as f:
+            f.write(version)
+        os.replace(path + ".tmp", path)
+
+    def get(self, name, version=None):
+        # The loaded model for name/version (CURRENT by default), loading it
+        # on first use; concurrent callers share a single load
+        version = version or self.current(name)
+        if version is None:
+            raise KeyError(f"no active version of {name}")
+        key = (name, version)
+        with self._lock:
+            if key in self._loaded:
+                self._loaded.move_to_end(key)
+                return self._loaded[key][0]
+            loading = self._loading.setdefault(key, threading.Lock())
+        with loading:
+            with self._lock:
+                if key in self._loaded:
+                    return self._loaded[key][0]
+            meta = self.metadata(name, version)
+            model = LOADERS[meta["kind"]](os.path.join(self._dir(name, version), meta["artifact"]))
+            with self._lock:
+                self._loaded[key] = (model, meta["size_bytes"])
+                self._loaded_bytes += meta["size_bytes"]
+                self._loading.pop(key, None)
+                self._evict()
+            return model
+
+    def _evict(self):
+        for key in list(self._loaded):
+            if self._loaded_bytes <= self.budget_bytes:
+                break
+            if self._pinned.get(key):
+                continue
+            _, size = self._loaded.pop(key)
+            self._loaded_bytes -= size
+
+    def _pin(self, key, delta):
+        with self._lock:
+            self._pinned[key] = self._pinned.get(key, 0) + delta
+            if self._pinned[key] <= 0:
+                del self._pinned[key]
+                self._evict()
+
+    def loaded(self):
+        with self._lock:
+            return {key: size for key, (_, size) in self._loaded.items()}
+
+    def handle(self, name, warmup=None, check_interval=CHECK_INTERVAL):
+        with self._lock:
+            if name not in self._handles:
+                self._handles[name] = ModelHandle(self, name, warmup, check_interval)
+            return self._handles[name]
+
+class ModelHandle:
+    # What the serving path holds on to. `model` returns the active model;
+    # at most every check_interval seconds it also stats CURRENT and, when
+    # another version was activated (by this or another process), loads and
+    # warms it on a background thread before swapping it in.
+
+    def __init__(self, registry, name, warmup=None, check_interval=CHECK_INTERVAL):
+        self.registry = registry
+        self.name = name
+        self.warmup = warmup
+        self.check_interval = check_interval
+        self._active = None          # (version, model), replaced as a whole
+        self._next_check = 0.0
+        self._swapping = threading.Lock()
+
+    @property
+    def version(self):
+        active = self._active
+        return active[0] if active else None
+
+    @property
+    def model(self):
+        active = self._active
+        if active is None:
+            self.swap(self.registry.current(self.name))  # first use loads in the caller
+            active = self._active
+        elif time.monotonic() >= self._next_check:
+            self._next_check = time.monotonic() + self.check_interval
+            latest = self.registry.current(self.name)
+            if latest and latest != active[0] and not self._swapping.locked():
+                threading.Thread(target=self.swap, args=(latest,), daemon=True).start()
+        return active[1]
+
+    def swap(self, version):
+        # Loads and warms `version`, then makes it the active model
+        if version is None:
+            raise KeyError(f"no active version of {self.name}")
+        with self._swapping:
+            if self._active and self._active[0] == version:
+                return
+            model = self.registry.get(self.name, version)
+            if self.warmup is not None:
+                self.warmup(model)
+            self.registry._pin((self.name, version), 1)
+            previous, self._active = self._active, (version, model)
+            if previous is not None:
+                self.registry._pin((self.name, previous[0]), -1)
+
+    def promote(self, version):
+        # Activates `version` for every process and swaps this one right away
+        self.registry.activate(self.name, version)
+        self.swap(version)
+
+_default_registry = None
+
+def get_registry(root=DEFAULT_ROOT):
+    global _default_registry
+    if _default_registry is None or _default_registry.root != root:
+        _default_registry = ModelRegistry(root)
+    return _default_registry
@@ -1,33 +1,52 @@
 # File: ev_alert_api.py
+import os
+import sys
 from flask import Flask, request, jsonify
-import requests
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from alert_dispatcher import AlertDispatcher, TELEGRAM_API
 
 app = Flask(__name__)
 
-TELEGRAM_BOT_TOKEN = "AAFAf-5JT1yKg7c6gsk6p3UWYqiy249BPUc"
-TELEGRAM_CHAT_ID = "123456789"  # Replace with real one
+# Credentials come from the environment only; without them no dispatcher
+# is started and the alert routes answer 503
+TELEGRAM_BOT_TOKEN = os.environ.get("TELEGRAM_BOT_TOKEN")
+TELEGRAM_CHAT_ID = os.environ.get("TELEGRAM_CHAT_ID")
+
+# Alerts are queued here and sent by a background thread, see alert_dispatcher.py
+if TELEGRAM_BOT_TOKEN and TELEGRAM_CHAT_ID:
+    dispatcher = AlertDispatcher(TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID,
+                                 api_base=os.environ.get("TELEGRAM_API", TELEGRAM_API))
+else:
+    dispatcher = None
+    print("⚠️ TELEGRAM_BOT_TOKEN / TELEGRAM_CHAT_ID not set, Telegram alerts disabled")
+
+NOT_CONFIGURED = {"status": "dropped", "error": "Telegram alerts are not configured"}
 
-def send_telegram_alert(message):
-    url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
-    data = {"chat_id": TELEGRAM_CHAT_ID, "text": message}
-    response = requests.post(url, json=data)
-    return response.json()
+def send_telegram_alert(message, key=None):
+    return dispatcher.submit(message, key)
 
 @app.route("/api/alert", methods=["POST"])
 def receive_alert():
     data = request.get_json()
     message = data.get("message", "No message received.")
     print(f"[ALERT RECEIVED] {message}")
-    send_telegram_alert(message)
-    return jsonify({"status": "sent", "message": message})
+    if dispatcher is None:
+        return jsonify(NOT_CONFIGURED), 503
+    if not send_telegram_alert(message, data.get("asset")):
+        return jsonify({"status": "dropped", "error": "alert queue full"}), 503
+    return jsonify({"status": "queued", "message": message}), 202
 
 @app.route("/api/auto-exit", methods=["POST"])
 def auto_exit_trigger():
     trade = request.get_json()
     asset = trade.get("asset", "Unknown")
     reason = trade.get("reason", "N/A")
-    send_telegram_alert(f"⚠️ Auto-exit triggered for {asset}: {reason}")
-    return jsonify({"status": "auto-exit sent", "asset": asset})
+    if dispatcher is None:
+        return jsonify(dict(NOT_CONFIGURED, asset=asset)), 503
+    if not send_telegram_alert(f"⚠️ Auto-exit triggered for {asset}: {reason}", asset):
+        return jsonify({"status": "dropped", "error": "alert queue full", "asset": asset}), 503
+    return jsonify({"status": "auto-exit queued", "asset": asset}), 202
 
 if __name__ == "__main__":
     app.run(port=5051)
@@ -0,0 +1,345 @@
+# File: risk_engine.py
+# Portfolio risk kept up to date tick by tick; the Python counterpart of
+# riskManagementService.ts. update() takes one aligned set of prices (a
+# bar close per asset) and folds the new return vector into rolling
+# window sums:
+#
+#   sum   (n,)    running sum of returns over the window
+#   cross (n, n)  running sum of outer(r, r)
+#
+# so mean, covariance, correlation and volatility cost O(assets^2) per
+# tick instead of O(assets^2 * window). The sums are rebuilt from the
+# ring buffer once per window to stop rounding drift (amortized O(n^2)).
+#
+# Historical VaR/CVaR use the P&L the current holdings would have made on
+# each price change in the window; that series is kept sorted, gains one
+# value and loses one per tick, and is only recomputed when positions
+# change. Parametric VaR/CVaR use the covariance. validate() answers the
+# validatePosition checks from this cached state in microseconds.
+#
+# VaR, CVaR and stress losses are signed like the TS service: a loss is
+# a negative amount.
+import bisect
+import math
+import threading
+from statistics import NormalDist
+import numpy as np
+
+WINDOW = 252
+CONFIDENCE = 0.95
+PERIODS_PER_YEAR = 252
+RISK_FREE_RATE = 0.02
+CORRELATION_THRESHOLD = 0.7
+
+DEFAULT_LIMITS = {
+    "max_position_size": 0.2,       # 20% of capital per position
+    "max_portfolio_exposure": 0.8,  # 80% of capital
+    "max_drawdown": 0.15,
+    "stop_loss_threshold": 0.05,
+    "volatility_threshold": 0.3,    # annualized
+}
+
+STRESS_SCENARIOS = {
+    "Market Crash": (-0.20, 0.05),
+    "Currency Crisis": (-0.15, 0.08),
+    "Political Event": (-0.10, 0.12),
+    "Natural Disaster": (-0.12, 0.07),
+    "Tech Bubble": (-0.25, 0.10),
+    "Interest Rate Hike": (-0.08, 0.15),
+}
+
+class RiskEngine:
+    def __init__(self, symbols=(), window=WINDOW, confidence=CONFIDENCE, limits=None,
+                 capital=None, periods_per_year=PERIODS_PER_YEAR):
+        if window < 2:
+            raise ValueError("window must be at least 2")
+        self.window = window
+        self.confidence = confidence
+        self.limits = dict(DEFAULT_LIMITS, **(limits or {}))
+        self.capital = capital      # account equity; defaults to the marked portfolio value
+        self.periods_per_year = periods_per_year
+        self.symbols = []
+        self.index = {}
+        self.prices = np.zeros(0)
+        self.quantities = np.zeros(0)
+        self.entry_prices = np.zeros(0)
+        self._returns = np.zeros((window, 0))   # ring buffers, one row per tick
+        self._moves = np.zeros((window, 0))     # price changes, for holdings P&L
+        self._pos = 0
+        self.count = 0                          # rows currently in the window
+        self._since_resync = 0
+        self._sum = np.zeros(0)
+        self._cross = np.zeros((0, 0))
+        self._pnl = np.zeros(window)            # holdings P&L per ring row
+        self._sorted_pnl = []
+        self._pnl_stale = True
+        self.value = 0.0
+        self.gross = 0.0
+        self.peak = 0.0
+        self.drawdown = 0.0
+        self.max_drawdown = 0.0
+        self._stats()
+        self._lock = threading.Lock()
+        for symbol in symbols:
+            self._add_symbol(symbol)
+        self._stats()
+
+    def _add_symbol(self, symbol):
+        # A new asset starts with zero returns in the existing rows, so its
+        # statistics are understated until a full window has passed
+        self.index[symbol] = len(self.symbols)
+        self.symbols.append(symbol)
+        n = len(self.symbols)
+        self.prices = np.append(self.prices, 0.0)
+        self.quantities = np.append(self.quantities, 0.0)
+        self.entry_prices = np.append(self.entry_prices, 0.0)
+        self._returns = np.hstack([self._returns, np.zeros((self.window, 1))])
+        self._moves = np.hstack([self._moves, np.zeros((self.window, 1))])
+        self._sum = np.append(self._sum, 0.0)
+        cross = np.zeros((n, n))
+        cross[:-1, :-1] = self._cross
+        self._cross = cross
+
+    def update(self, prices):
+        # prices: {symbol: price} for this tick; assets left out keep their
+        # last price (zero return). Returns the number of rows in the window.
+        with self._lock:
+            for symbol in prices:
+                if symbol not in self.index:
+                    self._add_symbol(symbol)
+            new = self.prices.copy()
+            for symbol, price in prices.items():
+                new[self.index[symbol]] = float(price)
+            seen = self.prices > 0
+            moves = np.where(seen, new - self.prices, 0.0)
+            r = np.divide(moves, self.prices, out=np.zeros_like(moves), where=seen)
+            self.prices = new
+
+            slot = self._pos
+            if self.count == self.window:
+                old = self._returns[slot]
+                self._sum -= old
+                self._cross -= np.outer(old, old)
+            self._returns[slot] = r
+            self._moves[slot] = moves
+            self._sum += r
+            self._cross += np.outer(r, r)
+            self._pos = (slot + 1) % self.window
+            full = self.count == self.window
+            self.count = min(self.count + 1, self.window)
+            self._since_resync += 1
+            if self._since_resync >= self.window:
+                self._resync()
+
+            if not self._pnl_stale:
+                if full:
+                    old_pnl = self._pnl[slot]
+                    del self._sorted_pnl[bisect.bisect_left(self._sorted_pnl, old_pnl)]
+                pnl = float(moves @ self.quantities)
+                self._pnl[slot] = pnl
+                bisect.insort(self._sorted_pnl, pnl)
+            self._stats()
+            self._mark()
+            return self.count
+
+    def _rows(self):
+        # Ring rows in use, oldest first
+        if self.count < self.window:
+            return np.arange(self.count)
+        return (np.arange(self.window) + self._pos) % self.window
+
+    def _resync(self):
+        rows = self._returns[self._rows()]
+        self._sum = rows.sum(axis=0)
+        self._cross = rows.T @ rows
+        self._since_resync = 0
+
+    def _stats(self):
+        n, k = len(self.symbols), self.count
+        self.mean = self._sum / k if k else np.zeros(n)
+        if k < 2:
+            self.cov = np.zeros((n, n))
+        else:
+            self.cov = (self._cross - k * np.outer(self.mean, self.mean)) / (k - 1)
+        std = np.sqrt(np.clip(np.diag(self.cov), 0.0, None))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            corr = self.cov / np.outer(std, std)
+        corr[~np.isfinite(corr)] = 0.0
+        np.fill_diagonal(corr, 1.0)
+        self.corr = corr
+        self.volatility = std * math.sqrt(self.periods_per_year)
+
+    def _mark(self):
+        exposures = self.quantities * self.prices
+        self.value = float(exposures.sum())
+        self.gross = float(np.abs(exposures).sum())
+        if self.value > self.peak:
+            self.peak = self.value
+        self.drawdown = (self.peak - self.value) / self.peak if self.peak > 0 else 0.0
+        self.max_drawdown = max(self.max_drawdown, self.drawdown)
+
+    def _refresh_pnl(self):
+        rows = self._rows()
+        self._pnl[rows] = self._moves[rows] @ self.quantities
+        self._sorted_pnl = sorted(self._pnl[rows].tolist())
+        self._pnl_stale = False
+
+    def snapshot(self):
+        # Copy of the state the stress engine simulates from: exposures,
+        # return mean/covariance and the window's return rows (oldest first)
+        with self._lock:
+            return {
+                "symbols": list(self.symbols),
+                "exposures": self.quantities * self.prices,
+                "mean": self.mean.copy(),
+                "cov": self.cov.copy(),
+                "returns": self._returns[self._rows()],
+                "value": self.value,
+                "capital": self.capital,
+            }
+
+    def set_position(self, symbol, quantity, entry_price=None):
+        with self._lock:
+            if symbol not in self.index:
+                self._add_symbol(symbol)
+                self._stats()
+            i = self.index[symbol]
+            self.quantities[i] = float(quantity)
+            if entry_price is not None:
+                self.entry_prices[i] = float(entry_price)
+            elif not quantity:
+                self.entry_prices[i] = 0.0
+            self._pnl_stale = True
+            self._mark()
+
+    def set_positions(self, positions):
+        # {symbol: quantity} or {symbol: {"quantity", "entry_price"}}
+        for symbol, position in positions.items():
+            if isinstance(position, dict):
+                self.set_position(symbol, position.get("quantity", 0), position.get("entry_price"))
+            else:
+                self.set_position(symbol, position)
+
+    def value_at_risk(self):
+        # Historical and parametric VaR/CVaR of the current holdings over
+        # one period, as signed amounts (losses are negative)
+        with self._lock:
+            if self._pnl_stale:
+                self._refresh_pnl()
+            out = {"historical_var": 0.0, "historical_cvar": 0.0, "parametric_var": 0.0, "parametric_cvar": 0.0}
+            pnl = self._sorted_pnl
+            if pnl:
+                cut = int(len(pnl) * (1 - self.confidence))
+                tail = pnl[:cut] or pnl[:1]
+                out["historical_var"] = pnl[cut]
+                out["historical_cvar"] = sum(tail) / len(tail)
+            exposures = self.quantities * self.prices
+            if self.count >= 2:
+                mu = float(exposures @ self.mean)
+                sigma = math.sqrt(max(float(exposures @ self.cov @ exposures), 0.0))
+                alpha = 1 - self.confidence
+                z = NormalDist().inv_cdf(alpha)
+                out["parametric_var"] = mu + z * sigma
+                out["parametric_cvar"] = mu - sigma * NormalDist().pdf(z) / alpha
+            return out
+
+    def metrics(self):
+        var = self.value_at_risk()
+        with self._lock:
+            weights = self.quantities * self.prices / self.value if self.value else np.zeros(len(self.symbols))
+            period_vol = math.sqrt(max(float(weights @ self.cov @ weights), 0.0))
+            annual_vol = period_vol * math.sqrt(self.periods_per_year)
+            annual_return = float(weights @ self.mean) * self.periods_per_year
+            pnl = np.array(self._sorted_pnl)
+            wins, losses = pnl[pnl > 0], pnl[pnl < 0]
+            kelly = 0.0
+            if len(wins) and len(losses):
+                p = len(wins) / len(pnl)
+                kelly = p * wins.mean() / abs(losses.mean()) - (1 - p)
+            upper = np.triu_indices(len(self.symbols), 1)
+            return dict(
+                var,
+                portfolio_value=self.value,
+                gross_exposure=self.gross,
+                volatility=annual_vol,
+                sharpe_ratio=(annual_return - RISK_FREE_RATE) / annual_vol if annual_vol else 0.0,
+                drawdown=self.drawdown,
+                max_drawdown=self.max_drawdown,
+                kelly_fraction=float(kelly),
+                observations=self.count,
+                asset_volatility={s: float(self.volatility[i]) for s, i in self.index.items()},
+                correlations={f"{self.symbols[i]}_{self.symbols[j]}": float(self.corr[i, j]) for i, j in zip(*upper)},
+                stress_tests=self._stress_tests(),
+            )
+
+    def _stress_tests(self):
+        held = [s for s, i in self.index.items() if self.quantities[i]]
+        impacted = {
+            "Market Crash": held,
+            "Currency Crisis": [s for s in held if "/" in s],
+            "Tech Bubble": [s for s in held if s in ("BTC", "ETH", "SOL")],
+        }
+        return [{"scenario": name, "potential_loss": self.value * shock, "probability": probability,
+                 "impacted_assets": impacted.get(name, [])}
+                for name, (shock, probability) in STRESS_SCENARIOS.items()]
+
+    def correlation(self, symbol1, symbol2):
+        i, j = self.index.get(symbol1), self.index.get(symbol2)
+        if i is None or j is None:
+            return 0.0
+        return float(self.corr[i, j])
+
+    def validate(self, symbol, size, price=None):
+        # Pre-trade checks (the validatePosition rules): position size and
+        # total exposure against capital, asset volatility, and correlation
+        # with assets already held. Reads cached state only.
+        with self._lock:
+            i = self.index.get(symbol)
+            if price is None:
+                price = self.prices[i] if i is not None else 0.0
+            notional = abs(float(size) * float(price))
+            capital = self.capital if self.capital is not None else self.value
+            reasons = []
+            if capital <= 0:
+                reasons.append("No capital to size the position against")
+            else:
+                limits = self.limits
+                if notional / capital > limits["max_position_size"]:
+                    reasons.append("Position size exceeds maximum allowed exposure")
+                if (self.gross + notional) / capital > limits["max_portfolio_exposure"]:
+                    reasons.append("Total portfolio exposure would exceed limit")
+            if i is not None:
+                if self.volatility[i] > self.limits["volatility_threshold"]:
+                    reasons.append("Asset volatility exceeds threshold")
+                held = self.quantities != 0
+                held[i] = False
+                correlated = np.flatnonzero(held & (np.abs(self.corr[i]) > CORRELATION_THRESHOLD))
+                if len(correlated):
+                    names = ", ".join(self.symbols[j] for j in correlated)
+                    reasons.append(f"High correlation with existing positions: {names}")
+            return {"valid": not reasons, "reasons": reasons}
+
+    def monitor_positions(self):
+        # Stop-loss and drawdown breaches of the open positions
+        with self._lock:
+            alerts = []
+            for symbol, i in self.index.items():
+                entry = self.entry_prices[i]
+                if not self.quantities[i] or entry <= 0 or self.prices[i] <= 0:
+                    continue
+                move = (self.prices[i] - entry) / entry * (1 if self.quantities[i] > 0 else -1)
+                if move < -self.limits["max_drawdown"]:
+                    alerts.append({"symbol": symbol, "type": "drawdown", "drawdown": move})
+                elif move < -self.limits["stop_loss_threshold"]:
+                    alerts.append({"symbol": symbol, "type": "stop_loss", "drawdown": move})
+            return alerts
+
+_engine = None
+_engine_lock = threading.Lock()
+
+def get_risk_engine():
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = RiskEngine()
+        return _engine
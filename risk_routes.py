@@ -0,0 +1,75 @@
+# File: risk_routes.py
+import threading
+from flask import Blueprint, request, jsonify
+from risk_engine import get_risk_engine
+from db_utils import connect, table_exists
+from stress_engine import HORIZON, load_positions, stress_test
+
+MAX_STRESS_PATHS = 1000000
+stress_running = threading.Lock()
+
+risk_bp = Blueprint('risk_bp', __name__)
+
+@risk_bp.route('/api/risk/prices', methods=['POST'])
+def update_prices():
+    # {"prices": {"BTC": 64000.5, ...}}: one aligned tick
+    prices = (request.get_json(silent=True) or {}).get("prices")
+    if not isinstance(prices, dict) or not prices:
+        return jsonify({"error": "prices must be a non-empty object"}), 400
+    try:
+        count = get_risk_engine().update(prices)
+    except (TypeError, ValueError):
+        return jsonify({"error": "prices must be numbers"}), 400
+    return jsonify({"observations": count})
+
+@risk_bp.route('/api/risk/positions', methods=['POST'])
+def update_positions():
+    # {"positions": {"BTC": 0.5}} or {"positions": {"BTC": {"quantity", "entry_price"}}}
+    positions = (request.get_json(silent=True) or {}).get("positions")
+    if not isinstance(positions, dict):
+        return jsonify({"error": "positions must be an object"}), 400
+    try:
+        get_risk_engine().set_positions(positions)
+    except (TypeError, ValueError):
+        return jsonify({"error": "quantities must be numbers"}), 400
+    return jsonify({"status": "ok"})
+
+@risk_bp.route('/api/risk/metrics')
+def risk_metrics():
+    return jsonify(get_risk_engine().metrics())
+
+@risk_bp.route('/api/risk/alerts')
+def risk_alerts():
+    return jsonify(get_risk_engine().monitor_positions())
+
+@risk_bp.route('/api/risk/validate', methods=['POST'])
+def validate_position():
+    data = request.get_json(silent=True) or {}
+    if "symbol" not in data or "size" not in data:
+        return jsonify({"error": "symbol and size are required"}), 400
+    try:
+        return jsonify(get_risk_engine().validate(data["symbol"], data["size"], data.get("price")))
+    except (TypeError, ValueError):
+        return jsonify({"error": "size and price must be numbers"}), 400
+
+@risk_bp.route('/api/risk/stress')
+def stress():
+    # ?user_id=&paths=&horizon=&seed=: Monte Carlo and bootstrap distributions
+    # for the open rows of the positions table. One run at a time per process.
+    args = request.args
+    paths = min(max(args.get("paths", 100000, type=int), 1), MAX_STRESS_PATHS)
+    horizon = min(max(args.get("horizon", HORIZON, type=int), 1), 252)
+    if not stress_running.acquire(blocking=False):
+        return jsonify({"error": "a stress run is already in progress"}), 503, {"Retry-After": "5"}
+    try:
+        conn = connect()
+        try:
+            if not table_exists(conn, "positions"):
+                return jsonify({"error": "positions table not found"}), 404
+            positions = load_positions(conn, args.get("user_id", type=int))
+        finally:
+            conn.close()
+        return jsonify(stress_test(get_risk_engine(), positions=positions, paths=paths, horizon=horizon,
+                                   seed=args.get("seed", 0, type=int)))
+    finally:
+        stress_running.release()
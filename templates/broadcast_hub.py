@@ -0,0 +1,125 @@
+import asyncio
+import json
+import time
+import websockets
+
+# A client whose socket buffer holds more than this is treated as slow
+HIGH_WATER = 64 * 1024
+
+class Subscriber:
+    # One connected client. Bars that cannot be written straight away wait
+    # in `pending`, which holds at most one bar per symbol: a slow client has
+    # older bars of a symbol replaced by the newest one (conflation), so its
+    # backlog is bounded by the number of symbols.
+
+    def __init__(self, websocket, symbols=None):
+        self.websocket = websocket
+        self.symbols = set(symbols) if symbols else None
+        self.pending = {}  # symbol -> latest serialized bar not yet sent
+        self.conflated = 0
+        self.flusher = None
+
+    def offer(self, symbol, payload):
+        if symbol in self.pending:
+            del self.pending[symbol]  # re-insert at the end to keep arrival order
+            self.conflated += 1
+        self.pending[symbol] = payload
+
+    def take(self):
+        batch = list(self.pending.values())
+        self.pending.clear()
+        return batch
+
+    def busy(self):
+        # Bars queued, or a flusher still awaiting sends it already took:
+        # writing directly now could overtake them
+        return bool(self.pending) or (self.flusher is not None and not self.flusher.done())
+
+    def congested(self):
+        transport = getattr(self.websocket, "transport", None)
+        return transport is not None and transport.get_write_buffer_size() > HIGH_WATER
+
+class BroadcastHub:
+    # One producer publishes each bar once: it is serialized a single time and
+    # written synchronously to every interested client that keeps up
+    # (websockets.broadcast, no task per client). Slow clients get the bar in
+    # their conflating mailbox instead, drained by a task that respects flow
+    # control and exits once the client has caught up.
+
+    def __init__(self):
+        self._subscribers = set()
+        self._all = set()
+        self._by_symbol = {}
+        self.latest = {}  # symbol -> last serialized bar, replayed to new subscribers
+
+    def __len__(self):
+        return len(self._subscribers)
+
+    def subscribe(self, websocket, symbols=None):
+        sub = Subscriber(websocket, symbols)
+        self._subscribers.add(sub)
+        if sub.symbols is None:
+            self._all.add(sub)
+        else:
+            for symbol in sub.symbols:
+                self._by_symbol.setdefault(symbol, set()).add(sub)
+        for symbol, payload in self.latest.items():
+            if sub.symbols is None or symbol in sub.symbols:
+                sub.offer(symbol, payload)
+        if sub.pending:
+            self._flush_later(sub)
+        return sub
+
+    def unsubscribe(self, sub):
+        self._subscribers.discard(sub)
+        self._all.discard(sub)
+        for symbol in sub.symbols or ():
+            subs = self._by_symbol.get(symbol)
+            if subs is not None:
+                subs.discard(sub)
+                if not subs:
+                    del self._by_symbol[symbol]
+        if sub.flusher is not None:
+            sub.flusher.cancel()
+
+    def publish(self, symbol, bar):
+        payload = json.dumps(bar)
+        self.latest[symbol] = payload
+        direct = []
+        for subs in (self._all, self._by_symbol.get(symbol, ())):
+            for sub in subs:
+                if sub.busy() or sub.congested():
+                    sub.offer(symbol, payload)
+                    self._flush_later(sub)
+                else:
+                    direct.append(sub.websocket)
+        if direct:
+            websockets.broadcast(direct, payload)
+        return payload
+
+    def _flush_later(self, sub):
+        if sub.flusher is None or sub.flusher.done():
+            sub.flusher = asyncio.get_running_loop().create_task(self._flush(sub))
+
+    async def _flush(self, sub):
+        try:
+            while sub.pending:
+                for payload in sub.take():
+                    await sub.websocket.send(payload)
+        except websockets.ConnectionClosed:
+            self.unsubscribe(sub)
+
+    async def run(self, source, interval=1.0):
+        # source() returns an iterable of (symbol, bar) for the current tick
+        while True:
+            started = time.monotonic()
+            for symbol, bar in source():
+                self.publish(symbol, bar)
+            await asyncio.sleep(max(0.0, interval - (time.monotonic() - started)))
+
+    async def serve(self, websocket, symbols=None):
+        sub = self.subscribe(websocket, symbols)
+        try:
+            await websocket.wait_closed()
+        finally:
+            self.unsubscribe(sub)
@@ -1,14 +1,20 @@
 import asyncio
 import websockets
-import json
 import random
 import time
+from urllib.parse import parse_qs, urlparse
+from broadcast_hub import BroadcastHub
 
-async def price_feed(websocket, path):
-    while True:
-        now = int(time.time()) * 1000
+SYMBOLS = ["BTC-USDT", "ETH-USDT", "SOL-USDT"]
+
+hub = BroadcastHub()
+
+def random_bars():
+    now = int(time.time()) * 1000
+    for symbol in SYMBOLS:
         price = round(random.uniform(101, 104), 2)
-        bar = {
+        yield symbol, {
+            "symbol": symbol,
             "time": now,
             "open": price - 0.5,
             "high": price + 0.8,
@@ -16,11 +22,24 @@ async def price_feed(websocket, path):
             "close": price,
             "volume": random.randint(1000, 3000)
         }
-        await websocket.send(json.dumps(bar))
-        await asyncio.sleep(1)
 
-start_server = websockets.serve(price_feed, "localhost", 8765)
+async def price_feed(websocket, path=None):
+    # ws://host:8765/?symbols=BTC-USDT,ETH-USDT limits the stream to those
+    # symbols; without it the client receives every symbol
+    if path is None:
+        request = getattr(websocket, "request", None)
+        path = request.path if request is not None else getattr(websocket, "path", "/")
+    query = parse_qs(urlparse(path).query)
+    symbols = [s for value in query.get("symbols", []) for s in value.split(",") if s]
+    try:
+        await hub.serve(websocket, symbols or None)
+    except websockets.ConnectionClosed:
+        pass
+
+async def main():
+    async with websockets.serve(price_feed, "localhost", 8765):
+        print("✅ WebSocket server running at ws://localhost:8765")
+        await hub.run(random_bars, interval=1.0)
 
-asyncio.get_event_loop().run_until_complete(start_server)
-print("✅ WebSocket server running at ws://localhost:8765")
-asyncio.get_event_loop().run_forever()
+if __name__ == "__main__":
+    asyncio.run(main())
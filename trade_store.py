@@ -0,0 +1,257 @@
+# File: trade_store.py
+import json
+import os
+import threading
+from array import array
+from bisect import bisect_left
+from datetime import datetime, timezone
+
+STARTING_BALANCE = 5000
+FINGERPRINT_BYTES = 64
+
+
+def timestamp_key(value):
+    # Epoch milliseconds for numbers, numeric strings and ISO-8601 strings;
+    # numbers small enough to be epoch seconds are scaled up.
+    if value is None or value == "":
+        return float("-inf")
+    if isinstance(value, str):
+        try:
+            value = float(value)
+        except ValueError:
+            dt = datetime.fromisoformat(value.replace("Z", "+00:00"))
+            if dt.tzinfo is None:
+                dt = dt.replace(tzinfo=timezone.utc)
+            return dt.timestamp() * 1000
+    value = float(value)
+    return value * 1000 if abs(value) < 1e11 else value
+
+
+class TradeHistoryStore:
+    # Parses trades_history.json once and keeps the dashboard aggregates
+    # up to date. A file that only grew (new trades appended before the
+    # closing bracket) is tail-parsed; any other change triggers a reload.
+
+    def __init__(self, path, starting_balance=STARTING_BALANCE):
+        self.path = path
+        self.starting_balance = starting_balance
+        self._lock = threading.Lock()
+        self._stat = None
+        self._reset()
+
+    def _reset(self):
+        self.trades = []
+        self.total_pnl = 0.0
+        self.open_trades = 0
+        self.symbol_pnl = {}
+        self._end = None
+        self._fingerprint = b""
+        self._index = {None: (array("q"), array("d"))}
+
+    def _apply(self, trades):
+        for t in trades:
+            pnl = t.get("pnl", 0)
+            self.total_pnl += pnl
+            if t.get("open", False):
+                self.open_trades += 1
+            symbol = t.get("symbol") or "UNKNOWN"
+            self.symbol_pnl[symbol] = self.symbol_pnl.get(symbol, 0) + pnl
+        start = len(self.trades)
+        self.trades.extend(trades)
+        self._index_append(start)
+
+    def _index_append(self, start):
+        # Trades are normally appended in time order, so the timestamp
+        # index is extended in place; anything out of order rebuilds it.
+        # Rebuilds swap in new arrays, which keeps open readers consistent.
+        index = self._index
+        added = {}
+        for pos in range(start, len(self.trades)):
+            t = self.trades[pos]
+            try:
+                key = timestamp_key(t.get("timestamp"))
+            except (TypeError, ValueError):
+                key = float("-inf")
+            for name in (None, t.get("symbol") or "UNKNOWN"):
+                if name not in index:
+                    index[name] = (array("q"), array("d"))
+                order, keys = index[name]
+                last = added[name][-1][1] if name in added else (keys[-1] if keys else float("-inf"))
+                if key < last:
+                    self._rebuild_index()
+                    return
+                added.setdefault(name, []).append((pos, key))
+        for name, rows in added.items():
+            order, keys = index[name]
+            order.extend(pos for pos, _ in rows)
+            keys.extend(key for _, key in rows)
+
+    def _rebuild_index(self):
+        rows = {}
+        for pos, t in enumerate(self.trades):
+            try:
+                key = timestamp_key(t.get("timestamp"))
+            except (TypeError, ValueError):
+                key = float("-inf")
+            rows.setdefault(None, []).append((key, pos))
+            rows.setdefault(t.get("symbol") or "UNKNOWN", []).append((key, pos))
+        index = {None: (array("q"), array("d"))}
+        for name, entries in rows.items():
+            entries.sort()
+            index[name] = (array("q", (pos for _, pos in entries)), array("d", (key for key, _ in entries)))
+        self._index = index
+
+    def _full_load(self, stat):
+        self._reset()
+        with open(self.path, "rb") as f:
+            raw = f.read()
+        data = json.loads(raw) if raw.strip() else []
+        if not isinstance(data, list):
+            data = []
+        self._apply(data)
+        end = len(raw[:raw.rfind(b"]")].rstrip())
+        if data and end > 0:
+            self._end = end
+            self._fingerprint = raw[max(0, end - FINGERPRINT_BYTES):end]
+        self._stat = (stat.st_mtime_ns, stat.st_size)
+
+    def _tail_load(self, stat):
+        # _end is the byte offset just past the last parsed trade, so the
+        # writer may rewrite the whitespace and closing bracket after it.
+        # Returns False when the file was not a pure append.
+        start = self._end - len(self._fingerprint)
+        with open(self.path, "rb") as f:
+            f.seek(start)
+            raw = f.read()
+        if not raw.startswith(self._fingerprint):
+            return False
+        text = raw[len(self._fingerprint):].decode("utf-8")
+        decoder = json.JSONDecoder()
+        appended = []
+        pos = last = 0
+        try:
+            while True:
+                while pos < len(text) and text[pos].isspace():
+                    pos += 1
+                if text.startswith("]", pos):
+                    break
+                if not text.startswith(",", pos):
+                    return False
+                pos += 1
+                while pos < len(text) and text[pos].isspace():
+                    pos += 1
+                trade, pos = decoder.raw_decode(text, pos)
+                appended.append(trade)
+                last = pos
+        except ValueError:
+            return False
+        if text[pos + 1:].strip():
+            return False
+        self._apply(appended)
+        added = text[:last].encode("utf-8")
+        self._end += len(added)
+        self._fingerprint = (self._fingerprint + added)[-FINGERPRINT_BYTES:]
+        self._stat = (stat.st_mtime_ns, stat.st_size)
+        return True
+
+    def refresh(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            with self._lock:
+                if self._stat is not None:
+                    self._stat = None
+                    self._reset()
+            return self
+        key = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            if key == self._stat:
+                return self
+            grew = self._stat is not None and stat.st_size > self._stat[1]
+            if not (grew and self._end is not None and self._tail_load(stat)):
+                self._full_load(stat)
+        return self
+
+    def summary(self):
+        self.refresh()
+        with self._lock:
+            return {
+                "balance": round(self.starting_balance + self.total_pnl, 2),
+                "open_trades": self.open_trades,
+                "total_pnl": round(self.total_pnl, 2),
+            }
+
+    def pnl_by_symbol(self):
+        self.refresh()
+        with self._lock:
+            return dict(self.symbol_pnl)
+
+    def all_trades(self):
+        self.refresh()
+        with self._lock:
+            return self.trades
+
+    def select(self, since=None, until=None, symbol=None, cursor=0, limit=None):
+        # Trades with since <= timestamp < until in timestamp order, as a
+        # lazy iterator plus the cursor for the next page (None when done).
+        # The cursor is a position in the (per-symbol) index and stays valid
+        # while trades are only appended in time order.
+        self.refresh()
+        with self._lock:
+            trades = self.trades
+            order, keys = self._index.get(symbol, (array("q"), array("d")))
+            lo = bisect_left(keys, timestamp_key(since)) if since is not None else 0
+            lo = max(lo, cursor or 0)
+            hi = bisect_left(keys, timestamp_key(until)) if until is not None else len(keys)
+            hi = max(hi, lo)
+            next_cursor = None
+            if limit is not None and hi - lo > limit:
+                hi = lo + limit
+                next_cursor = hi
+        return (trades[order[i]] for i in range(lo, hi)), next_cursor
+
+
+class CachedJSONFile:
+    # Re-reads a small JSON file only when its mtime or size changes.
+
+    def __init__(self, path, default=None):
+        self.path = path
+        self.default = {} if default is None else default
+        self._lock = threading.Lock()
+        self._stat = None
+        self._data = self.default
+
+    def get(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return self.default
+        key = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            if key != self._stat:
+                with open(self.path, "r") as f:
+                    self._data = json.load(f)
+                self._stat = key
+            return self._data
+
+
+_stores = {}
+_files = {}
+_registry_lock = threading.Lock()
+
+
+def get_trade_store(path="trades_history.json"):
+    path = os.path.abspath(path)
+    with _registry_lock:
+        if path not in _stores:
+            _stores[path] = TradeHistoryStore(path)
+        return _stores[path]
+
+
+def load_cached_json(path):
+    path = os.path.abspath(path)
+    with _registry_lock:
+        if path not in _files:
+            _files[path] = CachedJSONFile(path)
+        cached = _files[path]
+    return cached.get()
@@ -3,6 +3,7 @@ from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import StandardScaler
 from tensorflow.keras.models import Sequential
 from tensorflow.keras.layers import Dense
+from model_registry import get_registry
 
 data = pd.DataFrame({
     'feature1': [0.1, 0.2, 0.3, 0.4, 0.5],
@@ -28,4 +29,7 @@ model = Sequential([
 model.compile(optimizer='adam', loss='binary_crossentropy', metrics=['accuracy'])
 model.fit(X_train, y_train, epochs=50, batch_size=2, verbose=1)
 model.save("E:/EV_Files/teaka_trading_app/qtrader_model.h5")
+version = get_registry().publish("qtrader_keras", "E:/EV_Files/teaka_trading_app/qtrader_model.h5", kind="keras",
+                                 metadata={"features": list(features.columns), "epochs": 50})
+print(f"? Published qtrader_keras {version}")
 print("? Model training complete and saved.")